@@ -0,0 +1,81 @@
+"""
+Mueve los eventos con más de N días de `events` al archivo frío (Parquet por día).
+
+Cada lote se escribe primero en disco y solo después se borra de MongoDB; si el proceso
+se interrumpe, al relanzarlo el lote pendiente se reescribe con el mismo nombre.
+
+Uso: python config/archive_events.py [--older-than-days 180] [--batch-size 50000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from pathlib import Path
+from motor.motor_asyncio import AsyncIOMotorClient
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(str(BASE_DIR / ".env"))
+sys.path.insert(0, str(BASE_DIR))
+
+from model.dao.ColdEventDAO import ColdEventDAO, ARCHIVE_DIR, pa
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017")
+DB_NAME = os.getenv("DB_NAME", "undersounds_stats")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+
+async def _archive_day(events, day_start: datetime, until: datetime, batch_size: int) -> int:
+    moved = 0
+    query = {"timestamp": {"$gte": day_start, "$lt": until}}
+    while True:
+        batch = await events.find(query).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            return moved
+        ColdEventDAO.write_batch(day_start.date(), batch)
+        await events.delete_many({"_id": {"$in": [d["_id"] for d in batch]}})
+        moved += len(batch)
+
+def _advance_watermark(ts: datetime):
+    """La marca de agua solo avanza: un lanzamiento con menos días no devuelve eventos a Mongo."""
+    previous = ColdEventDAO.archived_before()
+    if previous is None or ts > previous:
+        ColdEventDAO.set_archived_before(ts)
+
+async def archive_before(events, cutoff: datetime, batch_size: int) -> int:
+    """Archiva día a día (del más antiguo al más reciente) los eventos anteriores a `cutoff`."""
+    total = 0
+    while True:
+        oldest = await events.find({"timestamp": {"$lt": cutoff}}, {"timestamp": 1}).sort("timestamp", 1).limit(1).to_list(length=1)
+        if not oldest:
+            break
+        day_start = oldest[0]["timestamp"].replace(hour=0, minute=0, second=0, microsecond=0)
+        until = min(day_start + timedelta(days=1), cutoff)
+        moved = await _archive_day(events, day_start, until, batch_size)
+        # el día ya no está en Mongo: las consultas con rango deben leerlo del archivo desde ahora,
+        # no al terminar (ni quedar ocultos si el proceso cae a mitad)
+        _advance_watermark(until)
+        total += moved
+        print(f"{day_start.date()}: archived {moved} events")
+    _advance_watermark(cutoff)
+    return total
+
+async def main(older_than_days: int, batch_size: int):
+    if pa is None:
+        raise SystemExit("pyarrow is required: pip install pyarrow")
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).replace(
+        hour=0, minute=0, second=0, microsecond=0, tzinfo=None
+    )
+    client = AsyncIOMotorClient(MONGO_URI)
+    try:
+        total = await archive_before(client[DB_NAME]["events"], cutoff, batch_size)
+        print(f"Archive finished: {total} events moved to {ARCHIVE_DIR} (before {cutoff.isoformat()})")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args()
+    asyncio.run(main(args.older_than_days, args.batch_size))
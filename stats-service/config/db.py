@@ -1,23 +1,109 @@
 import os
 import asyncio
-from typing import Optional
+import importlib.util
+from typing import Optional, Union
 import motor.motor_asyncio
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+from pymongo.write_concern import WriteConcern
+from utils.logger import get_logger
+
+logger = get_logger("db")
 
 # Leer variables de entorno con valores por defecto
 MONGO_URI = os.getenv("MONGO_URI") or "mongodb://127.0.0.1:27017"
 DB_NAME = os.getenv("DB_NAME") or "undersounds_stats"
 
+# Almacenamiento de eventos: "standard" o "timeseries" (colección time-series, MongoDB 5.0+)
+EVENTS_STORAGE = (os.getenv("EVENTS_STORAGE") or "standard").lower()
+EVENTS_RETENTION_DAYS = int(os.getenv("EVENTS_RETENTION_DAYS") or "0")
+EVENTS_TS_GRANULARITY = os.getenv("EVENTS_TS_GRANULARITY") or "minutes"
+
+# Pool y compresión del protocolo (zstd necesita `zstandard`, snappy `python-snappy`; zlib viene con Python)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE") or "100")
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE") or "0")
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS") or ""
+# Write concern por defecto del cliente (vacío = el del servidor)
+MONGO_WRITE_CONCERN = os.getenv("MONGO_WRITE_CONCERN") or ""
+
+# Lecturas analíticas (trending, recomendaciones, agregaciones): pueden ir a secundarios
+ANALYTICS_READ_PREFERENCE = os.getenv("ANALYTICS_READ_PREFERENCE") or "secondaryPreferred"
+ANALYTICS_MAX_STALENESS_SECONDS = int(os.getenv("ANALYTICS_MAX_STALENESS_SECONDS") or "0")
+
+# Escrituras de ingesta (eventos y buckets). "0" = sin acuse: más rápido, pero un error se pierde en silencio
+INGEST_WRITE_CONCERN = os.getenv("INGEST_WRITE_CONCERN") or "1"
+INGEST_JOURNAL = (os.getenv("INGEST_JOURNAL") or "false").lower() in ("1", "true", "yes")
+
+_READ_PREFERENCES = {
+    "primary": Primary,
+    "primarypreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondarypreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+_COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
 _client: Optional[AsyncIOMotorClient] = None
 _db: Optional[AsyncIOMotorDatabase] = None
+_analytics_db: Optional[AsyncIOMotorDatabase] = None
+_ingest_db: Optional[AsyncIOMotorDatabase] = None
+# compresores efectivos, detectados una vez al crear el cliente
+_compressors: Optional[list] = None
+
+def _parse_w(value: str) -> Union[int, str]:
+    return int(value) if value.isdigit() else value
+
+def _read_preference(name: str, max_staleness: int):
+    cls = _READ_PREFERENCES.get(name.replace("_", "").lower())
+    if cls is None:
+        raise ValueError(f"Unsupported read preference: {name}")
+    if cls is Primary:
+        return Primary()
+    # el servidor exige al menos 90 s; 0 = sin límite de desfase
+    return cls(max_staleness=max(max_staleness, 90) if max_staleness > 0 else -1)
+
+def _ingest_write_concern() -> WriteConcern:
+    w = _parse_w(INGEST_WRITE_CONCERN)
+    if w == 0 and INGEST_JOURNAL:
+        raise ValueError("INGEST_WRITE_CONCERN=0 is incompatible with INGEST_JOURNAL=true")
+    return WriteConcern(w=w, j=True if INGEST_JOURNAL else None)
+
+def _available_compressors() -> list:
+    """Compresores pedidos cuyo módulo está instalado (el resto se ignora con aviso). Se calcula una vez."""
+    global _compressors
+    if _compressors is None:
+        names = [c.strip().lower() for c in MONGO_COMPRESSORS.split(",") if c.strip()]
+        available = []
+        for name in names:
+            module = _COMPRESSOR_MODULES.get(name)
+            if module and importlib.util.find_spec(module) is not None:
+                available.append(name)
+            else:
+                logger.warning("mongo_compressor_unavailable", compressor=name)
+        _compressors = available
+    return _compressors
+
+def client_options() -> dict:
+    options = {"maxPoolSize": MONGO_MAX_POOL_SIZE, "minPoolSize": MONGO_MIN_POOL_SIZE}
+    compressors = _available_compressors()
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    if MONGO_WRITE_CONCERN:
+        options["w"] = _parse_w(MONGO_WRITE_CONCERN)
+    return options
 
 async def connect_to_mongo():
-    global _client, _db
+    global _client, _db, _analytics_db, _ingest_db
     if _client is None:
         # motor no admite None como host; asegurar string válido
         uri = MONGO_URI if isinstance(MONGO_URI, str) and MONGO_URI else "mongodb://127.0.0.1:27017"
-        _client = AsyncIOMotorClient(uri)
+        _client = AsyncIOMotorClient(uri, **client_options())
         _db = _client[DB_NAME]
+        # mismo pool, distinta configuración por tipo de carga
+        _analytics_db = _client.get_database(
+            DB_NAME, read_preference=_read_preference(ANALYTICS_READ_PREFERENCE, ANALYTICS_MAX_STALENESS_SECONDS)
+        )
+        _ingest_db = _client.get_database(DB_NAME, write_concern=_ingest_write_concern())
         # Realizar un ping para utilizar features async y validar la conexión
         try:
             await _client.admin.command('ping')
@@ -26,16 +112,48 @@ async def connect_to_mongo():
             print(f"Warning: ping failed after client init: {e}")
 
 async def close_mongo():
-    global _client, _db
+    global _client, _db, _analytics_db, _ingest_db
     if _client:
         # pequeña espera para usar características async (y satisfacer Sonar)
         await asyncio.sleep(0)
         _client.close()
         _client = None
         _db = None
+        _analytics_db = None
+        _ingest_db = None
         print("Closed MongoDB connection")
 
 def get_db() -> AsyncIOMotorDatabase:
     if _db is None:
         raise RuntimeError("Database not initialized. Call connect_to_mongo() on startup.")
-    return _db
\ No newline at end of file
+    return _db
+
+def get_analytics_db() -> AsyncIOMotorDatabase:
+    """Base de datos para agregaciones pesadas: usa ANALYTICS_READ_PREFERENCE."""
+    if _analytics_db is None:
+        raise RuntimeError("Database not initialized. Call connect_to_mongo() on startup.")
+    return _analytics_db
+
+def get_ingest_db() -> AsyncIOMotorDatabase:
+    """Base de datos para escrituras de ingesta que no necesitan leer el resultado: usa INGEST_WRITE_CONCERN."""
+    if _ingest_db is None:
+        raise RuntimeError("Database not initialized. Call connect_to_mongo() on startup.")
+    return _ingest_db
+
+def connection_info() -> dict:
+    return {
+        "max_pool_size": MONGO_MAX_POOL_SIZE,
+        "min_pool_size": MONGO_MIN_POOL_SIZE,
+        "compressors": list(_compressors or []),
+        "analytics_read_preference": _analytics_db.read_preference.document if _analytics_db is not None else None,
+        "ingest_write_concern": _ingest_db.write_concern.document if _ingest_db is not None else None,
+    }
+
+def events_timeseries_options() -> dict:
+    """Opciones de create_collection para `events` en modo time-series."""
+    options = {
+        "timeseries": {"timeField": "timestamp", "metaField": "meta", "granularity": EVENTS_TS_GRANULARITY}
+    }
+    if EVENTS_RETENTION_DAYS > 0:
+        options["expireAfterSeconds"] = EVENTS_RETENTION_DAYS * 86400
+    return options
@@ -0,0 +1,209 @@
+"""
+Generador de eventos sintéticos a escala, con las distribuciones aprendidas de data-dump/events.json.
+
+  profile   muestra lo aprendido del volcado (mezcla de tipos, formas de metadata, horario, Zipf...)
+  generate  genera --events eventos repartidos en --days días que terminan en --end
+            (por defecto, el último evento del volcado) con popularidad Zipf de artistas/álbumes/tracks;
+            --out DIR escribe NDJSON gzip, --mongo inserta en lotes en la colección `events`
+  load      importa a Mongo los NDJSON generados con --out
+
+Misma --seed (y mismos parámetros) => mismos eventos. Para paralelizar, lanzar un proceso por shard
+con --shard i/N: cada uno genera un rango de días distinto y el conjunto es idéntico a N=1.
+
+Uso: python config/generate_events.py profile
+     python config/generate_events.py generate --events 10000000 --days 180 --seed 42 --out ./synthetic
+     python config/generate_events.py generate --events 1000000 --mongo --kpis --shard 0/4
+     python config/generate_events.py load ./synthetic
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from pathlib import Path
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(str(BASE_DIR / ".env"))
+sys.path.insert(0, str(BASE_DIR))
+
+from config.db import EVENTS_STORAGE
+from model.dao.EventDAO import with_timeseries_meta
+from utils.dump_importer import DumpImporter, _next_batch
+from utils.synthetic_events import DumpProfile, EventGenerator, NDJSONWriter, artist_increments
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017")
+DB_NAME = os.getenv("DB_NAME", "undersounds_stats")
+DUMP_FILE = BASE_DIR / "data-dump" / "events.json"
+
+def _parse_shard(value: str):
+    try:
+        shard, shards = (int(x) for x in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected i/N")
+    if not 0 <= shard < shards:
+        raise argparse.ArgumentTypeError("shard must be in [0, N)")
+    return shard, shards
+
+def _build_generator(args, profile: DumpProfile) -> EventGenerator:
+    if args.albums_per_artist:
+        profile.albums_per_artist = args.albums_per_artist
+    if args.tracks_per_album:
+        profile.tracks_per_album = args.tracks_per_album
+    end = datetime.fromisoformat(args.end) if args.end else (profile.end or datetime(2025, 1, 1, tzinfo=timezone.utc))
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    artists = args.artists or min(max(100, args.events // 1000), 1_000_000)
+    users = args.users or min(max(1000, args.events // 50), 50_000_000)
+    return EventGenerator(profile, args.events, args.days, end, args.seed,
+                          artists=artists, users=users, zipf_s=args.zipf, growth=args.growth)
+
+class _Progress:
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.started = time.perf_counter()
+        self._last = 0.0
+
+    def add(self, n: int):
+        self.done += n
+        now = time.perf_counter()
+        if now - self._last >= 5 or self.done >= self.total:
+            self._last = now
+            rate = self.done / max(now - self.started, 1e-9)
+            print(f"{self.done}/{self.total} events ({self.done * 100 // max(self.total, 1)}%), {rate:,.0f}/s", flush=True)
+
+async def _write_ndjson(gen: EventGenerator, days: range, args, progress: _Progress):
+    writer = NDJSONWriter(Path(args.out), args.shard[0], args.file_events)
+    it = gen.iter_events(days)
+    try:
+        while True:
+            batch = _next_batch(it, args.batch_size)
+            if not batch:
+                break
+            writer.write(batch)
+            progress.add(len(batch))
+    finally:
+        writer.close()
+    print(f"Wrote {len(writer.files)} file(s) to {args.out}")
+
+async def _write_mongo(gen: EventGenerator, days: range, args, progress: _Progress):
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client[DB_NAME]
+    tally = defaultdict(lambda: defaultdict(float)) if args.kpis else None
+    sem = asyncio.Semaphore(args.concurrency)
+    pending = set()
+
+    async def _insert(batch):
+        try:
+            await db["events"].insert_many(batch, ordered=False)
+            progress.add(len(batch))
+        finally:
+            sem.release()
+
+    it = gen.iter_events(days)
+    try:
+        while True:
+            # generar fuera del loop mientras los lotes anteriores se insertan
+            batch = await asyncio.to_thread(_next_batch, it, args.batch_size)
+            if not batch:
+                break
+            if tally is not None:
+                for doc in batch:
+                    artist_id, inc = artist_increments(doc)
+                    if artist_id:
+                        for k, v in inc.items():
+                            tally[artist_id][k] += v
+            if EVENTS_STORAGE == "timeseries":
+                batch = [with_timeseries_meta(d) for d in batch]
+            await sem.acquire()
+            task = asyncio.create_task(_insert(batch))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            for t in [t for t in pending if t.done()]:
+                t.result()
+        await asyncio.gather(*pending)
+
+        if tally is not None:
+            # $inc: los shards pueden escribir sus contadores en cualquier orden
+            ops = [UpdateOne({"artistId": aid}, {"$inc": {k: (int(v) if k != "revenue" else round(v, 2)) for k, v in inc.items()},
+                                                 "$setOnInsert": {"artistId": aid}}, upsert=True)
+                   for aid, inc in tally.items()]
+            for i in range(0, len(ops), 1000):
+                await db["artist_kpis"].bulk_write(ops[i:i + 1000], ordered=False)
+            print(f"Updated artist_kpis for {len(ops)} artists")
+        print("Run `python config/init_db.py` to rebuild time buckets and track/album counters")
+    finally:
+        client.close()
+
+async def generate(args):
+    profile = DumpProfile.from_dump(Path(args.dump))
+    gen = _build_generator(args, profile)
+    shard, shards = args.shard
+    days = gen.shard_days(shard, shards)
+    total = gen.count_for(days)
+    cat = gen.catalog
+    print(f"seed={args.seed} shard={shard}/{shards} days={days.start}..{days.stop - 1} events={total} "
+          f"artists={cat.artists} albums={cat.albums} tracks={cat.tracks} users={cat.users} zipf={gen.zipf_s:.3f}")
+    progress = _Progress(total)
+    if args.out:
+        await _write_ndjson(gen, days, args, progress)
+    else:
+        await _write_mongo(gen, days, args, progress)
+
+async def load(args):
+    files = sorted(Path(args.dir).glob("events-*.ndjson.gz"))
+    if not files:
+        raise SystemExit(f"No events-*.ndjson.gz in {args.dir}")
+    client = AsyncIOMotorClient(MONGO_URI)
+    try:
+        transforms = {"events": with_timeseries_meta} if EVENTS_STORAGE == "timeseries" else None
+        importer = DumpImporter(client[DB_NAME], {"events": files}, batch_size=args.batch_size, transforms=transforms)
+        ok = await importer.run()
+        print(json.dumps(importer.info(), indent=2))
+        if not ok:
+            raise SystemExit(1)
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    prof = sub.add_parser("profile")
+    prof.add_argument("--dump", default=str(DUMP_FILE))
+    gen = sub.add_parser("generate")
+    gen.add_argument("--dump", default=str(DUMP_FILE))
+    gen.add_argument("--events", type=int, default=1_000_000)
+    gen.add_argument("--days", type=int, default=90)
+    gen.add_argument("--end", help="ISO 8601; por defecto, el último evento del volcado")
+    gen.add_argument("--seed", type=int, default=42)
+    gen.add_argument("--artists", type=int, help="por defecto events/1000 (100..1M)")
+    gen.add_argument("--users", type=int, help="por defecto events/50")
+    gen.add_argument("--albums-per-artist", type=int)
+    gen.add_argument("--tracks-per-album", type=int)
+    gen.add_argument("--zipf", type=float, help="exponente de popularidad; por defecto el ajustado al volcado")
+    gen.add_argument("--growth", type=float, default=0.0, help="crecimiento del volumen diario en el periodo (0.5 = +50%%)")
+    gen.add_argument("--shard", type=_parse_shard, default=(0, 1))
+    target = gen.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="directorio de salida NDJSON gzip")
+    target.add_argument("--mongo", action="store_true", help="insertar en MONGO_URI/DB_NAME")
+    gen.add_argument("--batch-size", type=int, default=5000)
+    gen.add_argument("--concurrency", type=int, default=4, help="inserciones en vuelo (--mongo)")
+    gen.add_argument("--file-events", type=int, default=1_000_000, help="eventos por fichero (--out)")
+    gen.add_argument("--kpis", action="store_true", help="incrementar artist_kpis con los eventos generados (--mongo)")
+    ld = sub.add_parser("load")
+    ld.add_argument("dir")
+    ld.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.command == "profile":
+        print(json.dumps(DumpProfile.from_dump(Path(args.dump)).to_dict(), indent=2, ensure_ascii=False))
+    elif args.command == "generate":
+        asyncio.run(generate(args))
+    else:
+        asyncio.run(load(args))
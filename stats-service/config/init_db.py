@@ -1,30 +1,82 @@
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import sys
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(str(BASE_DIR / ".env"))
+sys.path.insert(0, str(BASE_DIR))
+
+from model.dao.KPIBucketDAO import KPIBucketDAO
+from model.dao.ContentKPIDAO import TrackKPIDAO, AlbumKPIDAO
+from model.dao.EventKeyDAO import EventKeyDAO
+from utils.timeseries import RESOLUTIONS
+from config.db import EVENTS_STORAGE, EVENTS_RETENTION_DAYS, events_timeseries_options
+
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017")
 DB_NAME = os.getenv("DB_NAME", "undersounds_stats")
 
-async def ensure_collection(db, name):
+async def ensure_collection(db, name, **options):
     try:
-        await db.create_collection(name)
+        await db.create_collection(name, **options)
         print(f"Created collection: {name}")
     except Exception:
         print(f"Collection already exists or failed to create: {name}")
 
+async def ensure_events_collection(db):
+    if EVENTS_STORAGE != "timeseries":
+        await ensure_collection(db, "events")
+        return
+    info = await db.list_collections(filter={"name": "events"}).to_list(length=1)
+    if not info:
+        await ensure_collection(db, "events", **events_timeseries_options())
+    elif info[0].get("type") != "timeseries":
+        print("events is a standard collection; run config/migrate_events_timeseries.py to convert it")
+    else:
+        # aplicar la retención configurada a una colección time-series existente
+        expire = EVENTS_RETENTION_DAYS * 86400 if EVENTS_RETENTION_DAYS > 0 else "off"
+        await db.command("collMod", "events", expireAfterSeconds=expire)
+        print(f"events retention set to: {expire}")
+
 async def main():
     client = AsyncIOMotorClient(MONGO_URI)
     db = client[DB_NAME]
-    await ensure_collection(db, "events")
+    await ensure_events_collection(db)
     await ensure_collection(db, "artist_kpis")
     # crear índices recomendados
     await db["events"].create_index([("timestamp", 1)])
     await db["events"].create_index([("entityId", 1)])
+    # una rama por campo del $or de artista (KPIs por rango y dashboard)
+    for field in ("entityId", "metadata.artistId", "metadata.artist"):
+        await db["events"].create_index([(field, 1), ("timestamp", -1)])
+    if EVENTS_STORAGE == "timeseries":
+        await db["events"].create_index([("meta.artistId", 1), ("timestamp", 1)])
     await db["artist_kpis"].create_index([("artistId", 1)], unique=True)
+    # índices para el leaderboard (orden por contador + desempate por artistId)
+    for metric in ("plays", "likes", "follows", "purchases", "revenue"):
+        await db["artist_kpis"].create_index([(metric, -1), ("artistId", 1)])
+    # buckets pre-agregados para series temporales
+    await ensure_collection(db, KPIBucketDAO.COLLECTION)
+    buckets = db[KPIBucketDAO.COLLECTION]
+    await buckets.create_index([("artistId", 1), ("res", 1), ("ts", 1)], unique=True)
+    await buckets.create_index([("expireAt", 1)], expireAfterSeconds=0)
+    now = datetime.now(timezone.utc)
+    for res, cfg in RESOLUTIONS.items():
+        since = now - cfg["retention"] if cfg["retention"] is not None else None
+        await db["events"].aggregate(KPIBucketDAO.build_rebuild_pipeline(res, since)).to_list(length=None)
+        print(f"Rebuilt {res} buckets")
+    # contadores materializados por track y álbum (rankings por índice)
+    for dao in (TrackKPIDAO, AlbumKPIDAO):
+        await ensure_collection(db, dao.COLLECTION)
+        await dao.ensure_indexes(db)
+        await db["events"].aggregate(dao.build_rebuild_pipeline()).to_list(length=None)
+        print(f"Rebuilt {dao.COLLECTION}")
+    # claves de idempotencia de la ingesta (índice único en _id + TTL)
+    await ensure_collection(db, EventKeyDAO.COLLECTION)
+    await EventKeyDAO.ensure_indexes(db)
     # cerrar cliente (motor.close() no es awaitable)
     client.close()
     print("Init finished")
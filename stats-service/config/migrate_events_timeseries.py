@@ -0,0 +1,98 @@
+"""
+Migra `events` de colección estándar a colección time-series.
+
+1. Renombra `events` a `events_legacy` (las colecciones time-series no se pueden renombrar).
+2. Crea `events` como time-series con las opciones de config/db.py.
+3. Copia los documentos en lotes ordenados por _id, añadiendo el metaField `meta`.
+
+Es reanudable: si se interrumpe, volver a ejecutarlo continúa desde el último _id copiado.
+
+Uso: python config/migrate_events_timeseries.py [--batch-size 5000] [--drop-legacy]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from dotenv import load_dotenv
+from pathlib import Path
+from motor.motor_asyncio import AsyncIOMotorClient
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(str(BASE_DIR / ".env"))
+sys.path.insert(0, str(BASE_DIR))
+
+from config.db import events_timeseries_options
+from model.dao.EventDAO import with_timeseries_meta
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017")
+DB_NAME = os.getenv("DB_NAME", "undersounds_stats")
+LEGACY = "events_legacy"
+
+async def _collection_type(db, name):
+    info = await db.list_collections(filter={"name": name}).to_list(length=1)
+    return info[0].get("type") if info else None
+
+async def _prepare(db):
+    events_type = await _collection_type(db, "events")
+    legacy_type = await _collection_type(db, LEGACY)
+
+    if events_type == "collection":
+        if legacy_type is not None:
+            raise SystemExit(f"Both events and {LEGACY} exist as standard collections; resolve manually")
+        await db["events"].rename(LEGACY)
+        print(f"Renamed events -> {LEGACY}")
+        events_type = None
+    elif legacy_type is None:
+        raise SystemExit("Nothing to migrate: events is not a standard collection and no legacy copy exists")
+
+    if events_type is None:
+        await db.create_collection("events", **events_timeseries_options())
+        await db["events"].create_index([("meta.artistId", 1), ("timestamp", 1)])
+        await db["events"].create_index([("entityId", 1)])
+        print("Created time-series collection: events")
+
+async def _copy(db, batch_size: int) -> int:
+    target = db["events"]
+    # reanudar desde el último _id copiado
+    last = await target.find({}, {"_id": 1}).sort("_id", -1).limit(1).to_list(length=1)
+    query = {"_id": {"$gt": last[0]["_id"]}} if last else {}
+    copied = 0
+    batch = []
+    async for doc in db[LEGACY].find(query).sort("_id", 1).batch_size(batch_size):
+        if not doc.get("timestamp"):
+            continue
+        batch.append(with_timeseries_meta(doc))
+        if len(batch) >= batch_size:
+            await target.insert_many(batch, ordered=True)
+            copied += len(batch)
+            batch = []
+            print(f"Copied {copied} events")
+    if batch:
+        await target.insert_many(batch, ordered=True)
+        copied += len(batch)
+    return copied
+
+async def main(batch_size: int, drop_legacy: bool):
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client[DB_NAME]
+    try:
+        await _prepare(db)
+        copied = await _copy(db, batch_size)
+        print(f"Migration finished: {copied} events copied")
+        if drop_legacy:
+            legacy_count = await db[LEGACY].count_documents({"timestamp": {"$ne": None}})
+            events_count = await db["events"].count_documents({})
+            if events_count >= legacy_count:
+                await db[LEGACY].drop()
+                print(f"Dropped {LEGACY}")
+            else:
+                print(f"Kept {LEGACY}: {events_count} events copied of {legacy_count}")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--drop-legacy", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.drop_legacy))
@@ -0,0 +1,66 @@
+"""
+Snapshots incrementales de `events` y `artist_kpis` en NDJSON comprimido (gzip).
+
+  create   exporta los eventos posteriores a la última marca de agua (_id) y artist_kpis completa
+           (--full ignora la marca de agua y reinicia la cadena)
+  restore  importa la cadena de snapshots del manifiesto (último completo + incrementales)
+           hasta --until <id>; pensado para una base de datos vacía
+  list     muestra los snapshots registrados
+
+Uso: python config/snapshot.py create [--full]
+     python config/snapshot.py restore [--until 20250101T000000000Z] [--batch-size 1000]
+     python config/snapshot.py list
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from dotenv import load_dotenv
+from pathlib import Path
+from motor.motor_asyncio import AsyncIOMotorClient
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(str(BASE_DIR / ".env"))
+sys.path.insert(0, str(BASE_DIR))
+
+from utils.snapshot import SNAPSHOT_DIR, create_snapshot, load_manifest, restore_sources
+from utils.dump_importer import DumpImporter
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017")
+DB_NAME = os.getenv("DB_NAME", "undersounds_stats")
+
+async def main(args):
+    if args.command == "list":
+        for snap in load_manifest()["snapshots"]:
+            counts = ", ".join(f"{c}={i['count']} ({i['mode']})" for c, i in snap["collections"].items())
+            print(f"{snap['id']}  {counts}")
+        return
+
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client[DB_NAME]
+    try:
+        if args.command == "create":
+            entry = await create_snapshot(db, full=args.full)
+            print(f"Snapshot {entry['id']} written to {SNAPSHOT_DIR}")
+            print(json.dumps(entry["collections"], indent=2))
+        else:
+            sources = restore_sources(load_manifest(), until=args.until)
+            importer = DumpImporter(db, sources, batch_size=args.batch_size)
+            ok = await importer.run()
+            print(json.dumps(importer.info(), indent=2))
+            if not ok:
+                raise SystemExit(1)
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    create = sub.add_parser("create")
+    create.add_argument("--full", action="store_true")
+    restore = sub.add_parser("restore")
+    restore.add_argument("--until")
+    restore.add_argument("--batch-size", type=int, default=1000)
+    sub.add_parser("list")
+    asyncio.run(main(parser.parse_args()))
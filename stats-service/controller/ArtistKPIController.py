@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from typing import Optional, List, Dict, Any, Callable, Coroutine
 from datetime import datetime, timedelta, timezone
-import io, csv, os
+import io, csv, os, json, base64
+import socket
 import httpx
 import time
 import asyncio
@@ -9,12 +11,28 @@ import smtplib
 import logging
 
 from email.message import EmailMessage
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from aiobreaker import CircuitBreaker, CircuitBreakerError
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from cachetools import TTLCache
-from config.db import get_db
+from config.db import get_db, get_analytics_db
 from model.dao.EventDAO import EventDAO
-from model.dao.ArtistKPIDAO import ArtistKPIDAO
+from model.dao.ArtistKPIDAO import ArtistKPIDAO, LEADERBOARD_METRICS, kpi_cache_info, clear_kpi_cache
+from model.dao.KPIBucketDAO import KPIBucketDAO
+from model.dao.ContentKPIDAO import TrackKPIDAO, AlbumKPIDAO, CONTENT_METRICS
+from model.dao.ColdEventDAO import ColdEventDAO
+from model.dao.PrecomputedDAO import PrecomputedDAO
+from utils.catalog_index import CatalogIndex
+from utils.bulkhead import Bulkhead, BulkheadFullError
+from utils.scheduler import PeriodicJob, Scheduler
+from utils.admission import admission
+from utils.cached_body import CachedBody
+from utils.byte_cache import ByteBudgetCache
+from utils.process_pool import cpu_pool, PROCESS_POOL_MIN_ITEMS
+from utils import cpu_jobs
+from utils.live_hub import hub, HubFullError, Subscription
+from utils import deadline
+from utils.timeseries import pick_resolution, bucket_count, fill_gaps, lttb, to_utc_naive
 
 logger = logging.getLogger(__name__)
 
@@ -43,21 +61,25 @@ EVENT_ORDER_PAID = "order.paid"
 # ============================================================
 # FUNCIONES AUXILIARES PARA PIPELINES (S3776)
 # ============================================================
-def _build_track_pipeline(since: datetime, limit: int) -> list:
-    return [
+def _build_track_pipeline(since: datetime, limit: Optional[int]) -> list:
+    pipeline = [
         {MATCH: {"timestamp": {"$gte": since}, "eventType": EVENT_TRACK_PLAYED}},
         {GROUP: {"_id": ENTITY_ID, "count": {"$sum": 1}, "albumId": {"$first": "$metadata.albumId"}}},
-        {SORT: {"count": -1}},
-        {LIMIT_OP: limit}
+        {SORT: {"count": -1}}
     ]
+    if limit is not None:
+        pipeline.append({LIMIT_OP: limit})
+    return pipeline
 
-def _build_artist_pipeline(since: datetime, limit: int) -> list:
-    return [
+def _build_artist_pipeline(since: datetime, limit: Optional[int]) -> list:
+    pipeline = [
         {MATCH: {"timestamp": {"$gte": since}, "eventType": EVENT_ARTIST_FOLLOWED}},
         {GROUP: {"_id": ENTITY_ID, "count": {"$sum": 1}}},
-        {SORT: {"count": -1}},
-        {LIMIT_OP: limit}
+        {SORT: {"count": -1}}
     ]
+    if limit is not None:
+        pipeline.append({LIMIT_OP: limit})
+    return pipeline
 
 def _build_user_genre_pipeline(user_id: str) -> list:
     return [
@@ -126,7 +148,7 @@ def _check_thresholds(plays: int, likes: int, follows: int, thr_plays: int, thr_
 
 async def _fetch_artist_email(client: httpx.AsyncClient, artist_id: str) -> Optional[str]:
     try:
-        resp = await http_get_with_cb(client, f"{CONTENT_SERVICE_URL}/api/artists/{artist_id}", timeout=5)
+        resp = await http_get_with_cb(client, f"{CONTENT_SERVICE_URL}/api/artists/{artist_id}", route="artist", timeout=5)
         if resp.status_code == 200:
             artist = resp.json()
             return artist.get("email") or artist.get("contactEmail") or artist.get("correo")
@@ -201,35 +223,146 @@ async def create_alert(payload: Dict[str, Any]):
 # ============================================================
 # CIRCUIT BREAKER + RETRY
 # ============================================================
-def _create_content_cb():
+CONTENT_BULKHEAD_SIZE = int(os.getenv("CONTENT_BULKHEAD_SIZE", "10"))
+CONTENT_BULKHEAD_WAIT = float(os.getenv("CONTENT_BULKHEAD_WAIT_MS", "50")) / 1000
+CONTENT_BULKHEAD_QUEUE = int(os.getenv("CONTENT_BULKHEAD_QUEUE", str(CONTENT_BULKHEAD_SIZE)))
+
+# Cada ruta de content-service tiene su propio breaker y bulkhead: un listado lento por
+# género no abre el circuito ni agota la concurrencia de las consultas de artista.
+CONTENT_ROUTES = ("album", "albums_list", "artist")
+
+# Agotar el presupuesto propio de la petición no es un fallo de content-service: no cuenta para el breaker
+_CB_EXCLUDE = [deadline.DeadlineExceeded]
+
+def _create_content_cb(name: str = "content"):
     try:
-        return CircuitBreaker(fail_max=5, reset_timeout=30)
+        return CircuitBreaker(fail_max=5, reset_timeout=30, name=name, exclude=_CB_EXCLUDE)
     except TypeError:
         try:
-            return CircuitBreaker(fail_max=5, timeout_duration=30)
+            return CircuitBreaker(fail_max=5, timeout_duration=timedelta(seconds=30), name=name, exclude=_CB_EXCLUDE)
         except TypeError:
-            return CircuitBreaker(fail_max=5)
+            return CircuitBreaker(fail_max=5, exclude=_CB_EXCLUDE)
 
-content_cb = _create_content_cb()
+content_breakers: Dict[str, CircuitBreaker] = {r: _create_content_cb(r) for r in CONTENT_ROUTES}
+content_bulkheads: Dict[str, Bulkhead] = {
+    r: Bulkhead(r, CONTENT_BULKHEAD_SIZE, CONTENT_BULKHEAD_WAIT, CONTENT_BULKHEAD_QUEUE) for r in CONTENT_ROUTES
+}
+
+def _breaker_state(cb) -> str:
+    state = getattr(cb, "current_state", None) or getattr(cb, "state", None)
+    return state.name if hasattr(state, "name") else str(state)
+
+def content_resilience_status() -> Dict[str, Any]:
+    """Estado de breakers y bulkheads por ruta (usado por /stats/cb/status y /healthz)."""
+    breakers = {}
+    for route, cb in content_breakers.items():
+        try:
+            opens_at = getattr(cb, "opens_at", None)
+        except TypeError:  # aiobreaker: nunca se ha abierto
+            opens_at = None
+        breakers[route] = {
+            "state": _breaker_state(cb),
+            "fail_count": getattr(cb, "fail_counter", None),
+            "fail_max": getattr(cb, "fail_max", None),
+            "opens_at": str(opens_at) if opens_at else None,
+        }
+    return {
+        "breakers": breakers,
+        "bulkheads": {route: bh.info() for route, bh in content_bulkheads.items()},
+        "hedging": {"delay_ms": int(HEDGE_DELAY * 1000), **_hedge_stats},
+    }
+
+# Presupuesto por petición para trending/recomendaciones y hedging de lecturas lentas
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE_MS", "3000")) / 1000
+HEDGE_DELAY = float(os.getenv("HEDGE_DELAY_MS", "250")) / 1000
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "4"))
+
+_hedge_stats = {"sent": 0, "won": 0, "skipped": 0}
+_backoff = wait_exponential(multiplier=1, min=1, max=10)
+
+def _deadline_wait(retry_state) -> float:
+    # la espera entre reintentos nunca supera lo que queda de deadline
+    wait = _backoff(retry_state)
+    rem = deadline.remaining()
+    return wait if rem is None else max(0.0, min(wait, rem))
+
+def _deadline_reached(retry_state) -> bool:
+    rem = deadline.remaining()
+    return rem is not None and rem <= 0
+
+async def _hedged_get(client: httpx.AsyncClient, url: str, bulkhead: Optional[Bulkhead] = None, **kwargs):
+    """GET idempotente: si la primera respuesta tarda más de HEDGE_DELAY se lanza una segunda y gana la primera que llegue.
+
+    La segunda petición ocupa su propio hueco del bulkhead; si no lo hay, no se lanza.
+    """
+    first = asyncio.create_task(client.get(url, **kwargs))
+    tasks = [first]
+    try:
+        if HEDGE_DELAY <= 0:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=HEDGE_DELAY)
+        rem = deadline.remaining()
+        if done or (rem is not None and rem <= HEDGE_DELAY):
+            return await first
+        if bulkhead is not None and bulkhead.saturated:
+            _hedge_stats["skipped"] += 1
+            return await first
+
+        async def _backup():
+            if bulkhead is None:
+                return await client.get(url, **kwargs)
+            async with bulkhead.acquire(max_wait=0):
+                return await client.get(url, **kwargs)
+
+        _hedge_stats["sent"] += 1
+        second = asyncio.create_task(_backup())
+        tasks.append(second)
+        pending = {first, second}
+        errors: Dict[asyncio.Task, BaseException] = {}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    if t is second:
+                        _hedge_stats["won"] += 1
+                    return t.result()
+                errors[t] = t.exception()
+        # el error de la petición original es el significativo (el respaldo puede fallar por bulkhead lleno)
+        raise errors.get(first) or errors[second]
+    finally:
+        # también si se cancela al llamante (deadline, desconexión): ninguna petición queda huérfana
+        # fuera del bulkhead y del deadline
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 @retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=1, max=10),
+    stop=stop_after_attempt(3) | _deadline_reached,
+    wait=_deadline_wait,
     retry=retry_if_exception_type((httpx.TimeoutException, httpx.ConnectError)),
     reraise=True
 )
-async def _http_get_with_retry(client: httpx.AsyncClient, url: str, **kwargs):
-    response = await client.get(url, **kwargs)
+async def _http_get_with_retry(client: httpx.AsyncClient, url: str, bulkhead: Optional[Bulkhead] = None, **kwargs):
+    kwargs["timeout"] = deadline.clamp_timeout(kwargs.get("timeout"))
+    response = await _hedged_get(client, url, bulkhead, **kwargs)
     if response.status_code in (502, 503, 504):
         raise httpx.ConnectError(f"Server error {response.status_code}")
     return response
 
-async def http_get_with_cb(client: httpx.AsyncClient, url: str, **kwargs):
+async def http_get_with_cb(client: httpx.AsyncClient, url: str, route: str, **kwargs):
+    breaker = content_breakers[route]
+    bulkhead = content_bulkheads[route]
     try:
-        @content_cb
-        async def _call():
-            return await _http_get_with_retry(client, url, **kwargs)
-        return await _call()
+        async with bulkhead.acquire():
+            @breaker
+            async def _call():
+                return await _http_get_with_retry(client, url, bulkhead, **kwargs)
+            return await _call()
+    except BulkheadFullError:
+        raise HTTPException(status_code=503, detail=f"Content service busy ({route} bulkhead full)")
+    except deadline.DeadlineExceeded:
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
     except CircuitBreakerError:
         raise HTTPException(status_code=503, detail="Content service unavailable (circuit open)")
     except httpx.TimeoutException:
@@ -240,38 +373,243 @@ async def http_get_with_cb(client: httpx.AsyncClient, url: str, **kwargs):
 # ============================================================
 # CACHE
 # ============================================================
-CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "500"))
+# Presupuesto en bytes (memoria real de las entradas), no en número de entradas
+CACHE_MAX_BYTES = int(float(os.getenv("CACHE_MAX_MB", "64")) * 1024 * 1024)
+CACHE_MAX_ENTRY_BYTES = int(float(os.getenv("CACHE_MAX_ENTRY_MB", "0")) * 1024 * 1024)
 CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", "3600"))
+# solo acota el diccionario de locks por clave
+CACHE_MAX_LOCKS = 1000
 
-_cache: TTLCache = TTLCache(maxsize=CACHE_MAX_SIZE, ttl=CACHE_DEFAULT_TTL)
+_cache: ByteBudgetCache = ByteBudgetCache(CACHE_MAX_BYTES, CACHE_DEFAULT_TTL, CACHE_MAX_ENTRY_BYTES)
 _cache_locks: Dict[str, asyncio.Lock] = {}
 
-async def _get_cached(key: str, fetcher: Callable[[], Coroutine[Any, Any, Any]]):
-    try:
+def _item_count(value: Any) -> int:
+    if isinstance(value, list):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(v) for v in value.values() if isinstance(v, (list, dict)))
+    return 0
+
+async def _build_body(value: Any) -> CachedBody:
+    # serializar y comprimir (gzip/br) una sola vez por entrada, fuera del event loop;
+    # las listas grandes van al pool de procesos para no competir por el GIL con la ingesta
+    if cpu_pool.enabled and _item_count(value) >= PROCESS_POOL_MIN_ITEMS:
+        return CachedBody.from_parts(*await cpu_pool.run(cpu_jobs.encode_body, value))
+    return await asyncio.to_thread(CachedBody.build, value)
+
+def _cache_store(key: str, entry: CachedBody):
+    previous = _cache.get(key)
+    _cache[key] = entry
+    # los suscriptores SSE de esta clave reciben la lista nueva si ha cambiado
+    if (previous is None or previous.etag != entry.etag) and hub.has_subscribers("cache", key):
+        hub.publish("cache", key, {"key": key, "etag": entry.etag, "items": entry.value()})
+
+async def _get_cached_body(key: str, fetcher: Callable[[], Coroutine[Any, Any, Any]]) -> CachedBody:
+    """Entrada de caché como cuerpo JSON precomprimido; se calcula con `fetcher` si falta."""
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    lock = _cache_locks.setdefault(key, asyncio.Lock())
+    async with lock:
         cached = _cache.get(key)
         if cached is not None:
             return cached
-    except KeyError:
-        pass
 
-    lock = _cache_locks.setdefault(key, asyncio.Lock())
-    async with lock:
-        try:
-            cached = _cache.get(key)
-            if cached is not None:
-                return cached
-        except KeyError:
-            pass
+        if key in _precompute_jobs:
+            # listas mantenidas por el scheduler: se sirve la última versión calculada por el líder
+            value = await _load_precomputed(key)
+            if value is not None:
+                entry = await _build_body(value)
+                _cache_store(key, entry)
+                return entry
 
-        value = await fetcher()
-        _cache[key] = value
+        # servicio degradado: solo se sirve lo que ya está calculado
+        admission.check_uncached_read()
 
-        if len(_cache_locks) > CACHE_MAX_SIZE * 2:
-            keys_to_remove = list(_cache_locks.keys())[:CACHE_MAX_SIZE]
+        value = await fetcher()
+        entry = await _build_body(value)
+        if deadline.is_partial():
+            # un resultado parcial por deadline no se cachea: la siguiente petición lo reintenta
+            return entry
+        _cache_store(key, entry)
+
+        if len(_cache_locks) > CACHE_MAX_LOCKS * 2:
+            keys_to_remove = list(_cache_locks.keys())[:CACHE_MAX_LOCKS]
             for k in keys_to_remove:
                 _cache_locks.pop(k, None)
 
-        return value
+        return entry
+
+async def _get_cached(key: str, fetcher: Callable[[], Coroutine[Any, Any, Any]]):
+    return (await _get_cached_body(key, fetcher)).value()
+
+def _cached_response(request: Request, entry: CachedBody, budget: deadline.Deadline) -> Response:
+    """Sirve la codificación aceptada sin recomprimir y responde 304 si el ETag coincide."""
+    encoding = entry.pick_encoding(request.headers.get("accept-encoding", ""))
+    headers = {"ETag": entry.etag_for(encoding), "Vary": "Accept-Encoding"}
+    if budget.partial:
+        headers["X-Partial-Result"] = "true"
+    if entry.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=entry.body(encoding), media_type="application/json", headers=headers)
+
+# ============================================================
+# ÍNDICE LOCAL DE CATÁLOGO (género -> álbumes)
+# ============================================================
+CATALOG_REFRESH_SECONDS = int(os.getenv("CATALOG_REFRESH_SECONDS", "300"))
+
+_catalog = CatalogIndex()
+_catalog_lock = asyncio.Lock()
+_catalog_task: Optional[asyncio.Task] = None
+
+async def refresh_catalog() -> bool:
+    """Refresca el snapshot con petición condicional; si falla se conserva el último válido."""
+    if not CONTENT_SERVICE_URL:
+        return False
+    async with _catalog_lock:
+        try:
+            async with httpx.AsyncClient() as client:
+                resp = await http_get_with_cb(
+                    client, f"{CONTENT_SERVICE_URL}/api/albums", route="albums_list",
+                    headers=_catalog.conditional_headers(), timeout=10.0
+                )
+            if resp.status_code == 304:
+                _catalog.mark_not_modified()
+                return True
+            if resp.status_code != 200:
+                logger.warning(f"Catalog refresh got status {resp.status_code}, keeping last snapshot")
+                return False
+            _catalog.replace(
+                resp.json() or [],
+                etag=resp.headers.get("etag"),
+                last_modified=resp.headers.get("last-modified")
+            )
+            return True
+        except HTTPException as e:
+            logger.warning(f"Catalog refresh skipped, keeping last snapshot: {e.detail}")
+        except Exception as e:
+            logger.warning(f"Catalog refresh error, keeping last snapshot: {e}")
+    return False
+
+async def _ensure_catalog() -> bool:
+    if not _catalog.loaded:
+        await refresh_catalog()
+    return _catalog.loaded
+
+async def _catalog_refresh_loop():
+    while True:
+        await refresh_catalog()
+        await asyncio.sleep(CATALOG_REFRESH_SECONDS)
+
+def start_catalog_refresher():
+    global _catalog_task
+    if _catalog_task is None or _catalog_task.done():
+        _catalog_task = asyncio.create_task(_catalog_refresh_loop())
+
+async def stop_catalog_refresher():
+    global _catalog_task
+    if _catalog_task is not None:
+        _catalog_task.cancel()
+        try:
+            await _catalog_task
+        except asyncio.CancelledError:
+            pass
+        _catalog_task = None
+
+# ============================================================
+# PRECÁLCULO EN SEGUNDO PLANO (trending y populares)
+# ============================================================
+# Combinaciones a mantener calientes: "<genre>:<period>:<limit>" separadas por comas
+PRECOMPUTE_ENABLED = os.getenv("PRECOMPUTE_ENABLED", "true").lower() in ("1", "true", "yes")
+PRECOMPUTE_INTERVAL_SECONDS = int(os.getenv("PRECOMPUTE_INTERVAL_SECONDS", "300"))
+PRECOMPUTE_JITTER = float(os.getenv("PRECOMPUTE_JITTER", "0.1"))
+PRECOMPUTE_TRENDING = os.getenv("PRECOMPUTE_TRENDING", "tracks:week:10,artists:week:10")
+PRECOMPUTE_POPULAR_LIMITS = os.getenv("PRECOMPUTE_POPULAR_LIMITS", "20")
+PRECOMPUTE_DEADLINE = float(os.getenv("PRECOMPUTE_DEADLINE_MS", "60000")) / 1000
+
+_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+_scheduler = Scheduler()
+_precompute_jobs: Dict[str, Callable[[], Coroutine[Any, Any, Any]]] = {}
+
+def _trending_key(genre_param: str, period: str, limit: int) -> str:
+    return f"trending:{genre_param}:{period}:{limit}"
+
+def _popular_key(limit: int) -> str:
+    return f"popular:artists:{limit}"
+
+def _parse_precompute_config() -> Dict[str, Callable[[], Coroutine[Any, Any, Any]]]:
+    jobs: Dict[str, Callable[[], Coroutine[Any, Any, Any]]] = {}
+    for spec in filter(None, (s.strip() for s in PRECOMPUTE_TRENDING.split(","))):
+        try:
+            genre_param, period, limit = spec.split(":")
+            limit = int(limit)
+        except ValueError:
+            logger.warning(f"Invalid PRECOMPUTE_TRENDING entry ignored: {spec}")
+            continue
+        genre_param = genre_param.lower()
+        jobs[_trending_key(genre_param, period, limit)] = (
+            lambda g=genre_param, p=period, n=limit: _compute_trending(g, p, n)
+        )
+    for raw in filter(None, (s.strip() for s in PRECOMPUTE_POPULAR_LIMITS.split(","))):
+        try:
+            limit = int(raw)
+        except ValueError:
+            logger.warning(f"Invalid PRECOMPUTE_POPULAR_LIMITS entry ignored: {raw}")
+            continue
+        jobs[_popular_key(limit)] = lambda n=limit: _compute_popular_artists(n)
+    return jobs
+
+async def _load_precomputed(key: str):
+    try:
+        return await PrecomputedDAO.load(key)
+    except Exception as e:
+        logger.warning(f"Precomputed load failed for {key}: {e}")
+        return None
+
+async def _refresh_precomputed(key: str) -> str:
+    """Solo el worker con el lease recalcula; el resto copia su resultado a la caché local."""
+    if await PrecomputedDAO.try_acquire_lease(key, _WORKER_ID, PRECOMPUTE_INTERVAL_SECONDS * 2):
+        with deadline.deadline_scope(PRECOMPUTE_DEADLINE) as budget:
+            value = await _precompute_jobs[key]()
+        if budget.partial:
+            # un resultado incompleto no sustituye al último bueno
+            return "leader:partial"
+        await PrecomputedDAO.save(key, value)
+        _cache_store(key, await _build_body(value))
+        return "leader"
+    value = await PrecomputedDAO.load(key)
+    if value is None:
+        return "follower:empty"
+    _cache_store(key, await _build_body(value))
+    return "follower"
+
+def start_precompute_scheduler():
+    if not PRECOMPUTE_ENABLED or _scheduler.jobs:
+        return
+    _precompute_jobs.update(_parse_precompute_config())
+    for key in _precompute_jobs:
+        _scheduler.add(PeriodicJob(
+            key, PRECOMPUTE_INTERVAL_SECONDS,
+            lambda k=key: admission.track("precompute", _refresh_precomputed)(k),
+            jitter=PRECOMPUTE_JITTER
+        ))
+    _scheduler.start()
+
+async def stop_precompute_scheduler():
+    await _scheduler.stop()
+
+@router.get("/stats/precompute/status")
+async def precompute_status():
+    return {
+        "enabled": PRECOMPUTE_ENABLED,
+        "worker": _WORKER_ID,
+        "interval_seconds": PRECOMPUTE_INTERVAL_SECONDS,
+        "jitter": PRECOMPUTE_JITTER,
+        "jobs": _scheduler.info()
+    }
 
 @router.post("/stats/cache/clear")
 async def clear_cache(key: Optional[str] = None):
@@ -281,17 +619,181 @@ async def clear_cache(key: Optional[str] = None):
         return {"cleared": key}
     _cache.clear()
     _cache_locks.clear()
+    clear_kpi_cache()
     return {"cleared": "all"}
 
 @router.get("/stats/cache/info")
 async def cache_info():
     return {
-        "current_size": len(_cache),
-        "max_size": _cache.maxsize,
-        "ttl_seconds": _cache.ttl,
-        "keys": list(_cache.keys())[:50]
+        **_cache.info(),
+        "payload_bytes": sum(entry.size() for entry in _cache.values()),
+        "keys": list(_cache.keys())[:50],
+        "catalog": _catalog.info(),
+        "kpi_cache": kpi_cache_info()
     }
 
+# ============================================================
+# EXPORTACIÓN Y POOL DE PROCESOS
+# ============================================================
+EXPORT_MAX_ROWS = int(os.getenv("EXPORT_MAX_ROWS", "100000"))
+EXPORT_COLUMNS = ("entityId", "count")
+RAW_BSON_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+@router.get("/stats/export")
+async def export_stats(
+    format: str = Query("csv", description="csv | json"),
+    entity_type: Optional[str] = Query(None, alias="entityType"),
+    event_type: Optional[str] = Query(None, alias="eventType"),
+    start_date: Optional[str] = Query(None, alias="startDate"),
+    end_date: Optional[str] = Query(None, alias="endDate"),
+    limit: int = Query(EXPORT_MAX_ROWS, ge=1)
+):
+    """Eventos agrupados por entidad; el CSV/JSON se genera en el pool de procesos."""
+    if format not in ("csv", "json"):
+        raise HTTPException(status_code=400, detail="Unsupported format (csv | json)")
+    try:
+        start = to_utc_naive(datetime.fromisoformat(start_date)) if start_date else None
+        end = to_utc_naive(datetime.fromisoformat(end_date)) if end_date else None
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid date format (ISO)")
+
+    match_filter: Dict[str, Any] = {}
+    if entity_type:
+        match_filter["entityType"] = entity_type
+    if event_type:
+        match_filter["eventType"] = event_type
+    if start or end:
+        match_filter["timestamp"] = {k: v for k, v in (("$gte", start), ("$lte", end)) if v is not None}
+
+    admission.check_uncached_read()
+    pipeline = _build_export_pipeline(match_filter) + [
+        {LIMIT_OP: min(limit, EXPORT_MAX_ROWS)},
+        {"$project": {"_id": 0, "entityId": "$_id", "count": 1}}
+    ]
+    # documentos BSON sin decodificar: al worker le llega un único bloque de bytes
+    events = get_analytics_db().get_collection("events", codec_options=RAW_BSON_OPTIONS)
+    rows = await events.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+    data = b"".join(r.raw for r in rows)
+
+    body = await cpu_pool.offload(cpu_jobs.format_export, data, EXPORT_COLUMNS, format, size=len(rows))
+    if format == "json":
+        return Response(content=body, media_type="application/json")
+    return Response(content=body, media_type="text/csv",
+                    headers={"Content-Disposition": 'attachment; filename="stats-export.csv"'})
+
+@router.get("/stats/pool/status")
+async def pool_status():
+    return cpu_pool.info()
+
+# ============================================================
+# STREAMING EN VIVO (SSE)
+# ============================================================
+# Origen de las actualizaciones de KPIs: "ingest" (este proceso) o "changestream" (replica set)
+KPI_STREAM_SOURCE = (os.getenv("KPI_STREAM_SOURCE") or "ingest").lower()
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+_change_stream_task: Optional[asyncio.Task] = None
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+async def _sse_stream(request: Request, topic: str, key: str, event: str, initial: Any,
+                      baseline: Optional[dict] = None):
+    # la suscripción nace y muere dentro del generador: si el cliente se va antes de la
+    # primera iteración, Starlette nunca lo arranca y no queda nada registrado en el hub
+    sub: Optional[Subscription] = None
+    try:
+        try:
+            sub = hub.subscribe(topic, key, baseline)
+        except HubFullError:
+            # se llenó entre la comprobación del endpoint y el arranque del stream
+            yield _sse("error", {"detail": "Too many live subscribers"})
+            return
+        yield _sse(event, initial)
+        while True:
+            message = await sub.next(SSE_HEARTBEAT_SECONDS)
+            if await request.is_disconnected():
+                break
+            if message is None:
+                # comentario SSE: mantiene viva la conexión a través de proxies
+                yield ": ping\n\n"
+                continue
+            yield _sse(event, message)
+    finally:
+        if sub is not None:
+            sub.close()
+
+def _check_capacity():
+    if hub.full:
+        raise HTTPException(status_code=503, detail="Too many live subscribers", headers={"Retry-After": "30"})
+
+def _sse_response(request: Request, topic: str, key: str, event: str, initial: Any,
+                  baseline: Optional[dict] = None) -> StreamingResponse:
+    return StreamingResponse(
+        _sse_stream(request, topic, key, event, initial, baseline),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def publish_kpi_update(artist_id: str, doc: Optional[dict]):
+    """Llamado por la ingesta tras cada incremento (solo si el origen es "ingest")."""
+    if doc and KPI_STREAM_SOURCE == "ingest":
+        hub.publish_kpis(artist_id, _format_kpi_response(artist_id, doc))
+
+async def _watch_kpi_changes():
+    resume_token = None
+    while True:
+        try:
+            db = get_db()
+            pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+            async with db[ArtistKPIDAO.COLLECTION].watch(
+                pipeline, full_document="updateLookup", resume_after=resume_token
+            ) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    doc = change.get("fullDocument")
+                    if doc and doc.get("artistId"):
+                        hub.publish_kpis(doc["artistId"], _format_kpi_response(doc["artistId"], doc))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"KPI change stream error, retrying: {e}")
+            await asyncio.sleep(5)
+
+def start_kpi_change_stream():
+    global _change_stream_task
+    if KPI_STREAM_SOURCE != "changestream":
+        return
+    if _change_stream_task is None or _change_stream_task.done():
+        _change_stream_task = asyncio.create_task(_watch_kpi_changes())
+
+async def stop_kpi_change_stream():
+    global _change_stream_task
+    if _change_stream_task is not None:
+        _change_stream_task.cancel()
+        try:
+            await _change_stream_task
+        except asyncio.CancelledError:
+            pass
+        _change_stream_task = None
+
+@router.get("/stats/artist/{artist_id}/kpis/stream")
+async def stream_artist_kpis(request: Request, artist_id: str):
+    _check_capacity()
+    doc = await ArtistKPIDAO.get_by_artist(artist_id)
+    initial = _format_kpi_response(artist_id, doc or {})
+    # los deltas de este cliente se miden desde el snapshot que recibe, no desde el de otros suscriptores
+    return _sse_response(request, "kpis", str(artist_id), "kpis", initial, baseline=initial)
+
+@router.get("/stats/trending/stream")
+async def stream_trending(request: Request, genre: Optional[str] = None, period: str = "week", limit: int = 10):
+    genre_param = (genre or "").strip().lower()
+    key = _trending_key(genre_param, period, limit)
+    _check_capacity()
+    with deadline.deadline_scope(REQUEST_DEADLINE):
+        entry = await _get_cached_body(key, lambda: _compute_trending(genre_param, period, limit))
+    return _sse_response(request, "cache", key, "trending", {"key": key, "etag": entry.etag, "items": entry.value()})
+
 # ============================================================
 # ENDPOINTS 
 # ============================================================
@@ -306,6 +808,7 @@ async def get_artist_kpis(artist_id: str, start_date: Optional[str] = Query(None
 
     if start or end:
         agg = await EventDAO.aggregate_for_artist(artist_id, start, end)
+        agg = await _merge_cold_artist_kpis(artist_id, start, end, agg)
         return _format_kpi_response(artist_id, agg)
     
     doc = await ArtistKPIDAO.get_by_artist(artist_id)
@@ -313,6 +816,37 @@ async def get_artist_kpis(artist_id: str, start_date: Optional[str] = Query(None
         return {"artistId": artist_id, "plays": 0, "likes": 0, "follows": 0, "purchases": 0, "revenue": 0.0}
     return _format_kpi_response(artist_id, doc)
 
+async def _merge_cold_artist_kpis(artist_id: str, start: Optional[datetime], end: Optional[datetime], hot: dict) -> dict:
+    """Suma el archivo frío cuando el rango empieza antes de la marca de agua."""
+    boundary = ColdEventDAO.archived_before()
+    if boundary is None or (start and to_utc_naive(start) >= boundary):
+        return hot
+    if end and to_utc_naive(end) < boundary:
+        # todo el rango está en frío: mismo límite inclusivo ($lte) que la consulta a Mongo
+        cold = await ColdEventDAO.aggregate_for_artist(artist_id, start, end)
+    else:
+        # se corta en la marca de agua: los eventos desde ese instante siguen en Mongo
+        cold = await ColdEventDAO.aggregate_for_artist(artist_id, start, boundary, end_inclusive=False)
+    if not cold:
+        return hot
+    return {k: (hot.get(k) or 0) + (cold.get(k) or 0) for k in ("plays", "likes", "follows", "purchases", "revenue")}
+
+async def _trending_rows(db, build_pipeline, event_type: str, since: datetime, limit: int, with_album: bool = False) -> list:
+    boundary = ColdEventDAO.archived_before()
+    if boundary is None or to_utc_naive(since) >= boundary:
+        return await db["events"].aggregate(build_pipeline(since, limit)).to_list(length=limit)
+
+    # el periodo llega al archivo frío: conteos completos de ambos niveles y top-k tras sumar
+    hot = await db["events"].aggregate(build_pipeline(since, None)).to_list(length=None)
+    cold = await ColdEventDAO.count_by_entity(event_type, since, boundary, with_album)
+    merged: Dict[Any, dict] = {}
+    for row in cold + hot:
+        current = merged.setdefault(row["_id"], {"_id": row["_id"], "count": 0})
+        current["count"] += row.get("count", 0)
+        if with_album and not current.get("albumId"):
+            current["albumId"] = row.get("albumId")
+    return sorted(merged.values(), key=lambda r: r["count"], reverse=True)[:limit]
+
 def _format_kpi_response(artist_id: str, data: dict) -> dict:
     return {
         "artistId": data.get("artistId", artist_id),
@@ -323,41 +857,289 @@ def _format_kpi_response(artist_id: str, data: dict) -> dict:
         "revenue": float(data.get("revenue", 0.0))
     }
 
-@router.get("/stats/trending")
-async def get_trending(genre: Optional[str] = None, period: str = "week", limit: int = 10):
-    genre_param = (genre or "").strip().lower()
-    key = f"trending:{genre_param}:{period}:{limit}"
+# ============================================================
+# SERIES TEMPORALES (buckets pre-agregados + LTTB)
+# ============================================================
+TIMESERIES_MAX_POINTS = int(os.getenv("TIMESERIES_MAX_POINTS", "1000"))
+# buckets que se rellenan antes de LTTB (a resolución diaria, 20000 ≈ 55 años)
+TIMESERIES_MAX_BUCKETS = int(os.getenv("TIMESERIES_MAX_BUCKETS", "20000"))
+
+@router.get("/stats/artist/{artist_id}/timeseries")
+async def get_artist_timeseries(
+    artist_id: str,
+    metric: str = "plays",
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    points: int = Query(100, ge=3)
+):
+    if metric not in LEADERBOARD_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(LEADERBOARD_METRICS)}")
+    try:
+        end = to_utc_naive(datetime.fromisoformat(to_date)) if to_date else to_utc_naive(datetime.now(timezone.utc))
+        start = to_utc_naive(datetime.fromisoformat(from_date)) if from_date else end - timedelta(days=7)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid date format (ISO)")
+    if start >= end:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    points = min(points, TIMESERIES_MAX_POINTS)
+
+    resolution = pick_resolution(start, end, points)
+    # se comprueba antes de consultar: fill_gaps crea una entrada por bucket en el event loop
+    if bucket_count(start, end, resolution) > TIMESERIES_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range too long: more than {TIMESERIES_MAX_BUCKETS} {resolution} buckets")
+    rows = await KPIBucketDAO.get_range(artist_id, resolution, metric, start, end)
+    series = lttb(fill_gaps(rows, start, end, resolution, TIMESERIES_MAX_BUCKETS), points)
+    return {
+        "artistId": artist_id,
+        "metric": metric,
+        "resolution": resolution,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "points": [{"t": ts.isoformat(), "v": value} for ts, value in series]
+    }
+
+# ============================================================
+# DASHBOARD DE ARTISTA
+# ============================================================
+DASHBOARD_DEFAULT_DAYS = int(os.getenv("DASHBOARD_DEFAULT_DAYS", "30"))
+# los rangos relativos ("últimos N días") se recalculan como mucho cada DASHBOARD_CACHE_SECONDS
+DASHBOARD_CACHE_SECONDS = int(os.getenv("DASHBOARD_CACHE_SECONDS", "60"))
+
+def _format_dashboard(artist_id: str, start: datetime, end: datetime, row: dict) -> dict:
+    kpis = _format_kpi_response(artist_id, (row.get("kpis") or [{}])[0])
+    listeners = row.get("listeners") or []
+    kpis["uniqueListeners"] = listeners[0]["count"] if listeners else 0
+    return {
+        "artistId": artist_id,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "kpis": kpis,
+        "topTracks": [
+            {"trackId": r["_id"].get("trackId"), "albumId": r["_id"].get("albumId"), "plays": r["plays"]}
+            for r in row.get("topTracks", [])
+        ],
+        "genres": [{"genre": r["_id"], "count": r["count"]} for r in row.get("genres", [])],
+        "recentActivity": [
+            {**r, "timestamp": r["timestamp"].isoformat() if isinstance(r.get("timestamp"), datetime) else r.get("timestamp")}
+            for r in row.get("recentActivity", [])
+        ]
+    }
+
+@router.get("/stats/artist/{artist_id}/dashboard")
+async def get_artist_dashboard(
+    request: Request,
+    artist_id: str,
+    start_date: Optional[str] = Query(None, alias="startDate"),
+    end_date: Optional[str] = Query(None, alias="endDate"),
+    top: int = Query(10, ge=1, le=50),
+    recent: int = Query(20, ge=1, le=100)
+):
+    """KPIs, top tracks, géneros y actividad reciente en una sola agregación ($facet) cacheada."""
+    try:
+        start_arg = to_utc_naive(datetime.fromisoformat(start_date)) if start_date else None
+        end_arg = to_utc_naive(datetime.fromisoformat(end_date)) if end_date else None
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid date format (ISO)")
+    if start_arg and end_arg and start_arg >= end_arg:
+        raise HTTPException(status_code=400, detail="startDate must be before endDate")
+
+    # fechas explícitas -> clave estable; rango relativo -> clave por franja de DASHBOARD_CACHE_SECONDS
+    slot = int(time.time() // DASHBOARD_CACHE_SECONDS) if not end_arg else ""
+    key = f"dashboard:{artist_id}:{start_arg.isoformat() if start_arg else ''}:{end_arg.isoformat() if end_arg else ''}:{slot}:{top}:{recent}"
 
     async def _compute():
-        since = datetime.now(timezone.utc) - timedelta(days=_get_days_from_period(period))
-        db = get_db()
+        end = end_arg or to_utc_naive(datetime.now(timezone.utc))
+        start = start_arg or end - timedelta(days=DASHBOARD_DEFAULT_DAYS)
+        row = await EventDAO.artist_dashboard(artist_id, start, end, top, recent)
+        return _format_dashboard(artist_id, start, end, row)
 
-        if genre_param == "tracks":
-            return await _compute_trending_tracks(db, since, limit)
-        elif genre_param == "artists":
-            return await _compute_trending_artists(db, since, limit)
+    with deadline.deadline_scope(REQUEST_DEADLINE) as budget:
+        entry = await _get_cached_body(key, _compute)
+    return _cached_response(request, entry, budget)
+
+# ============================================================
+# KPIs EN BLOQUE Y LEADERBOARD
+# ============================================================
+BULK_KPI_MAX_IDS = int(os.getenv("BULK_KPI_MAX_IDS", "200"))
+
+def _parse_ids(raw: List[str]) -> List[str]:
+    # admite ?ids=1,2,3 y ?ids=1&ids=2; conserva el orden y elimina duplicados
+    seen = {}
+    for chunk in raw or []:
+        for part in str(chunk).split(","):
+            part = part.strip()
+            if part:
+                seen.setdefault(part, None)
+    return list(seen)
+
+def _encode_cursor(value: Any, artist_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value, artist_id]).encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        value, artist_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(value, (int, float)):
+            raise ValueError("bad cursor value")
+        return value, str(artist_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/stats/artists/kpis")
+async def get_artists_kpis(ids: List[str] = Query(..., description="IDs de artista separados por comas")):
+    artist_ids = _parse_ids(ids)
+    if not artist_ids:
+        raise HTTPException(status_code=400, detail="ids is required")
+    if len(artist_ids) > BULK_KPI_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Too many ids (max {BULK_KPI_MAX_IDS})")
+    docs = await ArtistKPIDAO.get_many(artist_ids)
+    return [_format_kpi_response(aid, docs.get(aid, {})) for aid in artist_ids]
+
+@router.get("/stats/artists/leaderboard")
+async def get_artists_leaderboard(
+    metric: str = "plays",
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    if metric not in LEADERBOARD_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(LEADERBOARD_METRICS)}")
+    after = _decode_cursor(cursor) if cursor else None
+    rows = await ArtistKPIDAO.leaderboard(metric, limit, after)
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last.get(metric), last.get("artistId"))
+    return {
+        "metric": metric,
+        "items": [_format_kpi_response(r.get("artistId"), r) for r in rows],
+        "nextCursor": next_cursor
+    }
+
+def _format_content_kpis(id_field: str, row: dict) -> dict:
+    item = {id_field: row.get(id_field), "artistId": row.get("artistId")}
+    if id_field == "trackId":
+        item["albumId"] = row.get("albumId")
+    item.update({m: int(row.get(m, 0)) for m in CONTENT_METRICS})
+    return item
+
+def _check_content_metric(metric: str):
+    if metric not in CONTENT_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(CONTENT_METRICS)}")
+
+@router.get("/stats/artist/{artist_id}/top-tracks")
+async def get_artist_top_tracks(artist_id: str, metric: str = "plays", limit: int = Query(10, ge=1, le=100)):
+    _check_content_metric(metric)
+    rows = await TrackKPIDAO.top_by_artist(artist_id, metric, limit)
+    return {"artistId": artist_id, "metric": metric, "items": [_format_content_kpis("trackId", r) for r in rows]}
+
+@router.get("/stats/artist/{artist_id}/top-albums")
+async def get_artist_top_albums(artist_id: str, metric: str = "plays", limit: int = Query(10, ge=1, le=100)):
+    _check_content_metric(metric)
+    rows = await AlbumKPIDAO.top_by_artist(artist_id, metric, limit)
+    return {"artistId": artist_id, "metric": metric, "items": [_format_content_kpis("albumId", r) for r in rows]}
+
+def _decode_content_cursor(cursor: str, key_size: int) -> tuple:
+    """Cursor de track_kpis/album_kpis: [valor, [campos de la clave]]."""
+    try:
+        value, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(value, (int, float)) or not isinstance(key, list) or len(key) != key_size:
+            raise ValueError("bad cursor")
+        return value, [str(k) for k in key]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _content_leaderboard(dao, metric: str, limit: int, cursor: Optional[str]) -> dict:
+    _check_content_metric(metric)
+    after = _decode_content_cursor(cursor, len(dao.KEY_FIELDS)) if cursor else None
+    rows = await dao.leaderboard(metric, limit, after)
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last.get(metric), dao.key_of(last))
+    return {
+        "metric": metric,
+        "items": [_format_content_kpis(dao.ID_FIELD, r) for r in rows],
+        "nextCursor": next_cursor
+    }
+
+@router.get("/stats/tracks/leaderboard")
+async def get_tracks_leaderboard(metric: str = "plays", limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None):
+    return await _content_leaderboard(TrackKPIDAO, metric, limit, cursor)
+
+@router.get("/stats/albums/leaderboard")
+async def get_albums_leaderboard(metric: str = "plays", limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None):
+    return await _content_leaderboard(AlbumKPIDAO, metric, limit, cursor)
+
+@router.get("/stats/trending")
+async def get_trending(request: Request, genre: Optional[str] = None, period: str = "week", limit: int = 10):
+    genre_param = (genre or "").strip().lower()
+    key = _trending_key(genre_param, period, limit)
+
+    with deadline.deadline_scope(REQUEST_DEADLINE) as budget:
+        entry = await _get_cached_body(key, lambda: _compute_trending(genre_param, period, limit))
+    return _cached_response(request, entry, budget)
+
+async def _compute_trending(genre_param: str, period: str, limit: int) -> list:
+    if period == "all" and genre_param == "tracks":
+        # ranking histórico: lectura del índice de track_kpis en vez de agrupar eventos
+        rows = await TrackKPIDAO.leaderboard("plays", limit)
+        rows = [{"_id": r["trackId"], "albumId": r.get("albumId"), "count": r.get("plays", 0)} for r in rows]
+        return await _enrich_within_deadline(rows, _fetch_track_data)
+
+    since = datetime.now(timezone.utc) - timedelta(days=_get_days_from_period(period))
+    db = get_analytics_db()
+
+    if genre_param == "tracks":
+        return await _compute_trending_tracks(db, since, limit)
+    elif genre_param == "artists":
+        return await _compute_trending_artists(db, since, limit)
+    return []
+
+async def _enrich_within_deadline(rows: list, enrich: Callable[[httpx.AsyncClient, dict], Coroutine[Any, Any, Optional[dict]]]) -> list:
+    """Enriquece filas en paralelo; al agotarse el deadline devuelve las ya resueltas (en orden) y marca parcial."""
+    if not rows:
         return []
+    sem = asyncio.Semaphore(ENRICH_CONCURRENCY)
+    async with httpx.AsyncClient() as client:
+        async def _one(row):
+            async with sem:
+                return await enrich(client, row)
 
-    return await _get_cached(key, _compute)
+        tasks = [asyncio.create_task(_one(r)) for r in rows]
+        try:
+            rem = deadline.remaining()
+            done, pending = await asyncio.wait(tasks, timeout=max(0.0, rem) if rem is not None else None)
+            if pending:
+                deadline.mark_partial()
+        finally:
+            for t in tasks:
+                if not t.done():
+                    t.cancel()
+            # que terminen de deshacerse antes de cerrar el cliente (si no, transporte cerrado / tarea destruida)
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-async def _compute_trending_tracks(db, since: datetime, limit: int) -> list:
-    pipeline = _build_track_pipeline(since, limit)
-    rows = await db["events"].aggregate(pipeline).to_list(length=limit)
     results = []
-    async with httpx.AsyncClient() as client:
-        for r in rows:
-            track_data = await _fetch_track_data(client, r)
-            if track_data:
-                results.append(track_data)
+    for t in tasks:
+        if t not in done:
+            continue
+        if t.exception() is not None:
+            # fila no enriquecida (breaker abierto, bulkhead lleno, deadline...): se omite
+            deadline.mark_partial()
+            continue
+        if t.result():
+            results.append(t.result())
     return results
 
+async def _compute_trending_tracks(db, since: datetime, limit: int) -> list:
+    rows = await _trending_rows(db, _build_track_pipeline, EVENT_TRACK_PLAYED, since, limit, with_album=True)
+    return await _enrich_within_deadline(rows, _fetch_track_data)
+
 async def _fetch_track_data(client: httpx.AsyncClient, row: dict) -> Optional[dict]:
     track_id = row.get("_id")
     album_id = row.get("albumId")
     if not album_id:
         return None
     try:
-        resp = await http_get_with_cb(client, f"{CONTENT_SERVICE_URL}/api/albums/{album_id}", timeout=5)
+        resp = await http_get_with_cb(client, f"{CONTENT_SERVICE_URL}/api/albums/{album_id}", route="album", timeout=5)
         if resp.status_code != 200:
             return None
         album = resp.json()
@@ -381,20 +1163,13 @@ async def _fetch_track_data(client: httpx.AsyncClient, row: dict) -> Optional[di
     return None
 
 async def _compute_trending_artists(db, since: datetime, limit: int) -> list:
-    pipeline = _build_artist_pipeline(since, limit)
-    rows = await db["events"].aggregate(pipeline).to_list(length=limit)
-    results = []
-    async with httpx.AsyncClient() as client:
-        for r in rows:
-            artist_data = await _fetch_artist_data(client, r)
-            if artist_data:
-                results.append(artist_data)
-    return results
+    rows = await _trending_rows(db, _build_artist_pipeline, EVENT_ARTIST_FOLLOWED, since, limit)
+    return await _enrich_within_deadline(rows, _fetch_artist_data)
 
 async def _fetch_artist_data(client: httpx.AsyncClient, row: dict) -> Optional[dict]:
     aid = row.get("_id")
     try:
-        resp = await http_get_with_cb(client, f"{CONTENT_SERVICE_URL}/api/artists/{aid}", timeout=5)
+        resp = await http_get_with_cb(client, f"{CONTENT_SERVICE_URL}/api/artists/{aid}", route="artist", timeout=5)
         if resp.status_code != 200:
             return None
         artist = resp.json()
@@ -413,12 +1188,12 @@ async def _fetch_artist_data(client: httpx.AsyncClient, row: dict) -> Optional[d
     return None
 
 @router.get("/recommendations/user/{user_id}")
-async def recommend_for_user(user_id: str, limit: int = 20):
+async def recommend_for_user(request: Request, user_id: str, limit: int = 20):
     key = f"userrec:{user_id}:{limit}"
 
     async def _compute():
         pipeline = _build_user_genre_pipeline(user_id)
-        db = get_db()
+        db = get_analytics_db()
         rows = await db["events"].aggregate(pipeline).to_list(length=5)
         genres = [r.get("_id") for r in rows if r.get("_id")]
         results = await _fetch_albums_by_genres(genres, limit)
@@ -426,62 +1201,23 @@ async def recommend_for_user(user_id: str, limit: int = 20):
             results = await _fallback_popular_artists(limit)
         return results[:limit]
 
-    return await _get_cached(key, _compute)
+    with deadline.deadline_scope(REQUEST_DEADLINE) as budget:
+        entry = await _get_cached_body(key, _compute)
+    return _cached_response(request, entry, budget)
 
 async def _fetch_albums_by_genres(genres: list, limit: int) -> list:
+    if not genres or not await _ensure_catalog():
+        return []
     results = []
-    async with httpx.AsyncClient() as client:
-        for r in rows:
-            eid = r.get("_id")
-            count = r.get("count", 0)
-            entry = {"id": eid, "count": count, "type": None, "title": None, "artist": None, "albumId": None, "albumTitle": None}
-
-            if not eid:
-                enriched.append(entry)
-                continue
-
-            # Caso pista con formato "albumId_trackId" o "albumId_trackIndex"
-            if "_" in str(eid):
-                try:
-                    album_id, track_key = str(eid).split("_", 1)
-                    resp = await http_get_with_cb(client, f"{CONTENT_SERVICE_URL}/api/albums/{album_id}", timeout=5)
-                    if resp.status_code == 200:
-                        album = resp.json()
-                        tracks = album.get("tracks", []) or []
-                        # buscar por id o por índice
-                        track_obj = next((t for t in tracks if str(t.get("id")) == str(track_key) or str(t.get("_id")) == str(track_key)), None)
-                        if not track_obj and track_key.isdigit():
-                            idx = int(track_key) - 1
-                            if 0 <= idx < len(tracks):
-                                track_obj = tracks[idx]
-                        if track_obj:
-                            entry.update({
-                                "type": "track",
-                                "title": track_obj.get("title") or track_obj.get("name"),
-                                "artist": album.get("artist") or album.get("artistName"),
-                                "albumId": album_id,
-                                "albumTitle": album.get("title") or album.get("name")
-                            })
-                            enriched.append(entry)
-                            continue
-                except HTTPException:
-                    raise
-                except Exception:
-                    pass
-
-            # Intentar resolver como álbum
-            try:
-                resp = await http_get_with_cb(client, f"{CONTENT_SERVICE_URL}/api/albums?genre={g}&limit={limit}", timeout=5)
-                if resp.status_code == 200:
-                    for it in resp.json()[:limit]:
-                        results.append({"id": it.get("_id") or it.get("id"), "type": "album", "reason": f"genre:{g}", "score": 1.0})
-            except HTTPException:
-                raise
-            except Exception:
-                pass
+    for g in genres:
+        for it in _catalog.albums_for_genre(g, limit):
+            results.append({"id": it.get("_id") or it.get("id"), "type": "album", "reason": f"genre:{g}", "score": 1.0})
     return results
 
 async def _fallback_popular_artists(limit: int) -> list:
+    return await _get_cached(_popular_key(limit), lambda: _compute_popular_artists(limit))
+
+async def _compute_popular_artists(limit: int) -> list:
     top = await EventDAO.aggregate_by_entity("artist", since=None, limit=limit)
     return [{"id": t.get("_id"), "type": "artist", "reason": "popular", "score": t.get("count", 0)} for t in top]
 
@@ -491,55 +1227,23 @@ async def recommend_similar(
     exclude_id: Optional[str] = Query(None, alias="excludeId", description="ID de álbum a excluir"),
     limit: int = 10
 ):
-    url = f"{CONTENT_SERVICE_URL}/api/albums"
-    params = {"genre": genre}
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await http_get_with_cb(client, url, params=params, timeout=10.0)
-        except HTTPException:
-            raise
-        except Exception:
-            raise HTTPException(status_code=502, detail="Content service error")
-    if resp.status_code != 200:
-        raise HTTPException(status_code=502, detail="Content service error")
-
-    items = resp.json() or []
-    return _filter_similar_results(items, exclude_id, genre, limit)
-
-def _filter_similar_results(items: list, exclude_id: Optional[str], genre: str, limit: int) -> list:
-    results = []
-    for item in items:
-        item_id = item.get("id") or item.get("_id")
-        if not item_id:
-            continue
-        if exclude_id and str(item_id) == str(exclude_id):
-            continue
-        results.append({
-            "id": item_id,
-            "type": "album",
-            "title": item.get("title") or item.get("name"),
-            "coverImage": item.get("coverImage"),
-            "artist": item.get("artist"),
-            "reason": f"genre:{genre}",
-            "score": 1.0
-        })
-        if len(results) >= limit:
-            break
-    return results
+    if not await _ensure_catalog():
+        raise HTTPException(status_code=503, detail="Album catalog unavailable")
+    # se pide uno más por si el excluido está entre los primeros
+    items = _catalog.albums_for_genre(genre, limit + 1 if exclude_id else limit)
+    # con pocos elementos el viaje al pool cuesta más que el filtrado: se hace en el loop
+    return await cpu_pool.offload(cpu_jobs.filter_similar_results, items, exclude_id, genre, limit, size=len(items))
 
 @router.get("/stats/cb/status")
 async def cb_status():
-    def _attr(obj, *names):
-        for n in names:
-            if hasattr(obj, n):
-                v = getattr(obj, n)
-                return v.name if hasattr(v, "name") else v
-        return None
-
+    status = content_resilience_status()
+    breakers = status["breakers"].values()
+    states = [b["state"].lower() for b in breakers]
+    # resumen de nivel superior compatible con el formato anterior (un único breaker)
+    overall = "open" if "open" in states else ("half_open" if "half_open" in states else "closed")
     return {
-        "state": str(_attr(content_cb, "state", "current_state", "_state")),
-        "fail_count": _attr(content_cb, "fail_counter", "failure_count", "fail_count", "_fail_counter", "_fail_count"),
-        "fail_max": _attr(content_cb, "fail_max", "_fail_max"),
-        "reset_timeout": _attr(content_cb, "reset_timeout", "timeout_duration", "_reset_timeout"),
-        "opened_at": str(getattr(content_cb, "_opened_at", None)) if getattr(content_cb, "_opened_at", None) else None
-    }
\ No newline at end of file
+        "state": overall.upper(),
+        "fail_count": sum(b["fail_count"] or 0 for b in breakers),
+        "fail_max": next(iter(breakers))["fail_max"] if breakers else None,
+        **status
+    }
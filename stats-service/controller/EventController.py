@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Request, BackgroundTasks, HTTPException
-from typing import Any, Dict
-from datetime import datetime
+from typing import Any, Dict, Optional
+from datetime import datetime, timezone
+from bson import ObjectId
 import os
 import httpx
 
@@ -9,39 +10,199 @@ import httpx
 from model.factory.EventFactory import EventFactory
 from model.dao.EventDAO import EventDAO
 from model.dao.ArtistKPIDAO import ArtistKPIDAO
+from model.dao.KPIBucketDAO import KPIBucketDAO
+from model.dao.ContentKPIDAO import TrackKPIDAO, AlbumKPIDAO
+from model.dao.EventKeyDAO import EventKeyDAO, IDEMPOTENCY_TTL_SECONDS
 from config.db import get_db
-from controller.ArtistKPIController import notify_artist_alert
+from controller.ArtistKPIController import notify_artist_alert, publish_kpi_update
+from utils.admission import admission
+from utils.bloom import RotatingBloomFilter
 
 router = APIRouter()
 
+# ============================================================
+# IDEMPOTENCIA
+# ============================================================
+# Claves vistas por este proceso; 0 = sin filtro (solo el índice único de event_keys)
+IDEMPOTENCY_BLOOM_CAPACITY = int(os.getenv("IDEMPOTENCY_BLOOM_CAPACITY", "1000000"))
+# falsos positivos del filtro: cuestan una lectura de event_keys, nunca un evento perdido
+IDEMPOTENCY_BLOOM_ERROR_RATE = float(os.getenv("IDEMPOTENCY_BLOOM_ERROR_RATE", "0.000001"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 128
+# una reserva `pending` más antigua que esto se da por abandonada (el proceso cayó antes de insertar)
+IDEMPOTENCY_PENDING_SECONDS = float(os.getenv("IDEMPOTENCY_PENDING_SECONDS", "30"))
+
+# rota cada medio TTL: una clave se recuerda como mucho durante IDEMPOTENCY_TTL_HOURS
+_seen_keys: Optional[RotatingBloomFilter] = (
+    RotatingBloomFilter(IDEMPOTENCY_BLOOM_CAPACITY, IDEMPOTENCY_BLOOM_ERROR_RATE, IDEMPOTENCY_TTL_SECONDS / 2)
+    if IDEMPOTENCY_BLOOM_CAPACITY > 0 else None
+)
+_idempotency_stats = {"keyed": 0, "inserted": 0, "duplicates": 0, "bloom_hits": 0,
+                      "bloom_false_positives": 0, "in_progress": 0, "taken_over": 0}
+
+def _idempotency_key(request: Request, payload: Dict[str, Any]) -> Optional[str]:
+    key = payload.get("eventId")
+    if key is None:
+        key = request.headers.get("idempotency-key")
+    if key is None:
+        return None
+    key = str(key).strip()
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail=f"eventId / Idempotency-Key must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters")
+    return key
+
+def _claim_age(claim: Dict[str, Any]) -> float:
+    claimed_at = claim.get("claimedAt")
+    if claimed_at is None:
+        return float("inf")
+    if claimed_at.tzinfo is None:
+        claimed_at = claimed_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - claimed_at).total_seconds()
+
+async def _resolve_existing_claim(key: str, claim: Dict[str, Any], event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Decide sobre una clave ya reservada: respuesta de duplicado, o None si esta petición se queda la reserva."""
+    if claim.get("state") != "pending":
+        _idempotency_stats["duplicates"] += 1
+        if _seen_keys is not None:
+            _seen_keys.add(key)
+        original = claim.get("eventId")
+        return {"duplicate": True, "id": str(original) if original is not None else None}
+
+    if _claim_age(claim) < IDEMPOTENCY_PENDING_SECONDS:
+        # la petición original sigue en curso (o acaba de caer): el cliente reintenta más tarde
+        _idempotency_stats["in_progress"] += 1
+        raise HTTPException(status_code=409, detail="Event with this key is being processed",
+                            headers={"Retry-After": str(max(1, int(IDEMPOTENCY_PENDING_SECONDS)))})
+
+    # reserva abandonada: si el evento llegó a insertarse solo faltaba marcarla
+    if await EventDAO.exists(claim.get("eventId"), claim.get("timestamp")):
+        await EventKeyDAO.mark_done(key)
+        return await _resolve_existing_claim(key, {**claim, "state": "done"}, event)
+    if not await EventKeyDAO.take_over(key, claim, event["_id"], event.get("timestamp")):
+        _idempotency_stats["in_progress"] += 1
+        raise HTTPException(status_code=409, detail="Event with this key is being processed",
+                            headers={"Retry-After": "1"})
+    _idempotency_stats["taken_over"] += 1
+    return None
+
+async def _insert_keyed_event(key: str, event: Dict[str, Any]) -> Dict[str, Any]:
+    """Inserta el evento solo si la clave es nueva; `duplicate` indica que ya se había recibido."""
+    _idempotency_stats["keyed"] += 1
+    # el _id se fija antes para que la clave apunte al evento que se va a insertar
+    event["_id"] = ObjectId()
+    event["eventId"] = key
+
+    claim = None
+    if _seen_keys is not None and key in _seen_keys:
+        # un acierto del filtro puede ser un falso positivo: se confirma siempre contra event_keys
+        _idempotency_stats["bloom_hits"] += 1
+        claim = await EventKeyDAO.get(key)
+        if claim is None:
+            _idempotency_stats["bloom_false_positives"] += 1
+    # sin acierto del filtro la clave casi seguro es nueva: se reserva directamente, sin lectura previa
+    if claim is None:
+        claim = await EventKeyDAO.claim(key, event["_id"], event.get("timestamp"))
+    if claim is not None:
+        result = await _resolve_existing_claim(key, claim, event)
+        if result is not None:
+            return result
+
+    try:
+        inserted_id = await EventDAO.insert_event(event)
+    except Exception:
+        # sin evento no debe quedar la clave: el reintento del cliente tiene que poder entrar
+        try:
+            await EventKeyDAO.release(key, event["_id"])
+        except Exception:
+            pass
+        raise
+    # si falla (o el proceso cae antes), la reserva `pending` se resuelve después comprobando `events`
+    try:
+        await EventKeyDAO.mark_done(key)
+    except Exception:
+        pass
+    _idempotency_stats["inserted"] += 1
+    if _seen_keys is not None:
+        _seen_keys.add(key)
+    return {"duplicate": False, "id": inserted_id}
+
+def idempotency_info() -> Dict[str, Any]:
+    return {
+        **_idempotency_stats,
+        "ttl_seconds": IDEMPOTENCY_TTL_SECONDS,
+        "bloom": _seen_keys.info() if _seen_keys is not None else None
+    }
+
+def _kpi_increments(event_type: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+    if event_type == "track.played":
+        return {"plays": 1}
+    if event_type == "track.liked":
+        return {"likes": 1}
+    if event_type == "artist.followed":
+        return {"follows": 1}
+    if event_type == "order.paid":
+        return {"purchases": 1, "revenue": float(meta.get("price", 0) or 0)}
+    return {}
+
+def _content_increments(event_type: str) -> Dict[str, Any]:
+    # contadores por track/álbum: sin follows (son de artista) ni revenue
+    if event_type == "track.played":
+        return {"plays": 1}
+    if event_type == "track.liked":
+        return {"likes": 1}
+    if event_type == "order.paid":
+        return {"purchases": 1}
+    return {}
+
+async def _process_event_for_content_kpis(event: Dict[str, Any], meta: Dict[str, Any]):
+    increments = _content_increments(event.get("eventType"))
+    if not increments:
+        return
+    entity_type = event.get("entityType")
+    track_id = event.get("entityId") if entity_type == "track" else meta.get("trackId")
+    album_id = event.get("entityId") if entity_type == "album" else meta.get("albumId")
+    artist_id = meta.get("artistId") or meta.get("artist")
+    # un trackId solo identifica al track dentro de su álbum
+    if track_id and album_id:
+        await TrackKPIDAO.increment({"albumId": album_id, "trackId": track_id}, increments, {"artistId": artist_id})
+    if album_id:
+        await AlbumKPIDAO.increment({"albumId": album_id}, increments, {"artistId": artist_id})
+
 async def _process_event_for_kpis(event: Dict[str, Any]):
-    et = event.get("eventType")
     meta = event.get("metadata") or {}
+    await _process_event_for_content_kpis(event, meta)
     artist_id = event.get("entityId") or meta.get("artistId") or meta.get("artist")
     if not artist_id:
         return
-    if et == "track.played":
-        await ArtistKPIDAO.upsert_increment(str(artist_id), {"plays": 1})
-    elif et == "track.liked":
-        await ArtistKPIDAO.upsert_increment(str(artist_id), {"likes": 1})
-    elif et == "artist.followed":
-        await ArtistKPIDAO.upsert_increment(str(artist_id), {"follows": 1})
-    elif et == "order.paid":
-        price = float(meta.get("price", 0) or 0)
-        await ArtistKPIDAO.upsert_increment(str(artist_id), {"purchases": 1, "revenue": price})
+    increments = _kpi_increments(event.get("eventType"), meta)
+    if not increments:
+        return
+    doc = await ArtistKPIDAO.upsert_increment(str(artist_id), increments)
+    publish_kpi_update(str(artist_id), doc)
+    await KPIBucketDAO.increment(str(artist_id), event.get("timestamp") or datetime.now(timezone.utc), increments)
 
 #tarea GA04-29-H12.2 legada
 # POST /stats/events
 @router.post("/stats/events", status_code=202)
 async def ingest_event(request: Request, background_tasks: BackgroundTasks):
+    # con el loop retrasado o trabajo de fondo acumulado se frena al cliente (429/503 + Retry-After)
+    admission.check_ingest()
     payload = await request.json()
     if not payload or "eventType" not in payload or "timestamp" not in payload:
         raise HTTPException(status_code=400, detail="Invalid event payload")
+    key = _idempotency_key(request, payload)
     try:
         event_model = EventFactory.create(payload)
-        inserted_id = await EventDAO.insert_event(event_model.dict())
-        # process KPIs in background
-        background_tasks.add_task(_process_event_for_kpis, event_model.dict())
+        event = event_model.dict()
+        if key is not None:
+            result = await _insert_keyed_event(key, event)
+            if result["duplicate"]:
+                # reintento de un evento ya recibido: misma respuesta, sin KPIs ni alertas
+                return {"accepted": True, "id": result["id"], "duplicate": True}
+            inserted_id = result["id"]
+        else:
+            inserted_id = await EventDAO.insert_event(event)
+        # process KPIs in background (solo para eventos realmente insertados)
+        background_tasks.add_task(admission.track("kpi", _process_event_for_kpis), event_model.dict())
 
         # schedule an alert check in background for relevant events (non-blocking)
         try:
@@ -49,12 +210,15 @@ async def ingest_event(request: Request, background_tasks: BackgroundTasks):
             if et in ("track.played", "track.liked", "artist.followed"):
                 meta = payload.get("metadata") or {}
                 artist_id = payload.get("entityId") or meta.get("artistId") or meta.get("artist")
-                if artist_id:
-                    background_tasks.add_task(notify_artist_alert, str(artist_id))
+                # la comprobación de alertas es prescindible: se omite si el servicio va degradado
+                if artist_id and admission.allow_optional("alerts"):
+                    background_tasks.add_task(admission.track("alerts", notify_artist_alert), str(artist_id))
         except Exception:
             # keep ingestion robust: swallow alert-scheduling errors
             pass
 
         return {"accepted": True, "id": inserted_id}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
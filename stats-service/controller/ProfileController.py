@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+import asyncio
+
+from middleware.rate_limit import is_service_caller
+from middleware.profiling import list_profiles, profile_path
+
+router = APIRouter()
+
+def _require_service_key(request: Request):
+    if not is_service_caller(request):
+        raise HTTPException(status_code=403, detail="Service API key required")
+
+# ============================================================
+# ENDPOINTS
+# ============================================================
+@router.get("/stats/admin/profiles")
+async def get_profiles(request: Request, limit: int = 20):
+    _require_service_key(request)
+    profiles = await asyncio.to_thread(list_profiles)
+    return {"profiles": profiles[:limit]}
+
+@router.get("/stats/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(request: Request, profile_id: str):
+    """Pilas plegadas (`pila;de;llamadas muestras`), válidas para flamegraph.pl o speedscope."""
+    _require_service_key(request)
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(await asyncio.to_thread(path.read_text, encoding="utf-8"))
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, HTTPException, Request
+from typing import Optional, Dict, Any
+from datetime import datetime, timezone
+import asyncio
+import logging
+
+from config.db import get_db
+from middleware.rate_limit import is_service_caller
+from utils.snapshot import create_snapshot, load_manifest
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+_snapshot_task: Optional[asyncio.Task] = None
+_last_run: Dict[str, Any] = {}
+
+def _require_service_key(request: Request):
+    if not is_service_caller(request):
+        raise HTTPException(status_code=403, detail="Service API key required")
+
+async def _run_snapshot(full: bool):
+    _last_run.clear()
+    _last_run.update({"state": "running", "full": full, "started_at": datetime.now(timezone.utc).isoformat()})
+    try:
+        entry = await create_snapshot(get_db(), full=full)
+        _last_run.update({"state": "done", "snapshot": entry})
+        logger.info(f"Snapshot {entry['id']} created")
+    except Exception as e:
+        _last_run.update({"state": "failed", "error": str(e)})
+        logger.error(f"Snapshot failed: {e}")
+    finally:
+        _last_run["finished_at"] = datetime.now(timezone.utc).isoformat()
+
+# ============================================================
+# ENDPOINTS
+# ============================================================
+@router.post("/stats/admin/snapshot", status_code=202)
+async def start_snapshot(request: Request, full: bool = False):
+    global _snapshot_task
+    _require_service_key(request)
+    if _snapshot_task is not None and not _snapshot_task.done():
+        raise HTTPException(status_code=409, detail="Snapshot already running")
+    _snapshot_task = asyncio.create_task(_run_snapshot(full))
+    return {"started": True, "full": full}
+
+@router.get("/stats/admin/snapshot")
+async def snapshot_status(request: Request, limit: int = 10):
+    _require_service_key(request)
+    manifest = await asyncio.to_thread(load_manifest)
+    return {
+        "last_run": _last_run or None,
+        "snapshots": manifest["snapshots"][-limit:]
+    }
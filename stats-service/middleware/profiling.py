@@ -0,0 +1,212 @@
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from contextvars import ContextVar
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from middleware.rate_limit import is_service_caller
+from utils.logger import get_logger
+
+logger = get_logger("profiling")
+
+# Perfilado bajo demanda: solo para llamadas con service key que envían `x-profile: 1` o `?_profile=1`.
+# El resto de peticiones solo paga la comprobación de la cabecera.
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR") or Path(__file__).resolve().parents[1] / "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+_AWAITING = "(awaiting)"
+
+_session: ContextVar[Optional["RequestProfiler"]] = ContextVar("profile_session", default=None)
+_factory_lock = threading.Lock()
+_active_sessions = 0
+_previous_factory = None
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({Path(code.co_filename).name})"
+
+def _task_factory(loop, coro, **kwargs):
+    # las tareas hijas creadas durante una petición perfilada se muestrean con ella
+    if _previous_factory is not None:
+        task = _previous_factory(loop, coro, **kwargs)
+    else:
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+    profiler = _session.get()
+    if profiler is not None:
+        profiler.add_task(task)
+    return task
+
+def _coro_stack(coro) -> List[str]:
+    """Pila de una corrutina suspendida: de la más externa a la que espera (Mongo, HTTP, sleep...)."""
+    stack = []
+    obj = coro
+    while obj is not None:
+        frame = getattr(obj, "cr_frame", None) or getattr(obj, "gi_frame", None) or getattr(obj, "ag_frame", None)
+        if frame is not None:
+            stack.append(_label(frame))
+        nxt = getattr(obj, "cr_await", None) or getattr(obj, "gi_yieldfrom", None) or getattr(obj, "ag_await", None)
+        if nxt is None:
+            break
+        obj = nxt
+    stack.append(_AWAITING)
+    return stack
+
+def _running_stack(coro, thread_frame) -> Optional[List[str]]:
+    """Pila real del hilo del loop (incluye llamadas síncronas) recortada a la corrutina de la tarea."""
+    root = getattr(coro, "cr_frame", None)
+    stack = []
+    frame = thread_frame
+    while frame is not None:
+        stack.append(_label(frame))
+        if frame is root:
+            stack.reverse()
+            return stack
+        frame = frame.f_back
+    return None
+
+class RequestProfiler:
+    """Perfilador por muestreo de las tareas de una petición, en formato de pilas plegadas (flamegraph)."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float, max_seconds: float):
+        self.loop = loop
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._tasks = []
+        self._tasks_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._loop_thread = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._started = 0.0
+        self.elapsed_ms = 0.0
+
+    def add_task(self, task: asyncio.Task):
+        with self._tasks_lock:
+            self._tasks.append(task)
+
+    def _sample(self):
+        thread_frame = sys._current_frames().get(self._loop_thread)
+        running = asyncio.current_task(self.loop)
+        with self._tasks_lock:
+            tasks = list(self._tasks)
+        for task in tasks:
+            if task.done():
+                continue
+            coro = task.get_coro()
+            stack = None
+            if task is running and thread_frame is not None:
+                stack = _running_stack(coro, thread_frame)
+            if stack is None:
+                stack = _coro_stack(coro)
+            self.samples[";".join([f"task:{task.get_name()}"] + stack)] += 1
+        self.sample_count += 1
+
+    def _run(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval):
+            if time.monotonic() > deadline:
+                return
+            try:
+                self._sample()
+            except Exception:
+                # una carrera con el loop (tarea terminando) solo pierde esta muestra
+                pass
+
+    def start(self):
+        global _active_sessions, _previous_factory
+        with _factory_lock:
+            if _active_sessions == 0:
+                _previous_factory = self.loop.get_task_factory()
+                self.loop.set_task_factory(_task_factory)
+            _active_sessions += 1
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        """Detiene el muestreo; puede llamarse más de una vez."""
+        global _active_sessions, _previous_factory
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self.elapsed_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        with _factory_lock:
+            _active_sessions -= 1
+            if _active_sessions == 0:
+                self.loop.set_task_factory(_previous_factory)
+                _previous_factory = None
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+def _safe_name(request: Request) -> str:
+    path = request.url.path.strip("/").replace("/", "_") or "root"
+    return "".join(c if c.isalnum() or c in "_-." else "-" for c in path)[:80]
+
+def _store(profile_id: str, content: str):
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    (PROFILE_DIR / f"{profile_id}.folded").write_text(content, encoding="utf-8")
+    old = sorted(PROFILE_DIR.glob("*.folded"))[:-PROFILE_KEEP]
+    for p in old:
+        p.unlink(missing_ok=True)
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    path = PROFILE_DIR / f"{profile_id}.folded"
+    if path.parent != PROFILE_DIR or not path.exists():
+        return None
+    return path
+
+def list_profiles() -> List[str]:
+    if not PROFILE_DIR.exists():
+        return []
+    return [p.stem for p in sorted(PROFILE_DIR.glob("*.folded"), reverse=True)]
+
+async def profiling_middleware(request: Request, call_next):
+    if not (request.headers.get("x-profile") == "1" or request.query_params.get("_profile") == "1"):
+        return await call_next(request)
+    if not is_service_caller(request):
+        # el flag se ignora sin service key: la petición sigue su curso normal
+        return await call_next(request)
+
+    profiler = RequestProfiler(asyncio.get_running_loop(), PROFILE_INTERVAL_MS / 1000, PROFILE_MAX_SECONDS)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    profile_id = f"{stamp}-{request.method.lower()}-{_safe_name(request)}"
+    profiler.start()
+    # la tarea actual (el middleware) solo espera a call_next: se muestrean las que se crean dentro
+    token = _session.set(profiler)
+    try:
+        response = await call_next(request)
+    except BaseException:
+        profiler.stop()
+        raise
+    finally:
+        _session.reset(token)
+
+    async def body():
+        # con BaseHTTPMiddleware el cuerpo se genera al consumirlo: se reenvía trozo a trozo
+        # (SSE, /stats/export) y el perfil se cierra cuando termina o el cliente se desconecta
+        try:
+            async for chunk in response.body_iterator:
+                yield chunk
+        finally:
+            profiler.stop()
+            try:
+                await asyncio.to_thread(_store, profile_id, profiler.folded())
+            except Exception as e:
+                logger.warning("profile_store_failed", error=str(e))
+            logger.info("request_profiled", profile_id=profile_id, samples=profiler.sample_count, duration_ms=profiler.elapsed_ms)
+
+    # las cabeceras salen antes que el cuerpo: solo se añade el id (las muestras van al log)
+    profiled = StreamingResponse(body(), status_code=response.status_code)
+    profiled.raw_headers = list(response.raw_headers) + [(b"x-profile-id", profile_id.encode())]
+    return profiled
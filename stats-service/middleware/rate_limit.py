@@ -1,15 +1,168 @@
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 from starlette.requests import Request
+from starlette.responses import JSONResponse
+from cachetools import LRUCache
+from typing import Optional, Tuple
+import hmac
+import math
 import os
+import time
 
-# Límites configurables por env
-DEFAULT_LIMIT = os.getenv("RATE_LIMIT_DEFAULT")
-STRICT_LIMIT = os.getenv("RATE_LIMIT_STRICT")
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # el backend Redis es opcional
+    aioredis = None
 
-# Usar IP real del cliente
-limiter = Limiter(key_func=get_remote_address, default_limits=[DEFAULT_LIMIT])
+from utils.logger import get_logger
 
-def get_limiter() -> Limiter:
-    return limiter
\ No newline at end of file
+logger = get_logger("rate_limit")
+
+# Límites configurables por env, formato "<peticiones>/<second|minute|hour>".
+# Se traducen a un token bucket: capacidad = peticiones, recarga = peticiones / periodo.
+DEFAULT_LIMIT = os.getenv("RATE_LIMIT_DEFAULT") or "100/minute"
+SERVICE_LIMIT = os.getenv("RATE_LIMIT_SERVICE") or "10000/minute"
+STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI")  # redis://... para compartir estado entre workers
+SERVICE_API_KEY = os.getenv("SERVICE_API_KEY")
+EXEMPT_PATHS = ("/healthz", "/readyz")
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+def parse_limit(limit: str) -> Tuple[float, float]:
+    """'100/minute' -> (rate por segundo, capacidad)."""
+    count, _, period = limit.partition("/")
+    seconds = _PERIODS.get(period.strip().lower().rstrip("s"), 60)
+    burst = float(count)
+    return burst / seconds, burst
+
+# Token bucket atómico en Redis; el reloj es el del propio servidor Redis
+_REDIS_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+class TokenBucketLimiter:
+    """Token bucket O(1) por clave, en memoria del proceso o en un servidor compatible con Redis."""
+
+    def __init__(self, storage_uri: Optional[str] = None, max_keys: int = 100_000):
+        self._buckets: LRUCache = LRUCache(maxsize=max_keys)
+        self._redis = None
+        self._script = None
+        self.backend = "memory"
+        if storage_uri:
+            if aioredis is None:
+                logger.warning("rate_limit_redis_unavailable", detail="redis package not installed, using memory")
+            else:
+                self._redis = aioredis.from_url(storage_uri)
+                self._script = self._redis.register_script(_REDIS_SCRIPT)
+                self.backend = "redis"
+        if self._redis is None:
+            # sin almacén compartido el límite efectivo es RATE_LIMIT_DEFAULT × número de workers
+            logger.info("rate_limit_per_process", detail="set RATE_LIMIT_STORAGE_URI to share limits across workers")
+        # métricas de decisión
+        self.decisions = 0
+        self.rejected = 0
+        self.errors = 0
+        self._decision_ns_total = 0
+        self._decision_ns_max = 0
+
+    def _take_memory(self, key: str, rate: float, burst: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = burst
+        else:
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        return allowed, tokens
+
+    async def _take_redis(self, key: str, rate: float, burst: float) -> Tuple[bool, float]:
+        allowed, tokens = await self._script(keys=[f"ratelimit:{key}"], args=[rate, burst])
+        return bool(int(allowed)), float(tokens)
+
+    async def hit(self, key: str, rate: float, burst: float) -> Tuple[bool, float]:
+        """Consume un token; devuelve (permitido, segundos hasta el siguiente token)."""
+        started = time.perf_counter_ns()
+        try:
+            if self._redis is not None:
+                allowed, tokens = await self._take_redis(key, rate, burst)
+            else:
+                allowed, tokens = self._take_memory(key, rate, burst)
+        except Exception as e:
+            # si el almacén compartido falla se deja pasar la petición: el limitador no debe tumbar el servicio
+            self.errors += 1
+            logger.warning("rate_limit_storage_error", error=str(e))
+            allowed, tokens = True, 0.0
+        elapsed = time.perf_counter_ns() - started
+        self.decisions += 1
+        self._decision_ns_total += elapsed
+        self._decision_ns_max = max(self._decision_ns_max, elapsed)
+        if not allowed:
+            self.rejected += 1
+        retry_after = 0.0 if allowed else (1 - tokens) / rate
+        return allowed, retry_after
+
+    def info(self) -> dict:
+        avg_us = (self._decision_ns_total / self.decisions / 1000) if self.decisions else 0.0
+        return {
+            "backend": self.backend,
+            "scope": "shared" if self._redis is not None else "per_process",
+            "decisions": self.decisions,
+            "rejected": self.rejected,
+            "storage_errors": self.errors,
+            "decision_avg_us": round(avg_us, 2),
+            "decision_max_us": round(self._decision_ns_max / 1000, 2),
+        }
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+
+limiter = TokenBucketLimiter(STORAGE_URI)
+_DEFAULT_RATE, _DEFAULT_BURST = parse_limit(DEFAULT_LIMIT)
+_SERVICE_RATE, _SERVICE_BURST = parse_limit(SERVICE_LIMIT)
+
+def is_service_caller(request: Request) -> bool:
+    # mismo criterio que verifyServiceKey.js en los servicios Node
+    key = request.headers.get("x-service-api-key") or request.query_params.get("_service_key")
+    # compare_digest con str solo admite ASCII: se comparan bytes para que una clave no ASCII sea un 401, no un 500
+    return bool(SERVICE_API_KEY and key and hmac.compare_digest(key.encode("utf-8"), SERVICE_API_KEY.encode("utf-8")))
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+async def rate_limit_middleware(request: Request, call_next):
+    if request.url.path in EXEMPT_PATHS:
+        return await call_next(request)
+
+    ip = _client_ip(request)
+    if is_service_caller(request):
+        allowed, retry_after = await limiter.hit(f"svc:{ip}", _SERVICE_RATE, _SERVICE_BURST)
+    else:
+        allowed, retry_after = await limiter.hit(f"ip:{ip}", _DEFAULT_RATE, _DEFAULT_BURST)
+
+    if not allowed:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Rate limit exceeded"},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+    return await call_next(request)
+
+def get_limiter() -> TokenBucketLimiter:
+    return limiter
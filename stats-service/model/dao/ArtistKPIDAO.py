@@ -1,19 +1,128 @@
-from typing import Dict, Any, Optional
-from config.db import get_db
+from typing import Dict, Any, List, Optional
+from cachetools import TTLCache
+from pymongo import ReturnDocument
+from config.db import get_db, get_analytics_db
+import os
+
+# Contadores por los que se puede ordenar el leaderboard (cada uno con su índice)
+LEADERBOARD_METRICS = ("plays", "likes", "follows", "purchases", "revenue")
+
+KPI_PROJECTION = {"_id": 0, "artistId": 1, "plays": 1, "likes": 1, "follows": 1, "purchases": 1, "revenue": 1}
+
+# Caché read-through de documentos KPI. La ingesta la actualiza en el mismo momento en que
+# incrementa; el TTL solo acota el desfase con otros workers que también escriben.
+KPI_CACHE_MAX_SIZE = int(os.getenv("KPI_CACHE_MAX_SIZE", "10000"))
+KPI_CACHE_TTL = int(os.getenv("KPI_CACHE_TTL", "30"))
+
+_MISSING = object()
+_kpi_cache: TTLCache = TTLCache(maxsize=KPI_CACHE_MAX_SIZE, ttl=KPI_CACHE_TTL)
+# versión por artista: una lectura lenta no puede pisar un valor más nuevo escrito por la ingesta
+_kpi_versions: TTLCache = TTLCache(maxsize=KPI_CACHE_MAX_SIZE, ttl=KPI_CACHE_TTL)
+_kpi_stats = {"hits": 0, "misses": 0}
+
+def _cache_get(artist_id: str):
+    value = _kpi_cache.get(artist_id, None)
+    if value is None:
+        _kpi_stats["misses"] += 1
+        return None
+    _kpi_stats["hits"] += 1
+    return value
+
+def _cache_fill(artist_id: str, doc: Optional[Dict[str, Any]], version: int):
+    if _kpi_versions.get(artist_id, 0) == version:
+        _kpi_cache[artist_id] = doc if doc is not None else _MISSING
+
+def _cache_write(artist_id: str, doc: Optional[Dict[str, Any]]):
+    _kpi_versions[artist_id] = _kpi_versions.get(artist_id, 0) + 1
+    _kpi_cache[artist_id] = doc if doc is not None else _MISSING
+
+def _public(value) -> Optional[Dict[str, Any]]:
+    return None if value is _MISSING else dict(value)
+
+def kpi_cache_info() -> Dict[str, Any]:
+    return {
+        "current_size": len(_kpi_cache),
+        "max_size": _kpi_cache.maxsize,
+        "ttl_seconds": _kpi_cache.ttl,
+        **_kpi_stats
+    }
+
+def clear_kpi_cache():
+    _kpi_cache.clear()
+    _kpi_versions.clear()
 
 class ArtistKPIDAO:
     COLLECTION = "artist_kpis"
 
     @staticmethod
     async def get_by_artist(artist_id: str) -> Optional[Dict[str, Any]]:
+        aid = str(artist_id)
+        cached = _cache_get(aid)
+        if cached is not None:
+            return _public(cached)
+        version = _kpi_versions.get(aid, 0)
+        db = get_db()
+        doc = await db[ArtistKPIDAO.COLLECTION].find_one({"artistId": aid}, KPI_PROJECTION)
+        _cache_fill(aid, doc, version)
+        return dict(doc) if doc else None
+
+    @staticmethod
+    async def get_many(artist_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Una sola consulta $in para los artistas que no están en caché; devuelve {artistId: doc}."""
+        ids = [str(a) for a in artist_ids]
+        found: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for aid in ids:
+            cached = _cache_get(aid)
+            if cached is None:
+                missing.append(aid)
+            elif cached is not _MISSING:
+                found[aid] = dict(cached)
+        if not missing:
+            return found
+
+        versions = {aid: _kpi_versions.get(aid, 0) for aid in missing}
         db = get_db()
-        return await db[ArtistKPIDAO.COLLECTION].find_one({"artistId": str(artist_id)})
+        cursor = db[ArtistKPIDAO.COLLECTION].find({"artistId": {"$in": missing}}, KPI_PROJECTION)
+        docs = {d["artistId"]: d for d in await cursor.to_list(length=len(missing))}
+        for aid in missing:
+            _cache_fill(aid, docs.get(aid), versions[aid])
+        found.update({aid: dict(d) for aid, d in docs.items()})
+        return found
+
+    @staticmethod
+    async def leaderboard(metric: str, limit: int = 20, after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """Top de artistas por contador con paginación keyset sobre (metric desc, artistId asc)."""
+        if metric not in LEADERBOARD_METRICS:
+            raise ValueError(f"Unsupported metric: {metric}")
+        db = get_analytics_db()
+        query: Dict[str, Any] = {metric: {"$gt": 0}}
+        if after is not None:
+            last_value, last_artist = after
+            query = {"$or": [
+                {metric: {"$gt": 0, "$lt": last_value}},
+                {metric: last_value, "artistId": {"$gt": str(last_artist)}}
+            ]}
+        cursor = (
+            db[ArtistKPIDAO.COLLECTION]
+            .find(query, KPI_PROJECTION)
+            .sort([(metric, -1), ("artistId", 1)])
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
 
     @staticmethod
     async def upsert_increment(artist_id: str, increments: Dict[str, Any]):
+        aid = str(artist_id)
         db = get_db()
-        update = {"$inc": {}, "$setOnInsert": {"artistId": str(artist_id)}}
+        # siempre con acuse (write concern por defecto): se necesita el documento resultante
+        update = {"$inc": {}, "$setOnInsert": {"artistId": aid}}
         for k, v in increments.items():
             update["$inc"][k] = v
-        await db[ArtistKPIDAO.COLLECTION].update_one({"artistId": str(artist_id)}, update, upsert=True)
-        return await ArtistKPIDAO.get_by_artist(artist_id)
\ No newline at end of file
+        # una sola ida y vuelta: el documento resultante actualiza la caché en el sitio
+        doc = await db[ArtistKPIDAO.COLLECTION].find_one_and_update(
+            {"artistId": aid}, update, projection=KPI_PROJECTION,
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+        _cache_write(aid, doc)
+        return dict(doc) if doc else None
@@ -0,0 +1,213 @@
+from typing import Dict, Any, List, Optional, Tuple
+from pathlib import Path
+import asyncio
+import datetime
+import json
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # el archivo frío es opcional: sin pyarrow solo se usa MongoDB
+    pa = pc = pq = None
+
+from utils.timeseries import to_utc_naive
+
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR") or Path(__file__).resolve().parents[2] / "archive") / "events"
+MANIFEST_FILE = "_manifest.json"
+
+# ((inodo, mtime_ns), marca de agua) del último manifiesto leído; se relee solo si cambia en disco.
+# El inodo cambia en cada reemplazo atómico aunque el mtime no avance (dos escrituras en el mismo tick)
+_manifest_cache: Optional[Tuple[Tuple[int, int], Optional[datetime.datetime]]] = None
+
+_TS_TYPE = pa.timestamp("ms", tz="UTC") if pa else None
+SCHEMA = pa.schema([
+    ("_id", pa.string()),
+    ("eventType", pa.string()),
+    ("timestamp", _TS_TYPE),
+    ("userId", pa.string()),
+    ("anonymous", pa.bool_()),
+    ("entityType", pa.string()),
+    ("entityId", pa.string()),
+    ("artistId", pa.string()),
+    ("artist", pa.string()),
+    ("albumId", pa.string()),
+    ("genre", pa.string()),
+    ("price", pa.float64()),
+    ("metadata", pa.string()),
+]) if pa else None
+
+def _str_or_none(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+def _flatten(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Aplana un evento de Mongo a las columnas del archivo (metadata completa como JSON)."""
+    meta = doc.get("metadata") or {}
+    price = meta.get("price")
+    try:
+        price = float(price) if price is not None else None
+    except (TypeError, ValueError):
+        price = None
+    return {
+        "_id": str(doc.get("_id")),
+        "eventType": doc.get("eventType"),
+        "timestamp": doc.get("timestamp"),
+        "userId": _str_or_none(doc.get("userId")),
+        "anonymous": bool(doc.get("anonymous")) if doc.get("anonymous") is not None else None,
+        "entityType": _str_or_none(doc.get("entityType")),
+        "entityId": _str_or_none(doc.get("entityId")),
+        "artistId": _str_or_none(meta.get("artistId")),
+        "artist": _str_or_none(meta.get("artist")),
+        "albumId": _str_or_none(meta.get("albumId")),
+        "genre": _str_or_none(meta.get("genre")),
+        "price": price,
+        "metadata": json.dumps(meta, default=str) if meta else None,
+    }
+
+def _as_utc(dt: datetime.datetime) -> datetime.datetime:
+    return to_utc_naive(dt).replace(tzinfo=datetime.timezone.utc)
+
+class ColdEventDAO:
+    """Eventos antiguos en ficheros Parquet particionados por día (date=YYYY-MM-DD)."""
+
+    @staticmethod
+    def available() -> bool:
+        return pa is not None and ARCHIVE_DIR.exists()
+
+    @staticmethod
+    def archived_before() -> Optional[datetime.datetime]:
+        """Marca de agua: los eventos anteriores a esta fecha viven en el archivo frío.
+
+        Se llama en cada petición con rango: el manifiesto se cachea y solo se vuelve a leer
+        cuando cambia su mtime (archive_events lo reemplaza de forma atómica).
+        """
+        global _manifest_cache
+        if pa is None:
+            return None
+        manifest = ARCHIVE_DIR / MANIFEST_FILE
+        try:
+            st = manifest.stat()
+        except OSError:
+            _manifest_cache = None
+            return None
+        version = (st.st_ino, st.st_mtime_ns)
+        if _manifest_cache is not None and _manifest_cache[0] == version:
+            return _manifest_cache[1]
+        try:
+            data = json.loads(manifest.read_text(encoding="utf-8"))
+            value = to_utc_naive(datetime.datetime.fromisoformat(data["archivedBefore"]))
+        except Exception:
+            value = None
+        _manifest_cache = (version, value)
+        return value
+
+    @staticmethod
+    def set_archived_before(ts: datetime.datetime):
+        ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+        manifest = ARCHIVE_DIR / MANIFEST_FILE
+        tmp = manifest.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"archivedBefore": to_utc_naive(ts).isoformat()}), encoding="utf-8")
+        os.replace(tmp, manifest)
+
+    @staticmethod
+    def write_batch(day: datetime.date, docs: List[Dict[str, Any]]) -> Path:
+        """Escribe un lote; el nombre depende del primer _id, así reintentar sobrescribe en vez de duplicar."""
+        if pa is None:
+            raise RuntimeError("pyarrow is required to write the cold archive")
+        partition = ARCHIVE_DIR / f"date={day.isoformat()}"
+        partition.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pylist([_flatten(d) for d in docs], schema=SCHEMA)
+        target = partition / f"part-{docs[0]['_id']}.parquet"
+        tmp = target.with_suffix(".tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, target)
+        return target
+
+    @staticmethod
+    def _files(start: Optional[datetime.datetime], end: Optional[datetime.datetime]) -> List[Path]:
+        first = to_utc_naive(start).date() if start else None
+        last = to_utc_naive(end).date() if end else None
+        files = []
+        for partition in sorted(ARCHIVE_DIR.glob("date=*")):
+            day = datetime.date.fromisoformat(partition.name[len("date="):])
+            if (first and day < first) or (last and day > last):
+                continue
+            files.extend(sorted(partition.glob("*.parquet")))
+        return files
+
+    @staticmethod
+    def _read(columns: List[str], start, end, event_types: Optional[List[str]] = None, end_inclusive: bool = False):
+        files = ColdEventDAO._files(start, end)
+        if not files:
+            return None
+        # poda de columnas + memory-map: solo se leen las columnas que usa la agregación
+        expr = None
+        if start:
+            expr = pc.field("timestamp") >= pa.scalar(_as_utc(start), _TS_TYPE)
+        if end:
+            bound = pa.scalar(_as_utc(end), _TS_TYPE)
+            cond = pc.field("timestamp") <= bound if end_inclusive else pc.field("timestamp") < bound
+            expr = cond if expr is None else expr & cond
+        if event_types:
+            cond = pc.field("eventType").isin(event_types)
+            expr = cond if expr is None else expr & cond
+        tables = [pq.read_table(f, columns=columns, filters=expr, memory_map=True) for f in files]
+        return pa.concat_tables(tables)
+
+    @staticmethod
+    def _aggregate_for_artist_sync(artist_id: str, start, end, end_inclusive: bool) -> Dict[str, Any]:
+        table = ColdEventDAO._read(["eventType", "timestamp", "entityId", "artistId", "artist", "price"], start, end,
+                                   end_inclusive=end_inclusive)
+        if table is None or table.num_rows == 0:
+            return {}
+        aid = str(artist_id)
+        mask = pc.or_kleene(
+            pc.or_kleene(pc.equal(table["entityId"], aid), pc.equal(table["artistId"], aid)),
+            pc.equal(table["artist"], aid)
+        )
+        table = table.filter(mask)
+        counts = {r["values"]: r["counts"] for r in pc.value_counts(table["eventType"]).to_pylist()}
+        paid = table.filter(pc.equal(table["eventType"], "order.paid"))
+        revenue = pc.sum(paid["price"]).as_py() if paid.num_rows else 0.0
+        return {
+            "plays": counts.get("track.played", 0),
+            "likes": counts.get("track.liked", 0),
+            "follows": counts.get("artist.followed", 0),
+            "purchases": counts.get("order.paid", 0),
+            "revenue": revenue or 0.0,
+        }
+
+    @staticmethod
+    def _count_by_entity_sync(event_type: str, since, until, with_album: bool) -> List[Dict[str, Any]]:
+        columns = ["eventType", "timestamp", "entityId"] + (["albumId"] if with_album else [])
+        table = ColdEventDAO._read(columns, since, until, [event_type])
+        if table is None or table.num_rows == 0:
+            return []
+        aggs = [("entityId", "count")] + ([("albumId", "max")] if with_album else [])
+        grouped = table.group_by("entityId").aggregate(aggs).to_pylist()
+        rows = []
+        for g in grouped:
+            row = {"_id": g["entityId"], "count": g["entityId_count"]}
+            if with_album:
+                row["albumId"] = g["albumId_max"]
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    async def aggregate_for_artist(artist_id: str, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                                   end_inclusive: bool = True) -> Dict[str, Any]:
+        """Mismo resultado que EventDAO.aggregate_for_artist sobre el archivo frío ([start, end], como en Mongo).
+
+        Con `end_inclusive=False` el rango es [start, end): para cortar en la marca de agua, cuyo instante ya está en Mongo.
+        """
+        if not ColdEventDAO.available():
+            return {}
+        return await asyncio.to_thread(ColdEventDAO._aggregate_for_artist_sync, artist_id, start, end, end_inclusive)
+
+    @staticmethod
+    async def count_by_entity(event_type: str, since: Optional[datetime.datetime], until: Optional[datetime.datetime], with_album: bool = False) -> List[Dict[str, Any]]:
+        """Conteos por entityId equivalentes a los pipelines de trending (sin $sort/$limit)."""
+        if not ColdEventDAO.available():
+            return []
+        return await asyncio.to_thread(ColdEventDAO._count_by_entity_sync, event_type, since, until, with_album)
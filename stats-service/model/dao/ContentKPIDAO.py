@@ -0,0 +1,150 @@
+from typing import Dict, Any, List, Optional
+from pymongo.errors import OperationFailure
+from config.db import get_analytics_db, get_ingest_db
+
+# Contadores materializados por track y por álbum (cada uno con su índice de ranking)
+CONTENT_METRICS = ("plays", "likes", "purchases")
+
+class _ContentKPIDAO:
+    """Contadores por entidad de catálogo que la ingesta incrementa; los rankings son lecturas de índice."""
+    COLLECTION: str = ""
+    ID_FIELD: str = ""
+    # campos que identifican la entidad (índice único); ID_FIELD es siempre el último
+    KEY_FIELDS: tuple = ()
+    # referencias que se guardan junto a los contadores
+    REF_FIELDS: tuple = ("artistId",)
+
+    @classmethod
+    def _projection(cls) -> Dict[str, int]:
+        return {"_id": 0, **{f: 1 for f in cls.KEY_FIELDS}, **{f: 1 for f in cls.REF_FIELDS}, **{m: 1 for m in CONTENT_METRICS}}
+
+    @classmethod
+    def _sort(cls, metric: str) -> List[tuple]:
+        return [(metric, -1)] + [(f, 1) for f in cls.KEY_FIELDS]
+
+    @classmethod
+    def key_of(cls, doc: Dict[str, Any]) -> List[Any]:
+        return [doc.get(f) for f in cls.KEY_FIELDS]
+
+    @classmethod
+    async def increment(cls, key: Dict[str, Any], increments: Dict[str, Any], fields: Optional[Dict[str, Any]] = None):
+        """`key` con todos los KEY_FIELDS (p. ej. {"albumId": ..., "trackId": ...} para un track)."""
+        if not increments:
+            return
+        if any(not key.get(f) for f in cls.KEY_FIELDS):
+            raise ValueError(f"{cls.COLLECTION} key requires {', '.join(cls.KEY_FIELDS)}")
+        update: Dict[str, Any] = {"$inc": dict(increments)}
+        refs = {k: str(v) for k, v in (fields or {}).items() if v}
+        if refs:
+            update["$set"] = refs
+        # no se lee el resultado: admite el write concern de ingesta
+        db = get_ingest_db()
+        await db[cls.COLLECTION].update_one({f: str(key[f]) for f in cls.KEY_FIELDS}, update, upsert=True)
+
+    @classmethod
+    async def top_by_artist(cls, artist_id: str, metric: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Top de un artista: índice {artistId: 1, <metric>: -1, <KEY_FIELDS>: 1}."""
+        if metric not in CONTENT_METRICS:
+            raise ValueError(f"Unsupported metric: {metric}")
+        db = get_analytics_db()
+        cursor = (
+            db[cls.COLLECTION]
+            .find({"artistId": str(artist_id), metric: {"$gt": 0}}, cls._projection())
+            .sort(cls._sort(metric))
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+    @classmethod
+    async def leaderboard(cls, metric: str, limit: int = 20, after: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """Ranking global con paginación keyset sobre (metric desc, KEY_FIELDS asc).
+
+        `after` = (valor de la métrica, [valores de KEY_FIELDS]) de la última fila de la página anterior.
+        """
+        if metric not in CONTENT_METRICS:
+            raise ValueError(f"Unsupported metric: {metric}")
+        db = get_analytics_db()
+        query: Dict[str, Any] = {metric: {"$gt": 0}}
+        if after is not None:
+            last_value, last_key = after
+            branches: List[Dict[str, Any]] = [{metric: {"$gt": 0, "$lt": last_value}}]
+            # misma métrica: comparación lexicográfica de la clave compuesta
+            for i, field in enumerate(cls.KEY_FIELDS):
+                branch: Dict[str, Any] = {metric: last_value}
+                branch.update({f: last_key[j] for j, f in enumerate(cls.KEY_FIELDS[:i])})
+                branch[field] = {"$gt": last_key[i]}
+                branches.append(branch)
+            query = {"$or": branches}
+        cursor = (
+            db[cls.COLLECTION]
+            .find(query, cls._projection())
+            .sort(cls._sort(metric))
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+    @classmethod
+    async def ensure_indexes(cls, db):
+        coll = db[cls.COLLECTION]
+        if len(cls.KEY_FIELDS) > 1:
+            # versiones anteriores: índice único solo sobre ID_FIELD, incompatible con la clave compuesta
+            try:
+                await coll.drop_index(f"{cls.ID_FIELD}_1")
+            except OperationFailure:
+                pass
+        keys = [(f, 1) for f in cls.KEY_FIELDS]
+        await coll.create_index(keys, unique=True)
+        for metric in CONTENT_METRICS:
+            await coll.create_index([(metric, -1)] + keys)
+            await coll.create_index([("artistId", 1), (metric, -1)] + keys)
+
+    @classmethod
+    def _key_exprs(cls) -> Dict[str, Any]:
+        """Expresión de agregación de cada KEY_FIELD a partir de un evento."""
+        raise NotImplementedError
+
+    @classmethod
+    def build_rebuild_pipeline(cls) -> List[Dict[str, Any]]:
+        """Reconstruye los contadores a partir de `events` con las mismas reglas que la ingesta."""
+        def _is(event_type):
+            return {"$cond": [{"$eq": ["$eventType", event_type]}, 1, 0]}
+
+        refs = {"artistId": {"$last": {"$ifNull": ["$metadata.artistId", "$metadata.artist"]}}}
+        return [
+            {"$match": {"eventType": {"$in": ["track.played", "track.liked", "order.paid"]}}},
+            {"$addFields": {f"_k_{f}": expr for f, expr in cls._key_exprs().items()}},
+            # sin clave completa no hay entidad (un track sin álbum no se puede distinguir)
+            {"$match": {f"_k_{f}": {"$nin": [None, ""]} for f in cls.KEY_FIELDS}},
+            {"$group": {
+                "_id": {f: {"$toString": f"$_k_{f}"} for f in cls.KEY_FIELDS},
+                **{f: refs[f] for f in cls.REF_FIELDS},
+                "plays": {"$sum": _is("track.played")},
+                "likes": {"$sum": _is("track.liked")},
+                "purchases": {"$sum": _is("order.paid")}
+            }},
+            {"$project": {"_id": 0, **{f: f"$_id.{f}" for f in cls.KEY_FIELDS},
+                          **{f: 1 for f in cls.REF_FIELDS}, **{m: 1 for m in CONTENT_METRICS}}},
+            {"$merge": {"into": cls.COLLECTION, "on": list(cls.KEY_FIELDS), "whenMatched": "replace", "whenNotMatched": "insert"}}
+        ]
+
+class TrackKPIDAO(_ContentKPIDAO):
+    """Los trackId solo son únicos dentro de un álbum: la clave es (albumId, trackId)."""
+    COLLECTION = "track_kpis"
+    ID_FIELD = "trackId"
+    KEY_FIELDS = ("albumId", "trackId")
+
+    @classmethod
+    def _key_exprs(cls) -> Dict[str, Any]:
+        return {
+            "albumId": "$metadata.albumId",
+            "trackId": {"$cond": [{"$eq": ["$entityType", "track"]}, "$entityId", "$metadata.trackId"]}
+        }
+
+class AlbumKPIDAO(_ContentKPIDAO):
+    COLLECTION = "album_kpis"
+    ID_FIELD = "albumId"
+    KEY_FIELDS = ("albumId",)
+
+    @classmethod
+    def _key_exprs(cls) -> Dict[str, Any]:
+        return {"albumId": {"$cond": [{"$eq": ["$entityType", "album"]}, "$entityId", "$metadata.albumId"]}}
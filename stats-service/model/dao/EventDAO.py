@@ -1,6 +1,6 @@
 from typing import Dict, Any, List, Optional
 from bson import ObjectId
-from config.db import get_db
+from config.db import get_db, get_analytics_db, get_ingest_db, EVENTS_STORAGE
 import datetime
 
 EVENT_TYPE_FIELD = "$eventType"
@@ -24,21 +24,70 @@ def _sanitize_doc(doc: dict) -> dict:
             clean[k] = v
     return clean
 
+def with_timeseries_meta(doc: dict) -> dict:
+    """En modo time-series agrupa por tipo de evento y artista en el metaField `meta`."""
+    meta = doc.get("metadata") or {}
+    artist = meta.get("artistId") or meta.get("artist")
+    if not artist and doc.get("entityType") == "artist":
+        artist = doc.get("entityId")
+    doc["meta"] = {"eventType": doc.get("eventType"), "artistId": str(artist) if artist else None}
+    return doc
+
 def _cond_eq_event(event_name: str, true_value=1, false_value=0):
     return {COND: [{EQ: [EVENT_TYPE_FIELD, event_name]}, true_value, false_value]}
 
+def _artist_match(artist_id: str, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None) -> dict:
+    """Eventos de un artista en [start, end]; cada rama del $or tiene su índice (campo, timestamp)."""
+    match: Dict[str, Any] = {
+        "$or": [
+            {"entityId": artist_id},
+            {"metadata.artistId": artist_id},
+            {"metadata.artist": artist_id}
+        ]
+    }
+    if start or end:
+        match["timestamp"] = {}
+        if start:
+            match["timestamp"]["$gte"] = start
+        if end:
+            match["timestamp"]["$lte"] = end
+    return match
+
+def _kpi_group() -> dict:
+    return {
+        "_id": None,
+        "plays": {"$sum": _cond_eq_event("track.played")},
+        "likes": {"$sum": _cond_eq_event("track.liked")},
+        "follows": {"$sum": _cond_eq_event("artist.followed")},
+        "purchases": {"$sum": _cond_eq_event("order.paid")},
+        "revenue": {"$sum": {COND: [{EQ: [EVENT_TYPE_FIELD, "order.paid"]}, METADATA_PRICE_FIELD, 0]}}
+    }
+
 class EventDAO:
     COLLECTION = "events"
 
     @staticmethod
     async def insert_event(doc: Dict[str, Any]) -> str:
-        db = get_db()
-        res = await db[EventDAO.COLLECTION].insert_one(_sanitize_doc(doc))
+        # el _id se genera en el cliente: existe aunque la escritura sea sin acuse (w=0)
+        db = get_ingest_db()
+        doc = _sanitize_doc(doc)
+        if EVENTS_STORAGE == "timeseries":
+            doc = with_timeseries_meta(doc)
+        res = await db[EventDAO.COLLECTION].insert_one(doc)
         return str(res.inserted_id)
 
     @staticmethod
-    async def aggregate_by_entity(entity_type: str, since: Optional[datetime.datetime] = None, limit: int = 10):
+    async def exists(event_id: Any, timestamp: Optional[datetime.datetime] = None) -> bool:
+        """Lectura en el primario (sin retraso de réplica); el timestamp acota los buckets en time-series."""
+        query: Dict[str, Any] = {"_id": event_id}
+        if timestamp is not None:
+            query["timestamp"] = timestamp
         db = get_db()
+        return await db[EventDAO.COLLECTION].find_one(query, {"_id": 1}) is not None
+
+    @staticmethod
+    async def aggregate_by_entity(entity_type: str, since: Optional[datetime.datetime] = None, limit: int = 10):
+        db = get_analytics_db()
         match = {"entityType": entity_type}
         if since:
             match["timestamp"] = {"$gte": since}
@@ -52,31 +101,50 @@ class EventDAO:
 
     @staticmethod
     async def aggregate_for_artist(artist_id: str, start: Optional[datetime.datetime]=None, end: Optional[datetime.datetime]=None):
-        db = get_db()
-        match = {
-            "$or": [
-                {"entityId": artist_id},
-                {"metadata.artistId": artist_id},
-                {"metadata.artist": artist_id}
-            ]
-        }
-        if start or end:
-            match["timestamp"] = {}
-            if start:
-                match["timestamp"]["$gte"] = start
-            if end:
-                match["timestamp"]["$lte"] = end
-
+        db = get_analytics_db()
         pipeline = [
-            {"$match": match},
-            {"$group": {
-                "_id": None,
-                "plays": {"$sum": _cond_eq_event("track.played")},
-                "likes": {"$sum": _cond_eq_event("track.liked")},
-                "follows": {"$sum": _cond_eq_event("artist.followed")},
-                "purchases": {"$sum": _cond_eq_event("order.paid")},
-                "revenue": {"$sum": {COND: [{EQ: [EVENT_TYPE_FIELD, "order.paid"]}, METADATA_PRICE_FIELD, 0]}}
+            {"$match": _artist_match(artist_id, start, end)},
+            {"$group": _kpi_group()}
+        ]
+        rows = await db[EventDAO.COLLECTION].aggregate(pipeline).to_list(length=1)
+        return rows[0] if rows else {}
+
+    @staticmethod
+    def build_dashboard_pipeline(artist_id: str, start: datetime.datetime, end: datetime.datetime, top: int, recent: int) -> List[Dict[str, Any]]:
+        """Un solo $match indexado y todas las secciones del dashboard en un $facet."""
+        return [
+            {"$match": _artist_match(artist_id, start, end)},
+            {"$facet": {
+                "kpis": [{"$group": _kpi_group()}],
+                "listeners": [
+                    {"$match": {"eventType": "track.played", "userId": {"$ne": None}}},
+                    {"$group": {"_id": "$userId"}},
+                    {"$count": "count"}
+                ],
+                "topTracks": [
+                    {"$match": {"eventType": "track.played"}},
+                    # misma clave que track_kpis: un trackId se repite entre álbumes
+                    {"$group": {"_id": {"albumId": "$metadata.albumId", "trackId": "$entityId"}, "plays": {"$sum": 1}}},
+                    {"$sort": {"plays": -1, "_id.albumId": 1, "_id.trackId": 1}},
+                    {"$limit": top}
+                ],
+                "genres": [
+                    {"$match": {"metadata.genre": {"$nin": [None, ""]}}},
+                    {"$group": {"_id": "$metadata.genre", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1, "_id": 1}},
+                    {"$limit": 10}
+                ],
+                "recentActivity": [
+                    {"$sort": {"timestamp": -1}},
+                    {"$limit": recent},
+                    {"$project": {"_id": 0, "eventType": 1, "entityType": 1, "entityId": 1, "timestamp": 1, "anonymous": 1}}
+                ]
             }}
         ]
+
+    @staticmethod
+    async def artist_dashboard(artist_id: str, start: datetime.datetime, end: datetime.datetime, top: int = 10, recent: int = 20) -> Dict[str, Any]:
+        db = get_analytics_db()
+        pipeline = EventDAO.build_dashboard_pipeline(artist_id, start, end, top, recent)
         rows = await db[EventDAO.COLLECTION].aggregate(pipeline).to_list(length=1)
         return rows[0] if rows else {}
\ No newline at end of file
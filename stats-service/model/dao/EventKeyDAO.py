@@ -0,0 +1,73 @@
+import os
+from typing import Any, Dict, Optional
+from datetime import datetime, timezone
+from pymongo import WriteConcern
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from config.db import get_db
+
+# Tiempo durante el que se reconoce un reintento con la misma clave
+IDEMPOTENCY_TTL_SECONDS = int(float(os.getenv("IDEMPOTENCY_TTL_HOURS", "48")) * 3600)
+
+class EventKeyDAO:
+    """Claves de idempotencia de la ingesta: `_id` = eventId / Idempotency-Key del cliente.
+
+    Es una colección aparte porque `events` puede ser time-series, que no admite índices únicos;
+    el índice único de `_id` es el que decide qué evento entra. Caducan con un índice TTL.
+
+    La reserva y la inserción del evento son dos escrituras: la clave nace `pending` y pasa a `done`
+    tras insertar. Una `pending` antigua (el proceso cayó entre ambas) se comprueba contra `events`.
+    """
+    COLLECTION = "event_keys"
+
+    @staticmethod
+    def _collection():
+        coll = get_db()[EventKeyDAO.COLLECTION]
+        # detectar el duplicado necesita el acuse del servidor aunque la base vaya con w=0
+        if not coll.write_concern.acknowledged:
+            coll = coll.with_options(write_concern=WriteConcern(w=1))
+        return coll
+
+    @staticmethod
+    async def get(key: str) -> Optional[Dict[str, Any]]:
+        return await EventKeyDAO._collection().find_one({"_id": key})
+
+    @staticmethod
+    async def claim(key: str, event_id: Any, timestamp: Any) -> Optional[Dict[str, Any]]:
+        """Reserva la clave (estado `pending`) para `event_id`. None si es nueva; si ya existía, su documento."""
+        coll = EventKeyDAO._collection()
+        now = datetime.now(timezone.utc)
+        try:
+            await coll.insert_one({"_id": key, "eventId": event_id, "timestamp": timestamp,
+                                   "state": "pending", "claimedAt": now, "createdAt": now})
+            return None
+        except DuplicateKeyError:
+            # si caducó entre la inserción y la lectura, el llamante la verá como libre en el reintento
+            return await coll.find_one({"_id": key}) or {"_id": key, "state": "done", "eventId": None}
+
+    @staticmethod
+    async def take_over(key: str, stale: Dict[str, Any], event_id: Any, timestamp: Any) -> bool:
+        """Reasigna una reserva `pending` abandonada; solo gana uno si varios lo intentan a la vez."""
+        now = datetime.now(timezone.utc)
+        res = await EventKeyDAO._collection().update_one(
+            {"_id": key, "state": "pending", "claimedAt": stale.get("claimedAt")},
+            {"$set": {"eventId": event_id, "timestamp": timestamp, "claimedAt": now, "createdAt": now}}
+        )
+        return res.modified_count == 1
+
+    @staticmethod
+    async def mark_done(key: str):
+        await EventKeyDAO._collection().update_one({"_id": key}, {"$set": {"state": "done"}})
+
+    @staticmethod
+    async def release(key: str, event_id: Any):
+        """Libera una clave cuyo evento no llegó a insertarse, para que el reintento pueda entrar."""
+        await EventKeyDAO._collection().delete_one({"_id": key, "eventId": event_id, "state": "pending"})
+
+    @staticmethod
+    async def ensure_indexes(db):
+        try:
+            await db[EventKeyDAO.COLLECTION].create_index([("createdAt", 1)], expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS)
+        except OperationFailure:
+            # el índice ya existe con otro TTL: se ajusta sin recrearlo
+            await db.command("collMod", EventKeyDAO.COLLECTION,
+                             index={"keyPattern": {"createdAt": 1}, "expireAfterSeconds": IDEMPOTENCY_TTL_SECONDS})
@@ -0,0 +1,79 @@
+from typing import Dict, Any, List
+from datetime import datetime
+from pymongo import UpdateOne
+from config.db import get_analytics_db, get_ingest_db
+from utils.timeseries import RESOLUTIONS, bucket_start
+
+class KPIBucketDAO:
+    """Contadores por artista pre-agregados en buckets de minuto, hora y día."""
+    COLLECTION = "artist_kpi_buckets"
+
+    @staticmethod
+    async def increment(artist_id: str, ts: datetime, increments: Dict[str, Any]):
+        if not increments:
+            return
+        # no se lee el resultado: admite el write concern de ingesta
+        db = get_ingest_db()
+        ops = []
+        for res, cfg in RESOLUTIONS.items():
+            start = bucket_start(ts, res)
+            update: Dict[str, Any] = {
+                "$inc": dict(increments),
+                "$setOnInsert": {"artistId": str(artist_id), "res": res, "ts": start}
+            }
+            if cfg["retention"] is not None:
+                # el índice TTL sobre expireAt purga los buckets finos antiguos
+                update["$setOnInsert"]["expireAt"] = start + cfg["retention"]
+            ops.append(UpdateOne({"artistId": str(artist_id), "res": res, "ts": start}, update, upsert=True))
+        await db[KPIBucketDAO.COLLECTION].bulk_write(ops, ordered=False)
+
+    @staticmethod
+    async def get_range(artist_id: str, resolution: str, metric: str, start: datetime, end: datetime) -> Dict[datetime, float]:
+        db = get_analytics_db()
+        query = {
+            "artistId": str(artist_id),
+            "res": resolution,
+            "ts": {"$gte": bucket_start(start, resolution), "$lte": end}
+        }
+        cursor = db[KPIBucketDAO.COLLECTION].find(query, {"_id": 0, "ts": 1, metric: 1})
+        rows: Dict[datetime, float] = {}
+        async for doc in cursor:
+            rows[doc["ts"]] = doc.get(metric, 0)
+        return rows
+
+    @staticmethod
+    def build_rebuild_pipeline(resolution: str, since: datetime = None) -> List[Dict[str, Any]]:
+        """Reconstruye los buckets de una resolución a partir de `events` (requiere MongoDB 5.0+)."""
+        cfg = RESOLUTIONS[resolution]
+        match: Dict[str, Any] = {"eventType": {"$in": ["track.played", "track.liked", "artist.followed", "order.paid"]}}
+        if since is not None:
+            match["timestamp"] = {"$gte": since}
+
+        def _is(event_type):
+            return {"$cond": [{"$eq": ["$eventType", event_type]}, 1, 0]}
+
+        project = {
+            "_id": 0,
+            "artistId": "$_id.artistId",
+            "res": resolution,
+            "ts": "$_id.ts",
+            "plays": 1, "likes": 1, "follows": 1, "purchases": 1, "revenue": 1
+        }
+        if cfg["retention"] is not None:
+            project["expireAt"] = {"$add": ["$_id.ts", int(cfg["retention"].total_seconds() * 1000)]}
+
+        return [
+            {"$match": match},
+            {"$addFields": {"_artist": {"$ifNull": ["$entityId", {"$ifNull": ["$metadata.artistId", "$metadata.artist"]}]}}},
+            {"$match": {"_artist": {"$ne": None}}},
+            {"$group": {
+                "_id": {"artistId": {"$toString": "$_artist"}, "ts": {"$dateTrunc": {"date": "$timestamp", "unit": resolution}}},
+                "plays": {"$sum": _is("track.played")},
+                "likes": {"$sum": _is("track.liked")},
+                "follows": {"$sum": _is("artist.followed")},
+                "purchases": {"$sum": _is("order.paid")},
+                "revenue": {"$sum": {"$cond": [{"$eq": ["$eventType", "order.paid"]}, {"$ifNull": ["$metadata.price", 0]}, 0]}}
+            }},
+            {"$project": project},
+            {"$merge": {"into": KPIBucketDAO.COLLECTION, "on": ["artistId", "res", "ts"], "whenMatched": "replace", "whenNotMatched": "insert"}}
+        ]
@@ -0,0 +1,39 @@
+from typing import Any, Optional
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import DuplicateKeyError
+from config.db import get_db
+
+class PrecomputedDAO:
+    """Resultados precalculados compartidos entre workers y leases para elegir quién los recalcula."""
+    COLLECTION = "precomputed_lists"
+    LEASES = "scheduler_leases"
+
+    @staticmethod
+    async def try_acquire_lease(job: str, owner: str, ttl_seconds: float) -> bool:
+        db = get_db()
+        now = datetime.now(timezone.utc)
+        try:
+            await db[PrecomputedDAO.LEASES].update_one(
+                {"_id": job, "$or": [{"expiresAt": {"$lte": now}}, {"owner": owner}]},
+                {"$set": {"owner": owner, "expiresAt": now + timedelta(seconds=ttl_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # otro worker tiene un lease vigente
+            return False
+
+    @staticmethod
+    async def save(key: str, value: Any):
+        db = get_db()
+        await db[PrecomputedDAO.COLLECTION].replace_one(
+            {"_id": key},
+            {"_id": key, "value": value, "computedAt": datetime.now(timezone.utc)},
+            upsert=True
+        )
+
+    @staticmethod
+    async def load(key: str) -> Optional[Any]:
+        db = get_db()
+        doc = await db[PrecomputedDAO.COLLECTION].find_one({"_id": key})
+        return doc.get("value") if doc else None
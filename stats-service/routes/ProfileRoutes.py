@@ -0,0 +1,5 @@
+from fastapi import APIRouter
+from controller.ProfileController import router as profile_router
+
+router = APIRouter()
+router.include_router(profile_router)
@@ -0,0 +1,5 @@
+from fastapi import APIRouter
+from controller.SnapshotController import router as snapshot_router
+
+router = APIRouter()
+router.include_router(snapshot_router)
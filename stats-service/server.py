@@ -2,16 +2,17 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse, FileResponse
+from fastapi.responses import RedirectResponse, FileResponse, JSONResponse
 from fastapi.openapi.docs import get_swagger_ui_html
 from pathlib import Path
 from dotenv import load_dotenv
-import os, json, subprocess, sys, inspect, asyncio, yaml, uvicorn, signal 
+import os, json, subprocess, sys, inspect, asyncio, yaml, uvicorn, signal, time, random
 from datetime import datetime, timezone
+from typing import Optional
 import psutil
 
 # Logger
-from utils.logger import get_logger
+from utils.logger import get_logger, logging_info
 logger = get_logger("server")
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -20,14 +21,19 @@ load_dotenv(str(BASE_DIR / ".env"))
 # routers
 from routes.EventRoutes import router as event_router
 from routes.ArtistKPIRoutes import router as artist_kpi_router
+from routes.SnapshotRoutes import router as snapshot_router
+from routes.ProfileRoutes import router as profile_router
 
 # Rate limiting
-from middleware.rate_limit import limiter, get_limiter
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
+from middleware.rate_limit import limiter, rate_limit_middleware
+from middleware.profiling import profiling_middleware
+from utils.admission import admission
+from utils.live_hub import hub as live_hub
+from utils.process_pool import cpu_pool
 
 # DB module
 import config.db as db_module
+from utils.dump_importer import DumpImporter, dump_sources
 
 CONNECT_FN = getattr(db_module, "connect_to_mongo", None)
 CLOSE_FN = getattr(db_module, "close_mongo", None)
@@ -37,22 +43,58 @@ SHARED_META = CONFIG_DIR / "dbmeta.json"
 LOCAL_META = CONFIG_DIR / "dbmeta_local.json"
 IMPORT_SCRIPT = BASE_DIR / "import-db.mjs"
 EXPORT_SCRIPT = BASE_DIR / "export-db.mjs"
+DUMP_DIR = BASE_DIR / "data-dump"
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_GATED_PREFIXES = ("/api/stats", "/api/recommendations")
+
+_importer: Optional[DumpImporter] = None
+_import_task: Optional[asyncio.Task] = None
 
 app = FastAPI(title="UnderSounds — Stats Service", docs_url=None, redoc_url=None, openapi_url=None)
 
 # Gzip to optimize response size
 app.add_middleware(GZipMiddleware, minimum_size=500)
 
-# Attach limiter to app state and add exception handler
+# Token bucket por IP (y buckets propios para llamadas con service key)
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.middleware("http")(rate_limit_middleware)
+
+# Mientras se importa data-dump/ las rutas de datos responden 503 (el resto del servicio sigue vivo)
+@app.middleware("http")
+async def import_gate(request: Request, call_next):
+    if import_in_progress() and request.url.path.startswith(IMPORT_GATED_PREFIXES):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Database import in progress", "import": _importer.info()},
+            headers={"Retry-After": "5"}
+        )
+    return await call_next(request)
+
+# Middleware para loguear requests: una línea por petición con su duración.
+# Solo se muestrean las 2xx/3xx; errores (4xx y 5xx) y peticiones lentas se registran siempre.
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_SLOW_MS = float(os.getenv("LOG_SLOW_MS", "1000"))
 
-# Middleware para loguear requests
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    logger.info("request_started", method=request.method, path=request.url.path)
-    response = await call_next(request)
-    logger.info("request_completed", method=request.method, path=request.url.path, status=response.status_code)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception as e:
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.error("request_failed", method=request.method, path=request.url.path, duration_ms=duration_ms, error=str(e))
+        raise
+    duration_ms = round((time.perf_counter() - started) * 1000, 2)
+    status = response.status_code
+    if status >= 500:
+        logger.error("request_completed", method=request.method, path=request.url.path, status=status, duration_ms=duration_ms)
+    elif status >= 400:
+        # 401/403/429/404 son justo lo que se busca al investigar abusos o clientes rotos
+        logger.warning("request_completed", method=request.method, path=request.url.path, status=status, duration_ms=duration_ms)
+    elif duration_ms >= LOG_SLOW_MS:
+        logger.warning("request_slow", method=request.method, path=request.url.path, status=status, duration_ms=duration_ms)
+    elif LOG_SAMPLE_RATE >= 1 or random.random() < LOG_SAMPLE_RATE:
+        logger.info("request_completed", method=request.method, path=request.url.path, status=status, duration_ms=duration_ms)
     return response
 
 OPENAPI_YAML = BASE_DIR / "docs" / "Estadisticas.yaml"
@@ -78,6 +120,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Perfilado bajo demanda (x-profile: 1 o ?_profile=1 con service key). Se registra el último para
+# ser el más externo (también por encima de CORS) y cubrir toda la petición
+app.middleware("http")(profiling_middleware)
+
 # mount static view if present
 view_dir = BASE_DIR / "view"
 if view_dir.exists():
@@ -86,6 +132,8 @@ if view_dir.exists():
 # include routers under /api
 app.include_router(event_router, prefix="/api")
 app.include_router(artist_kpi_router, prefix="/api")
+app.include_router(snapshot_router, prefix="/api")
+app.include_router(profile_router, prefix="/api")
 
 def read_db_version(path: Path) -> int:
     try:
@@ -176,32 +224,115 @@ async def _call_maybe_async(fn, *args, **kwargs):
         loop = asyncio.get_event_loop()
         await loop.run_in_executor(None, lambda: fn(*args, **kwargs))
 
+def _import_transforms() -> dict:
+    if db_module.EVENTS_STORAGE == "timeseries":
+        from model.dao.EventDAO import with_timeseries_meta
+        return {"events": with_timeseries_meta}
+    return {}
+
+async def _run_import(importer: DumpImporter):
+    logger.info("import_started", reason="version_outdated", collections=importer.collections)
+    try:
+        ok = await importer.run()
+    except Exception as e:
+        logger.error("import_error", error=str(e))
+        return
+    if ok:
+        logger.info("import_completed", collections=importer.progress)
+        LOCAL_META.write_text(SHARED_META.read_text(encoding="utf-8"), encoding="utf-8")
+    else:
+        # dbmeta_local no se actualiza: el próximo arranque reintenta (los duplicados se ignoran)
+        logger.error("import_failed", collections=importer.progress)
+
+def start_import():
+    global _importer, _import_task
+    meta = json.loads(SHARED_META.read_text(encoding="utf-8"))
+    _importer = DumpImporter(
+        db_module.get_db(), dump_sources(DUMP_DIR, meta.get("colecciones", [])),
+        batch_size=IMPORT_BATCH_SIZE, transforms=_import_transforms()
+    )
+    _import_task = asyncio.create_task(_run_import(_importer))
+
+def import_in_progress() -> bool:
+    return _importer is not None and _importer.running
+
 @app.on_event("startup")
 async def startup_event():
+    # muestreo del retraso del event loop para el control de admisión
+    admission.lag.start()
+
+    # pool de procesos para trabajo CPU (CSV, JSON de listas grandes); workers arrancados ya
+    try:
+        await cpu_pool.start()
+    except Exception as e:
+        logger.error("process_pool_start_failed", error=str(e))
+
     try:
         await _call_maybe_async(CONNECT_FN)
         logger.info("db_connected")
     except Exception as e:
         logger.error("db_connection_failed", error=str(e))
 
-    # run import-db.js if local meta version outdated
+    # importar data-dump/ en background si la versión local está desactualizada
     shared_v = read_db_version(SHARED_META)
     local_v = read_db_version(LOCAL_META)
     if local_v < shared_v:
         try:
-            logger.info("import_started", reason="version_outdated")
-            result = run_node_script(IMPORT_SCRIPT)
-            if result.returncode != 0:
-                logger.error("import_failed", stderr=result.stderr)
-            else:
-                logger.info("import_completed")
-                LOCAL_META.write_text(SHARED_META.read_text(encoding="utf-8"), encoding="utf-8")
+            start_import()
         except Exception as e:
             logger.error("import_error", error=str(e))
 
+    # snapshot local del catálogo para recomendaciones por género
+    try:
+        from controller.ArtistKPIController import start_catalog_refresher
+        start_catalog_refresher()
+        logger.info("catalog_refresher_started")
+    except Exception as e:
+        logger.error("catalog_refresher_failed", error=str(e))
+
+    # actualizaciones de KPIs desde un change stream (KPI_STREAM_SOURCE=changestream)
+    try:
+        from controller.ArtistKPIController import start_kpi_change_stream
+        start_kpi_change_stream()
+    except Exception as e:
+        logger.error("kpi_change_stream_failed", error=str(e))
+
+    # listas de trending/populares precalculadas en segundo plano
+    try:
+        from controller.ArtistKPIController import start_precompute_scheduler
+        start_precompute_scheduler()
+        logger.info("precompute_scheduler_started")
+    except Exception as e:
+        logger.error("precompute_scheduler_failed", error=str(e))
+
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("graceful_shutdown_started")
+    await admission.lag.stop()
+
+    try:
+        from controller.ArtistKPIController import stop_catalog_refresher
+        await stop_catalog_refresher()
+    except Exception as e:
+        logger.error("catalog_refresher_stop_failed", error=str(e))
+
+    try:
+        from controller.ArtistKPIController import stop_kpi_change_stream
+        await stop_kpi_change_stream()
+    except Exception as e:
+        logger.error("kpi_change_stream_stop_failed", error=str(e))
+
+    try:
+        from controller.ArtistKPIController import stop_precompute_scheduler
+        await stop_precompute_scheduler()
+    except Exception as e:
+        logger.error("precompute_scheduler_stop_failed", error=str(e))
+
+    try:
+        await cpu_pool.stop()
+    except Exception as e:
+        logger.error("process_pool_stop_failed", error=str(e))
+
     try:
         await _call_maybe_async(CLOSE_FN)
         logger.info("db_closed")
@@ -218,6 +349,11 @@ async def shutdown_event():
     except Exception as e:
         print(f"Error closing DB: {e}")
     
+    try:
+        await limiter.close()
+    except Exception as e:
+        logger.error("rate_limiter_close_failed", error=str(e))
+
     # 2. Limpiar cache
     try:
         from controller.ArtistKPIController import _cache, _cache_locks
@@ -235,9 +371,10 @@ async def healthz():
     Health check completo:
     - db: estado de conexión a MongoDB
     - memory: uso de memoria del proceso
-    - circuit_breaker: estado del CB hacia content-service
+    - circuit_breaker: breakers y bulkheads por ruta hacia content-service
+    - cpu_pool: workers, cola y utilización del pool de procesos
     """
-    from controller.ArtistKPIController import content_cb
+    from controller.ArtistKPIController import content_resilience_status
     
     health = {
         "status": "ok",
@@ -248,12 +385,12 @@ async def healthz():
     
     # 1. Check MongoDB
     try:
-        from config.db import get_db
+        from config.db import get_db, connection_info
         db = get_db()
         if db is not None:
             # ping rápido
             await db.command("ping")
-            health["checks"]["mongodb"] = {"status": "ok"}
+            health["checks"]["mongodb"] = {"status": "ok", **connection_info()}
         else:
             health["checks"]["mongodb"] = {"status": "error", "detail": "db is None"}
             health["status"] = "degraded"
@@ -275,21 +412,71 @@ async def healthz():
     except Exception as e:
         health["checks"]["memory"] = {"status": "unknown", "detail": str(e)}
     
-    # 3. Check circuit breaker
+    # 3. Check circuit breakers y bulkheads (uno por ruta de content-service)
     try:
-        cb_state = getattr(content_cb, "state", None) or getattr(content_cb, "current_state", None)
-        state_name = cb_state.name if hasattr(cb_state, "name") else str(cb_state)
+        status = content_resilience_status()
+        states = [b["state"].lower() for b in status["breakers"].values()]
+        saturated = [r for r, bh in status["bulkheads"].items() if bh["saturated"]]
         health["checks"]["circuit_breaker"] = {
-            "status": "ok" if state_name.lower() == "closed" else "warning",
-            "state": state_name
+            "status": "ok" if all(st == "closed" for st in states) and not saturated else "warning",
+            **status
         }
-        if state_name.lower() == "open":
+        if "open" in states:
             health["status"] = "degraded"
     except Exception as e:
         health["checks"]["circuit_breaker"] = {"status": "unknown", "detail": str(e)}
-    
+
+    # 4. Rate limiter (tiempo de decisión incluido)
+    health["checks"]["rate_limiter"] = {"status": "ok", **limiter.info()}
+
+    # 5. Control de admisión (retraso del loop y trabajo de fondo en curso)
+    adm = admission.info()
+    health["checks"]["admission"] = {"status": {"ok": "ok", "degraded": "warning"}.get(adm["state"], "error"), **adm}
+    if adm["state"] != "ok":
+        health["status"] = "degraded"
+
+    # 6. Suscriptores SSE en este proceso
+    health["checks"]["live_updates"] = {"status": "ok", **live_hub.info()}
+
+    # 7. Logging asíncrono (registros descartados si la cola se llenó)
+    log_stats = logging_info()
+    health["checks"]["logging"] = {"status": "warning" if log_stats.get("dropped") else "ok", **log_stats}
+
+    # 8. Pool de procesos para trabajo CPU
+    pool = cpu_pool.info()
+    pool_status = "ok"
+    if cpu_pool.workers > 0 and not pool["enabled"]:
+        pool_status = "warning"
+    elif pool["queued"] > 0 or pool["utilization_1m"] >= 0.9:
+        pool_status = "warning"
+    health["checks"]["cpu_pool"] = {"status": pool_status, **pool}
+
+    # 9. Idempotencia de la ingesta (claves y filtro de Bloom)
+    try:
+        from controller.EventController import idempotency_info
+        health["checks"]["idempotency"] = {"status": "ok", **idempotency_info()}
+    except Exception as e:
+        health["checks"]["idempotency"] = {"status": "unknown", "detail": str(e)}
+
+    # 10. Importación de data-dump/ (si se lanzó en este arranque)
+    if _importer is not None:
+        info = _importer.info()
+        health["checks"]["db_import"] = {
+            "status": {"done": "ok", "failed": "error"}.get(info["state"], "running"),
+            **info
+        }
+        if info["state"] == "failed":
+            health["status"] = "degraded"
+
     return health
 
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 503 hasta que termine la importación inicial de datos."""
+    if import_in_progress():
+        return JSONResponse(status_code=503, content={"ready": False, "import": _importer.info()})
+    return {"ready": True}
+
     
 @app.get("/api/openapi.yaml", include_in_schema=False)
 async def openapi_yaml():
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# los módulos del servicio se importan como en server.py (config.*, model.*, utils.*)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from utils.bulkhead import Bulkhead, BulkheadFullError
+
+async def _hold(bulkhead: Bulkhead, release: asyncio.Event, **kwargs):
+    async with bulkhead.acquire(**kwargs):
+        await release.wait()
+
+def test_waiting_queue_is_bounded_for_simultaneous_arrivals():
+    async def run():
+        bulkhead = Bulkhead("content", max_concurrent=1, max_wait=1.0, max_waiting=2)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(bulkhead, release))
+        await asyncio.sleep(0)
+        # cinco llamadas en el mismo tick: solo dos pueden quedarse esperando
+        waiters = [asyncio.create_task(_hold(bulkhead, release)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert bulkhead.waiting == 2
+        assert bulkhead.rejected == 3
+        release.set()
+        results = await asyncio.gather(holder, *waiters, return_exceptions=True)
+        assert sum(isinstance(r, BulkheadFullError) for r in results) == 3
+        assert bulkhead.waiting == 0 and bulkhead.active == 0
+
+    asyncio.run(run())
+
+def test_zero_wait_acquires_free_slot_and_rejects_when_full():
+    async def run():
+        bulkhead = Bulkhead("content", max_concurrent=1, max_wait=0.0)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(bulkhead, release))
+        await asyncio.sleep(0)
+        assert bulkhead.active == 1
+        with pytest.raises(BulkheadFullError):
+            async with bulkhead.acquire():
+                pass
+        release.set()
+        await holder
+        async with bulkhead.acquire(max_wait=0):
+            assert bulkhead.active == 1
+
+    asyncio.run(run())
+
+def test_waiter_that_times_out_leaves_the_queue():
+    async def run():
+        bulkhead = Bulkhead("content", max_concurrent=1, max_wait=0.01, max_waiting=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(bulkhead, release))
+        await asyncio.sleep(0)
+        with pytest.raises(BulkheadFullError):
+            async with bulkhead.acquire():
+                pass
+        assert bulkhead.waiting == 0
+        release.set()
+        await holder
+
+    asyncio.run(run())
@@ -0,0 +1,109 @@
+import asyncio
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import model.dao.ColdEventDAO as cold_events
+from model.dao.ColdEventDAO import ColdEventDAO
+from config.archive_events import archive_before
+from controller.ArtistKPIController import _merge_cold_artist_kpis
+
+@pytest.fixture
+def archive(monkeypatch, tmp_path):
+    monkeypatch.setattr(cold_events, "ARCHIVE_DIR", tmp_path)
+    monkeypatch.setattr(cold_events, "_manifest_cache", None)
+    return tmp_path
+
+def _play(event_id: str, ts: datetime) -> dict:
+    return {"_id": event_id, "eventType": "track.played", "timestamp": ts, "entityId": "t1",
+            "metadata": {"artistId": "a1"}}
+
+def test_manifest_is_cached_until_it_changes_on_disk(archive, monkeypatch):
+    ColdEventDAO.set_archived_before(datetime(2024, 1, 1))
+    assert ColdEventDAO.archived_before() == datetime(2024, 1, 1)
+
+    reads = []
+    original = Path.read_text
+    monkeypatch.setattr(Path, "read_text", lambda self, *a, **kw: reads.append(self) or original(self, *a, **kw))
+    assert ColdEventDAO.archived_before() == datetime(2024, 1, 1)
+    assert reads == []
+
+    ColdEventDAO.set_archived_before(datetime(2024, 2, 1))
+    manifest = archive / cold_events.MANIFEST_FILE
+    # el mtime puede no avanzar entre dos escrituras seguidas en algunos sistemas de ficheros
+    os.utime(manifest, ns=(manifest.stat().st_atime_ns, manifest.stat().st_mtime_ns + 1_000_000))
+    assert ColdEventDAO.archived_before() == datetime(2024, 2, 1)
+    assert len(reads) == 1
+
+def test_end_bound_matches_mongo_and_watermark_is_exclusive(archive):
+    end = datetime(2023, 6, 1, 12, 0)
+    ColdEventDAO.write_batch(end.date(), [_play("e1", datetime(2023, 6, 1, 11, 0)), _play("e2", end)])
+
+    inclusive = asyncio.run(ColdEventDAO.aggregate_for_artist("a1", None, end))
+    exclusive = asyncio.run(ColdEventDAO.aggregate_for_artist("a1", None, end, end_inclusive=False))
+    assert inclusive["plays"] == 2
+    assert exclusive["plays"] == 1
+
+class _FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+class _FakeEvents:
+    """find/delete_many sobre `timestamp` con $gte/$lt, lo que usa archive_events."""
+
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def find(self, query, projection=None):
+        cond = query["timestamp"]
+        return _FakeCursor([d for d in self.docs
+                            if d["timestamp"] < cond["$lt"] and ("$gte" not in cond or d["timestamp"] >= cond["$gte"])])
+
+    async def delete_many(self, query):
+        ids = set(query["_id"]["$in"])
+        self.docs = [d for d in self.docs if d["_id"] not in ids]
+
+def _three_days():
+    return _FakeEvents([_play(f"e{day}", datetime(2023, 6, day, 12, 0)) for day in (1, 2, 3)])
+
+def test_watermark_advances_per_day_when_the_run_stops_midway(archive, monkeypatch):
+    events = _three_days()
+    write_batch = ColdEventDAO.write_batch
+
+    def failing_write(day, docs):
+        if day.day == 3:
+            raise OSError("disk full")
+        return write_batch(day, docs)
+
+    monkeypatch.setattr(ColdEventDAO, "write_batch", staticmethod(failing_write))
+    with pytest.raises(OSError):
+        asyncio.run(archive_before(events, datetime(2023, 6, 10), batch_size=10))
+
+    # días 1 y 2 ya no están en Mongo: la consulta con rango entre ambos los lee del archivo
+    assert ColdEventDAO.archived_before() == datetime(2023, 6, 3)
+    assert [d["_id"] for d in events.docs] == ["e3"]
+    merged = asyncio.run(_merge_cold_artist_kpis("a1", datetime(2023, 6, 1), datetime(2023, 6, 2, 23, 0), {}))
+    assert merged["plays"] == 2
+
+def test_complete_run_moves_watermark_to_cutoff(archive):
+    events = _three_days()
+    ColdEventDAO.set_archived_before(datetime(2023, 1, 1))
+    assert asyncio.run(archive_before(events, datetime(2023, 6, 10), batch_size=10)) == 3
+    assert ColdEventDAO.archived_before() == datetime(2023, 6, 10)
+    merged = asyncio.run(_merge_cold_artist_kpis("a1", datetime(2023, 6, 1, 18, 0), datetime(2023, 6, 3), {}))
+    assert merged["plays"] == 1
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+import model.dao.ContentKPIDAO as content_kpis
+from model.dao.ContentKPIDAO import TrackKPIDAO, AlbumKPIDAO
+
+class _FakeCollection:
+    """update_one con upsert sobre igualdad exacta del filtro (lo justo para $inc/$set)."""
+
+    def __init__(self):
+        self.docs = []
+
+    async def update_one(self, query, update, upsert=False):
+        doc = next((d for d in self.docs if all(d.get(k) == v for k, v in query.items())), None)
+        if doc is None:
+            assert upsert
+            doc = dict(query)
+            self.docs.append(doc)
+        for k, v in update.get("$inc", {}).items():
+            doc[k] = doc.get(k, 0) + v
+        doc.update(update.get("$set", {}))
+
+class _FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = _FakeCollection()
+        return self[name]
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = _FakeDB()
+    monkeypatch.setattr(content_kpis, "get_ingest_db", lambda: db)
+    return db
+
+def test_same_track_id_in_two_albums_keeps_separate_counters(fake_db):
+    async def run():
+        await TrackKPIDAO.increment({"albumId": "A", "trackId": "1"}, {"plays": 1}, {"artistId": "x"})
+        await TrackKPIDAO.increment({"albumId": "A", "trackId": "1"}, {"plays": 1}, {"artistId": "x"})
+        await TrackKPIDAO.increment({"albumId": "B", "trackId": "1"}, {"plays": 1}, {"artistId": "y"})
+
+    asyncio.run(run())
+    docs = sorted(fake_db[TrackKPIDAO.COLLECTION].docs, key=lambda d: d["albumId"])
+    assert [(d["albumId"], d["trackId"], d["plays"], d["artistId"]) for d in docs] == [
+        ("A", "1", 2, "x"),
+        ("B", "1", 1, "y"),
+    ]
+
+def test_track_increment_requires_album(fake_db):
+    with pytest.raises(ValueError):
+        asyncio.run(TrackKPIDAO.increment({"albumId": None, "trackId": "1"}, {"plays": 1}))
+
+def test_rebuild_groups_and_merges_on_album_and_track():
+    pipeline = TrackKPIDAO.build_rebuild_pipeline()
+    group = next(stage["$group"] for stage in pipeline if "$group" in stage)
+    merge = pipeline[-1]["$merge"]
+    assert set(group["_id"]) == {"albumId", "trackId"}
+    assert merge["on"] == ["albumId", "trackId"]
+    assert AlbumKPIDAO.build_rebuild_pipeline()[-1]["$merge"]["on"] == ["albumId"]
+
+def test_leaderboard_cursor_compares_full_key(monkeypatch):
+    branches = []
+
+    class _Cursor:
+        def sort(self, spec):
+            assert spec == [("plays", -1), ("albumId", 1), ("trackId", 1)]
+            return self
+
+        def limit(self, n):
+            return self
+
+        async def to_list(self, length):
+            return []
+
+    class _Coll:
+        def find(self, query, projection):
+            branches.extend(query["$or"])
+            return _Cursor()
+
+    monkeypatch.setattr(content_kpis, "get_analytics_db", lambda: {TrackKPIDAO.COLLECTION: _Coll()})
+    asyncio.run(TrackKPIDAO.leaderboard("plays", 10, (5, ["A", "1"])))
+    assert {"plays": 5, "albumId": "A", "trackId": {"$gt": "1"}} in branches
+    assert {"plays": 5, "albumId": {"$gt": "A"}} in branches
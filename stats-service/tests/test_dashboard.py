@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from model.dao.EventDAO import EventDAO
+from controller.ArtistKPIController import _format_dashboard
+
+def test_top_tracks_are_keyed_by_album_and_track():
+    pipeline = EventDAO.build_dashboard_pipeline("a1", datetime(2024, 1, 1), datetime(2024, 2, 1), top=10, recent=5)
+    group = next(s["$group"] for s in pipeline[1]["$facet"]["topTracks"] if "$group" in s)
+    assert group["_id"] == {"albumId": "$metadata.albumId", "trackId": "$entityId"}
+
+    row = {"topTracks": [
+        {"_id": {"albumId": "A", "trackId": "1"}, "plays": 5},
+        {"_id": {"albumId": "B", "trackId": "1"}, "plays": 3},
+    ]}
+    tracks = _format_dashboard("a1", datetime(2024, 1, 1), datetime(2024, 2, 1), row)["topTracks"]
+    assert tracks == [{"trackId": "1", "albumId": "A", "plays": 5}, {"trackId": "1", "albumId": "B", "plays": 3}]
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+import utils.dump_importer as dump_importer
+from utils.dump_importer import iter_ejson_array
+
+def _read(path):
+    return list(iter_ejson_array(path, {"bytes_read": 0}))
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # bloques diminutos: los documentos, cadenas y literales quedan partidos entre lecturas
+    monkeypatch.setattr(dump_importer, "_CHUNK_SIZE", 7)
+
+def test_documents_split_across_chunks(tmp_path, small_chunks):
+    docs = [{"_id": {"$oid": "0123456789abcdef01234567"}, "name": "una cadena bastante larga", "ok": True,
+             "n": -1.5e3, "none": None} for _ in range(20)]
+    path = tmp_path / "events.json"
+    path.write_text(json.dumps(docs), encoding="utf-8")
+    read = _read(path)
+    assert len(read) == 20
+    assert read[0]["name"] == "una cadena bastante larga" and read[0]["ok"] is True and read[0]["n"] == -1500
+
+def test_malformed_document_fails_at_its_offset_without_reading_the_rest(tmp_path, monkeypatch):
+    monkeypatch.setattr(dump_importer, "_CHUNK_SIZE", 64)
+    body = '[{"a": 1}, {"a": tru, "b": 2}, ' + ", ".join('{"a": %d}' % i for i in range(10000)) + "]"
+    path = tmp_path / "events.json"
+    path.write_text(body, encoding="utf-8")
+    stats = {"bytes_read": 0}
+    it = iter_ejson_array(path, stats)
+    assert next(it) == {"a": 1}
+    with pytest.raises(ValueError, match=f"offset {body.index('tru')}"):
+        next(it)
+    assert stats["bytes_read"] <= 64
+
+def test_truncated_file_is_reported(tmp_path, small_chunks):
+    path = tmp_path / "events.json"
+    path.write_text('[{"a": 1}, {"a": "sin cerrar', encoding="utf-8")
+    with pytest.raises(ValueError, match="truncated"):
+        _read(path)
@@ -0,0 +1,68 @@
+import asyncio
+
+import controller.ArtistKPIController as kpis
+from utils import deadline
+
+class _SlowClient:
+    """get() que nunca responde; registra las peticiones canceladas."""
+
+    def __init__(self):
+        self.started = 0
+        self.cancelled = 0
+
+    async def get(self, url, **kwargs):
+        self.started += 1
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+def test_cancelled_caller_cancels_original_and_hedge(monkeypatch):
+    monkeypatch.setattr(kpis, "HEDGE_DELAY", 0.01)
+
+    async def run():
+        client = _SlowClient()
+        caller = asyncio.create_task(kpis._hedged_get(client, "http://content/x"))
+        await asyncio.sleep(0.05)
+        assert client.started == 2
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        assert client.cancelled == 2
+
+    asyncio.run(run())
+
+def test_cancelled_before_hedge_delay_cancels_original(monkeypatch):
+    monkeypatch.setattr(kpis, "HEDGE_DELAY", 10)
+
+    async def run():
+        client = _SlowClient()
+        caller = asyncio.create_task(kpis._hedged_get(client, "http://content/x"))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        assert (client.started, client.cancelled) == (1, 1)
+
+    asyncio.run(run())
+
+def test_enrich_waits_for_cancelled_rows_before_closing_client():
+    finished = []
+
+    async def enrich(client, row):
+        try:
+            await asyncio.sleep(0 if row["fast"] else 3600)
+            return row
+        except asyncio.CancelledError:
+            await asyncio.sleep(0)
+            finished.append(row["id"])
+            raise
+
+    async def run():
+        with deadline.deadline_scope(0.05):
+            rows = await kpis._enrich_within_deadline([{"id": 1, "fast": True}, {"id": 2, "fast": False}], enrich)
+            assert deadline.is_partial()
+        # la fila cancelada ya terminó de deshacerse al volver (el cliente HTTP se cerró después)
+        assert finished == [2]
+        return rows
+
+    assert asyncio.run(run()) == [{"id": 1, "fast": True}]
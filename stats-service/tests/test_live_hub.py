@@ -0,0 +1,31 @@
+import asyncio
+
+from utils.live_hub import LiveHub
+
+def test_each_subscriber_gets_deltas_from_its_own_snapshot():
+    async def run():
+        hub = LiveHub()
+        early = hub.subscribe("kpis", "a1", baseline={"artistId": "a1", "plays": 10})
+        hub.publish_kpis("a1", {"artistId": "a1", "plays": 12})
+        # el segundo cliente parte de un snapshot ya desfasado (caché): no debe mover la base del primero
+        late = hub.subscribe("kpis", "a1", baseline={"artistId": "a1", "plays": 11})
+        hub.publish_kpis("a1", {"artistId": "a1", "plays": 13})
+
+        early_msg = await early.next(0.1)
+        late_msg = await late.next(0.1)
+        # el primero no leyó a tiempo: sus dos actualizaciones se fusionan (2 + 1)
+        assert early_msg["kpis"] == {"plays": 13} and early_msg["delta"] == {"plays": 3}
+        assert late_msg["delta"] == {"plays": 2}
+
+        hub.publish_kpis("a1", {"artistId": "a1", "plays": 14})
+        assert (await early.next(0.1))["delta"] == {"plays": 1}
+        assert (await late.next(0.1))["delta"] == {"plays": 1}
+
+    asyncio.run(run())
+
+def test_publish_without_subscribers_is_a_no_op():
+    hub = LiveHub()
+    hub.publish_kpis("a1", {"plays": 1})
+    with hub.subscribe("kpis", "a1"):
+        pass
+    assert hub.info()["subscribers"] == 0 and hub.info()["published"] == 0
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+# Umbrales: "degraded" -> la ingesta responde 429 y las lecturas solo sirven caché;
+# "overloaded" -> la ingesta responde 503.
+LOOP_LAG_SAMPLE_MS = float(os.getenv("LOOP_LAG_SAMPLE_MS", "100"))
+LOOP_LAG_DEGRADED_MS = float(os.getenv("LOOP_LAG_DEGRADED_MS", "100"))
+LOOP_LAG_OVERLOADED_MS = float(os.getenv("LOOP_LAG_OVERLOADED_MS", "500"))
+BACKGROUND_DEGRADED = int(os.getenv("BACKGROUND_DEGRADED", "200"))
+BACKGROUND_OVERLOADED = int(os.getenv("BACKGROUND_OVERLOADED", "1000"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+
+_EWMA_ALPHA = 0.3
+
+class LoopLagMonitor:
+    """Mide cuánto tarda el event loop en despertar una tarea respecto a lo previsto."""
+
+    def __init__(self, interval_ms: float = LOOP_LAG_SAMPLE_MS):
+        self.interval = interval_ms / 1000
+        self.lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, (time.perf_counter() - started - self.interval) * 1000)
+            # media móvil: un pico aislado no cambia el estado, un retraso sostenido sí
+            self.lag_ms = lag if self.samples == 0 else _EWMA_ALPHA * lag + (1 - _EWMA_ALPHA) * self.lag_ms
+            self.max_lag_ms = max(self.max_lag_ms, lag)
+            self.samples += 1
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+class AdmissionController:
+    """Decide si se admite trabajo nuevo según el retraso del loop y el trabajo en segundo plano."""
+
+    def __init__(self):
+        self.lag = LoopLagMonitor()
+        self.inflight: Dict[str, int] = defaultdict(int)
+        self.rejected: Dict[str, int] = defaultdict(int)
+
+    def track(self, name: str, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Envuelve una tarea de fondo para contarla mientras se ejecuta."""
+        async def _run(*args, **kwargs):
+            self.inflight[name] += 1
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.inflight[name] -= 1
+        return _run
+
+    def state(self) -> str:
+        lag = self.lag.lag_ms
+        pending = sum(self.inflight.values())
+        if lag >= LOOP_LAG_OVERLOADED_MS or pending >= BACKGROUND_OVERLOADED:
+            return "overloaded"
+        if lag >= LOOP_LAG_DEGRADED_MS or pending >= BACKGROUND_DEGRADED:
+            return "degraded"
+        return "ok"
+
+    def check_ingest(self):
+        state = self.state()
+        if state == "overloaded":
+            self.rejected["ingest_503"] += 1
+            raise HTTPException(status_code=503, detail="Service overloaded, retry later",
+                                headers={"Retry-After": str(ADMISSION_RETRY_AFTER * 5)})
+        if state == "degraded":
+            self.rejected["ingest_429"] += 1
+            raise HTTPException(status_code=429, detail="Ingestion throttled, retry later",
+                                headers={"Retry-After": str(ADMISSION_RETRY_AFTER)})
+
+    def allow_optional(self, name: str) -> bool:
+        """Trabajo prescindible (p. ej. comprobación de alertas): solo con el servicio en estado ok."""
+        if self.state() == "ok":
+            return True
+        self.rejected[f"shed_{name}"] += 1
+        return False
+
+    def check_uncached_read(self):
+        """En modo degradado las lecturas sin caché no lanzan agregaciones nuevas."""
+        if self.state() != "ok":
+            self.rejected["uncached_read"] += 1
+            raise HTTPException(status_code=503, detail="Service degraded: only cached results available",
+                                headers={"Retry-After": str(ADMISSION_RETRY_AFTER)})
+
+    def info(self) -> Dict[str, Any]:
+        state = self.state()
+        return {
+            "state": state,
+            "cached_only_reads": state != "ok",
+            "loop_lag_ms": round(self.lag.lag_ms, 2),
+            "loop_lag_max_ms": round(self.lag.max_lag_ms, 2),
+            "background_inflight": dict(self.inflight),
+            "rejected": dict(self.rejected),
+            "thresholds": {
+                "loop_lag_degraded_ms": LOOP_LAG_DEGRADED_MS,
+                "loop_lag_overloaded_ms": LOOP_LAG_OVERLOADED_MS,
+                "background_degraded": BACKGROUND_DEGRADED,
+                "background_overloaded": BACKGROUND_OVERLOADED,
+            },
+        }
+
+admission = AdmissionController()
@@ -0,0 +1,90 @@
+import hashlib
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+class BloomFilter:
+    """Filtro de Bloom sobre un bytearray: sin falsos negativos, falsos positivos ~ error_rate."""
+
+    __slots__ = ("capacity", "error_rate", "bits", "hashes", "_array", "count")
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.bits = max(8, math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> List[int]:
+        # doble hashing (Kirsch-Mitzenmacher): k posiciones a partir de dos hashes de 64 bits
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        array = self._array
+        return all(array[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: str):
+        array = self._array
+        for p in self._positions(key):
+            array[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def memory_bytes(self) -> int:
+        return len(self._array)
+
+class RotatingBloomFilter:
+    """Dos generaciones de filtro: se consulta en ambas y se añade en la actual.
+
+    La actual pasa a ser la anterior cuando se llena (`capacity`) o cumple `window_seconds`,
+    así la tasa de falsos positivos no crece con el tiempo y las claves viejas se olvidan
+    (como pronto tras una ventana, como tarde tras dos).
+    """
+
+    def __init__(self, capacity: int, error_rate: float, window_seconds: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.window_seconds = window_seconds
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous: Optional[BloomFilter] = None
+        self._rotated_at = time.monotonic()
+        self.rotations = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _maybe_rotate(self):
+        if self._current.count >= self.capacity or time.monotonic() - self._rotated_at >= self.window_seconds:
+            self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.error_rate)
+            self._rotated_at = time.monotonic()
+            self.rotations += 1
+
+    def __contains__(self, key: str) -> bool:
+        self._maybe_rotate()
+        found = key in self._current or (self._previous is not None and key in self._previous)
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return found
+
+    def add(self, key: str):
+        self._maybe_rotate()
+        self._current.add(key)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "window_seconds": self.window_seconds,
+            "hashes": self._current.hashes,
+            "current_count": self._current.count,
+            "previous_count": self._previous.count if self._previous is not None else 0,
+            "memory_bytes": self._current.memory_bytes() + (self._previous.memory_bytes() if self._previous is not None else 0),
+            "rotations": self.rotations,
+            "hits": self.hits,
+            "misses": self.misses
+        }
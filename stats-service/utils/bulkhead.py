@@ -0,0 +1,63 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+
+class BulkheadFullError(Exception):
+    """El compartimento no tiene hueco libre dentro del tiempo de espera permitido."""
+
+class Bulkhead:
+    """Limita las llamadas concurrentes a una dependencia y rechaza rápido al saturarse."""
+
+    def __init__(self, name: str, max_concurrent: int, max_wait: float = 0.0, max_waiting: Optional[int] = None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        # cola acotada: como mucho `max_waiting` llamadas esperando hueco a la vez
+        self.max_waiting = max_concurrent if max_waiting is None else max_waiting
+        self._sem = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    @property
+    def saturated(self) -> bool:
+        return self.active >= self.max_concurrent
+
+    @asynccontextmanager
+    async def acquire(self, max_wait: Optional[float] = None):
+        """`max_wait` sustituye a la espera configurada (0 = sin esperar)."""
+        wait = self.max_wait if max_wait is None else max_wait
+        # se cuenta antes de comprobar: dos llamadas que llegan a la vez no pueden ver la misma cola libre
+        self.waiting += 1
+        try:
+            if not self._sem.locked():
+                # hay hueco (comprobado justo antes, sin await en medio): no bloquea
+                await self._sem.acquire()
+            elif wait <= 0 or self.waiting > self.max_waiting:
+                self.rejected += 1
+                raise BulkheadFullError(self.name)
+            else:
+                try:
+                    await asyncio.wait_for(self._sem.acquire(), timeout=wait)
+                except asyncio.TimeoutError:
+                    self.rejected += 1
+                    raise BulkheadFullError(self.name)
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._sem.release()
+
+    def info(self) -> dict:
+        return {
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "max_wait_seconds": self.max_wait,
+            "rejected": self.rejected,
+            "saturated": self.saturated,
+        }
@@ -0,0 +1,45 @@
+from typing import Any, Dict
+
+from cachetools import TTLCache
+
+def _entry_size(value: Any) -> int:
+    return value.memory_size()
+
+class ByteBudgetCache(TTLCache):
+    """LRU con TTL acotado por bytes en lugar de por número de entradas.
+
+    Cada valor debe exponer `memory_size()`; al superar el presupuesto se expulsan primero las
+    entradas caducadas y después las menos usadas recientemente, tantas como haga falta.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, max_entry_bytes: int = 0):
+        super().__init__(maxsize=max_bytes, ttl=ttl, getsizeof=_entry_size)
+        # una entrada enorme no puede vaciar media caché: por encima de este tamaño no se guarda
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 8
+        self.evictions = 0
+        self.rejected = 0
+
+    def __setitem__(self, key, value):
+        if self.getsizeof(value) > self.max_entry_bytes:
+            self.rejected += 1
+            self.pop(key, None)
+            return
+        super().__setitem__(key, value)
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def info(self) -> Dict[str, Any]:
+        count = len(self)
+        return {
+            "entries": count,
+            "memory_bytes": self.currsize,
+            "max_bytes": self.maxsize,
+            "max_entry_bytes": self.max_entry_bytes,
+            "avg_entry_bytes": self.currsize // count if count else 0,
+            "ttl_seconds": self.ttl,
+            "evictions": self.evictions,
+            "rejected_oversize": self.rejected,
+        }
@@ -0,0 +1,103 @@
+import gzip
+import hashlib
+import json
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # sin brotli solo se precomprime con gzip
+    brotli = None
+
+# Por debajo de este tamaño no compensa comprimir (mismo umbral que GZipMiddleware)
+MIN_COMPRESS_SIZE = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+class CachedBody:
+    """Cuerpo JSON ya serializado y precomprimido (gzip/br) con un ETag fuerte por codificación.
+
+    Si existe la versión gzip no se guarda el JSON sin comprimir: se reconstruye solo para los
+    clientes que no aceptan compresión (y al leer el valor), a cambio de ocupar varias veces menos.
+    """
+
+    __slots__ = ("_raw", "encoded", "etag", "raw_size")
+
+    def __init__(self, raw: bytes, encoded: Dict[str, bytes], etag: str):
+        self._raw = None if "gzip" in encoded else raw
+        self.encoded = encoded
+        self.etag = etag
+        self.raw_size = len(raw)
+
+    @property
+    def raw(self) -> bytes:
+        return self._raw if self._raw is not None else gzip.decompress(self.encoded["gzip"])
+
+    @staticmethod
+    def encode(value: Any) -> Tuple[Optional[bytes], Dict[str, bytes], str, int]:
+        """Serializa y comprime `value`; devuelve (raw|None, encoded, etag, raw_size).
+
+        Son tipos básicos para que el trabajo pueda hacerse en otro proceso (ver utils.cpu_jobs).
+        """
+        raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+        encoded: Dict[str, bytes] = {}
+        if len(raw) >= MIN_COMPRESS_SIZE:
+            encoded["gzip"] = gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                encoded["br"] = brotli.compress(raw, quality=BROTLI_QUALITY)
+        etag = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        return (None if "gzip" in encoded else raw), encoded, etag, len(raw)
+
+    @classmethod
+    def from_parts(cls, raw: Optional[bytes], encoded: Dict[str, bytes], etag: str, raw_size: int) -> "CachedBody":
+        entry = cls.__new__(cls)
+        entry._raw = raw
+        entry.encoded = encoded
+        entry.etag = etag
+        entry.raw_size = raw_size
+        return entry
+
+    @classmethod
+    def build(cls, value: Any) -> "CachedBody":
+        return cls.from_parts(*cls.encode(value))
+
+    def value(self) -> Any:
+        return json.loads(self.raw)
+
+    def etag_for(self, encoding: str) -> str:
+        # cada representación tiene su propio ETag fuerte
+        return f'"{self.etag}"' if encoding == "identity" else f'"{self.etag}-{encoding}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return any(self.etag_for(enc) in tags for enc in ("identity", *self.encoded))
+
+    def pick_encoding(self, accept_encoding: str) -> str:
+        accepted = set()
+        for part in (accept_encoding or "").lower().split(","):
+            name, _, params = part.strip().partition(";")
+            if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                continue
+            accepted.add(name.strip())
+        for enc in ("br", "gzip"):
+            if enc in self.encoded and (enc in accepted or "*" in accepted):
+                return enc
+        return "identity"
+
+    def body(self, encoding: str) -> bytes:
+        return self.raw if encoding == "identity" else self.encoded[encoding]
+
+    def size(self) -> int:
+        """Bytes de payload guardados (JSON sin comprimir si se conserva + versiones comprimidas)."""
+        return (len(self._raw) if self._raw is not None else 0) + sum(len(b) for b in self.encoded.values())
+
+    def memory_size(self) -> int:
+        """Memoria real aproximada de la entrada, incluidas las cabeceras de los objetos Python."""
+        total = sys.getsizeof(self) + sys.getsizeof(self.encoded) + sys.getsizeof(self.etag)
+        if self._raw is not None:
+            total += sys.getsizeof(self._raw)
+        return total + sum(sys.getsizeof(k) + sys.getsizeof(b) for k, b in self.encoded.items())
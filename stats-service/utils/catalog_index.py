@@ -0,0 +1,82 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Campos del AlbumDTO de content-service que necesitan las recomendaciones
+_ALBUM_FIELDS = ("id", "_id", "title", "name", "coverImage", "artist", "genre")
+
+
+class CatalogIndex:
+    """Snapshot en memoria del catálogo de álbumes, indexado por género."""
+
+    def __init__(self):
+        self._by_genre: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        self.size = 0
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self.checked_at: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def age_seconds(self) -> Optional[float]:
+        if self.checked_at is None:
+            return None
+        return time.time() - self.checked_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def replace(self, items: List[Dict[str, Any]], etag: Optional[str] = None, last_modified: Optional[str] = None):
+        by_genre: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        size = 0
+        for pos, item in enumerate(items or []):
+            if not isinstance(item, dict):
+                continue
+            genre = str(item.get("genre") or "").strip().lower()
+            if not genre:
+                continue
+            entry = {k: item.get(k) for k in _ALBUM_FIELDS if item.get(k) is not None}
+            by_genre.setdefault(genre, []).append((pos, entry))
+            size += 1
+
+        # Sustitución de una sola vez: los lectores nunca ven un índice a medias
+        self._by_genre = by_genre
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.loaded_at = self.checked_at = time.time()
+
+    def mark_not_modified(self):
+        self.checked_at = time.time()
+
+    def albums_for_genre(self, genre: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        g = (genre or "").strip().lower()
+        if not g:
+            return []
+        # content-service filtra con regex case-insensitive: se replica la semántica "contiene"
+        exact = self._by_genre.get(g)
+        partial = [rows for key, rows in self._by_genre.items() if key != g and g in key]
+        if not partial:
+            rows = exact or []
+        else:
+            rows = sorted((exact or []) + [r for group in partial for r in group], key=lambda r: r[0])
+        if limit is not None:
+            rows = rows[:limit]
+        return [entry for _, entry in rows]
+
+    def info(self) -> Dict[str, Any]:
+        age = self.age_seconds()
+        return {
+            "loaded": self.loaded,
+            "albums": self.size,
+            "genres": len(self._by_genre),
+            "etag": self.etag,
+            "age_seconds": round(age, 1) if age is not None else None,
+        }
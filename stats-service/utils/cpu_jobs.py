@@ -0,0 +1,69 @@
+"""
+Trabajos CPU que se ejecutan en el pool de procesos (utils.process_pool).
+
+Tienen que ser funciones de módulo (picklables) que reciben y devuelven tipos básicos:
+los bytes grandes del resultado viajan como buffers out-of-band, sin copiarse dentro del pickle.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import bson
+
+from utils.cached_body import CachedBody
+
+def encode_body(value: Any) -> Tuple[Optional[bytes], Dict[str, bytes], str, int]:
+    """JSON + gzip/br de una entrada de caché; se reconstruye con CachedBody.from_parts."""
+    return CachedBody.encode(value)
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return str(value)
+    return value
+
+def format_csv(columns: Sequence[str], rows: List[Dict[str, Any]]) -> bytes:
+    """CSV (UTF-8, cabecera incluida) con las columnas dadas; las que faltan quedan vacías."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_csv_value(row.get(c)) for c in columns])
+    return buf.getvalue().encode("utf-8")
+
+def format_export(bson_rows: bytes, columns: Sequence[str], fmt: str) -> bytes:
+    """Exportación a partir de documentos BSON concatenados tal como los devuelve Mongo.
+
+    Se decodifican aquí, en el worker: el proceso principal solo mueve un bloque de bytes.
+    """
+    rows = bson.decode_all(bson_rows)
+    if fmt == "csv":
+        return format_csv(columns, rows)
+    return json.dumps([{c: row.get(c) for c in columns} for row in rows],
+                      separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+def filter_similar_results(items: list, exclude_id: Optional[str], genre: str, limit: int) -> list:
+    results = []
+    for item in items:
+        item_id = item.get("id") or item.get("_id")
+        if not item_id:
+            continue
+        if exclude_id and str(item_id) == str(exclude_id):
+            continue
+        results.append({
+            "id": item_id,
+            "type": "album",
+            "title": item.get("title") or item.get("name"),
+            "coverImage": item.get("coverImage"),
+            "artist": item.get("artist"),
+            "reason": f"genre:{genre}",
+            "score": 1.0
+        })
+        if len(results) >= limit:
+            break
+    return results
@@ -0,0 +1,53 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+class DeadlineExceeded(Exception):
+    """Se agotó el presupuesto de tiempo de la petición."""
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        self.partial = False
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+# Las tareas creadas dentro del scope heredan el contexto, así que comparten el mismo Deadline
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Fija un presupuesto para todo lo que se ejecute dentro (un scope anidado nunca lo amplía)."""
+    deadline = Deadline(seconds)
+    outer = _current.get()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline.expires_at = outer.expires_at
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+def remaining() -> Optional[float]:
+    """Segundos que quedan, o None si no hay deadline activo."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else None
+
+def clamp_timeout(timeout: Optional[float]) -> Optional[float]:
+    rem = remaining()
+    if rem is None:
+        return timeout
+    if rem <= 0:
+        raise DeadlineExceeded()
+    return rem if timeout is None else min(timeout, rem)
+
+def mark_partial():
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.partial = True
+
+def is_partial() -> bool:
+    deadline = _current.get()
+    return bool(deadline and deadline.partial)
@@ -0,0 +1,188 @@
+import asyncio
+import gzip
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+_DUPLICATE_KEY = 11000
+_CHUNK_SIZE = 1 << 20
+
+def _ejson_hook(pairs):
+    return json_util.object_pairs_hook(pairs, json_util.DEFAULT_JSON_OPTIONS)
+
+_TOKEN_BREAKS = frozenset(" \t\r\n,:[]{}")
+
+def _incomplete(buf: str, err: json.JSONDecodeError) -> bool:
+    """El error solo indica que falta texto: un token a medias que llega hasta el final del buffer."""
+    if err.msg.startswith("Unterminated string"):
+        # sin comilla de cierre hasta el final: la cadena continúa en el siguiente bloque
+        return True
+    return not any(c in _TOKEN_BREAKS for c in buf[err.pos:])
+
+def iter_ejson_array(path: Path, stats: Dict[str, Any]) -> Iterator[dict]:
+    """Recorre un array Extended JSON (formato mongoexport --jsonArray) sin cargarlo entero en memoria."""
+    decoder = json.JSONDecoder(object_pairs_hook=_ejson_hook)
+    buf = ""
+    pos = 0
+    consumed = 0  # caracteres ya descartados del principio del buffer (para dar offsets del fichero)
+    started = False
+    with path.open("r", encoding="utf-8") as f:
+        eof = False
+        while True:
+            # salta separadores entre documentos
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if not started and pos < len(buf):
+                if buf[pos] != "[":
+                    raise ValueError(f"{path.name}: expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            need_more = pos >= len(buf)
+            if not need_more:
+                try:
+                    doc, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError as e:
+                    # un documento mal formado a mitad de buffer falla ya, sin leer el resto del fichero
+                    if not _incomplete(buf, e):
+                        raise ValueError(f"{path.name}: invalid JSON at character offset {consumed + e.pos}: {e.msg}")
+                    need_more = True
+                except ValueError as e:
+                    # JSON válido pero Extended JSON inválido (p. ej. un $oid mal formado)
+                    raise ValueError(f"{path.name}: invalid document at character offset {consumed + pos}: {e}")
+            if need_more:
+                if eof:
+                    if buf[pos:].strip():
+                        raise ValueError(f"{path.name}: truncated JSON at character offset {consumed + pos}")
+                    return
+                chunk = f.read(_CHUNK_SIZE)
+                if not chunk:
+                    eof = True
+                stats["bytes_read"] += len(chunk.encode("utf-8"))
+                consumed += pos
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            pos = end
+            yield doc
+
+def iter_ndjson_gz(path: Path, stats: Dict[str, Any]) -> Iterator[dict]:
+    """Recorre un NDJSON comprimido con gzip (una línea Extended JSON por documento)."""
+    base = stats["bytes_read"]
+    with path.open("rb") as raw, gzip.GzipFile(fileobj=raw) as gz:
+        for line in gz:
+            stats["bytes_read"] = base + raw.tell()
+            if line.strip():
+                yield json.loads(line, object_pairs_hook=_ejson_hook)
+    stats["bytes_read"] = base + path.stat().st_size
+
+def iter_documents(path: Path, stats: Dict[str, Any]) -> Iterator[dict]:
+    if path.name.endswith(".ndjson.gz"):
+        return iter_ndjson_gz(path, stats)
+    return iter_ejson_array(path, stats)
+
+def _next_batch(it: Iterator[dict], size: int) -> List[dict]:
+    batch = []
+    for doc in it:
+        batch.append(doc)
+        if len(batch) >= size:
+            break
+    return batch
+
+def dump_sources(dump_dir: Path, collections: List[str]) -> Dict[str, List[Path]]:
+    """Fuentes de `data-dump/`: un `<colección>.json` por colección."""
+    return {col: [dump_dir / f"{col}.json"] for col in collections}
+
+class DumpImporter:
+    """Importa ficheros de volcado a MongoDB en lotes, con las colecciones en paralelo.
+
+    `sources` asocia cada colección a sus ficheros, que se cargan en orden
+    (array Extended JSON de data-dump/ o NDJSON gzip de los snapshots).
+    """
+
+    def __init__(self, db, sources: Dict[str, List[Path]], batch_size: int = 1000,
+                 transforms: Optional[Dict[str, Callable[[dict], dict]]] = None):
+        self.db = db
+        self.sources = sources
+        self.collections = list(sources)
+        self.batch_size = batch_size
+        self.transforms = transforms or {}
+        self.state = "pending"
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.progress: Dict[str, Dict[str, Any]] = {
+            col: {"status": "pending", "inserted": 0, "duplicates": 0, "bytes_read": 0,
+                  "total_bytes": 0, "elapsed_ms": None, "error": None}
+            for col in self.collections
+        }
+
+    async def _import_file(self, col: str, path: Path, stats: Dict[str, Any]):
+        transform = self.transforms.get(col)
+        it = iter_documents(path, stats)
+        while True:
+            # lectura y parseo fuera del event loop
+            batch = await asyncio.to_thread(_next_batch, it, self.batch_size)
+            if not batch:
+                return
+            if transform is not None:
+                batch = [transform(d) for d in batch]
+            try:
+                res = await self.db[col].insert_many(batch, ordered=False)
+                stats["inserted"] += len(res.inserted_ids)
+            except BulkWriteError as e:
+                # como mongoimport: los duplicados no abortan la importación
+                errors = e.details.get("writeErrors", [])
+                dups = sum(1 for w in errors if w.get("code") == _DUPLICATE_KEY)
+                if dups != len(errors):
+                    raise
+                stats["inserted"] += e.details.get("nInserted", 0)
+                stats["duplicates"] += dups
+
+    async def _import_collection(self, col: str):
+        stats = self.progress[col]
+        paths = [p for p in self.sources[col] if p.exists()]
+        if not paths:
+            # mismo comportamiento que import-db.mjs: se salta la colección
+            stats["status"] = "skipped"
+            stats["error"] = ", ".join(p.name for p in self.sources[col]) + " not found"
+            return
+        stats["status"] = "running"
+        stats["total_bytes"] = sum(p.stat().st_size for p in paths)
+        started = time.perf_counter()
+        try:
+            for path in paths:
+                await self._import_file(col, path, stats)
+            stats["status"] = "done"
+        except Exception as e:
+            stats["status"] = "failed"
+            stats["error"] = str(e)
+        finally:
+            stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    async def run(self) -> bool:
+        self.state = "running"
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        await asyncio.gather(*(self._import_collection(c) for c in self.collections))
+        self.finished_at = datetime.now(timezone.utc).isoformat()
+        ok = all(p["status"] in ("done", "skipped") for p in self.progress.values())
+        self.state = "done" if ok else "failed"
+        return ok
+
+    @property
+    def running(self) -> bool:
+        return self.state in ("pending", "running")
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "collections": self.progress,
+        }
@@ -0,0 +1,132 @@
+import asyncio
+import os
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set, Tuple
+
+SSE_MAX_SUBSCRIBERS = int(os.getenv("SSE_MAX_SUBSCRIBERS", "1000"))
+
+class Subscription:
+    """Buzón de un suscriptor: guarda solo la última actualización por clave (coalescing)."""
+
+    def __init__(self, hub: "LiveHub", topic: str, key: str, baseline: Optional[Dict[str, Any]] = None):
+        self.hub = hub
+        self.topic = topic
+        self.key = key
+        # últimos totales enviados a este suscriptor: base de sus deltas (cada uno parte de su snapshot)
+        self.baseline = _totals(baseline) if baseline is not None else None
+        self._pending: Optional[Dict[str, Any]] = None
+        self._event = asyncio.Event()
+        self.delivered = 0
+        self.coalesced = 0
+
+    def offer(self, message: Dict[str, Any]):
+        # nunca bloquea al publicador: si el cliente va lento se fusiona con lo pendiente
+        if self._pending is None:
+            self._pending = dict(message)
+        else:
+            self.coalesced += 1
+            delta = _merge_delta(self._pending.get("delta"), message.get("delta"))
+            self._pending = dict(message)
+            if delta is not None:
+                self._pending["delta"] = delta
+        self._event.set()
+
+    async def next(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Siguiente actualización, o None si no llega ninguna en `timeout` segundos."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._event.clear()
+        message, self._pending = self._pending, None
+        if message is not None:
+            self.delivered += 1
+        return message
+
+    def close(self):
+        self.hub._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def _totals(kpis: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in kpis.items() if k not in ("_id", "artistId")}
+
+def _merge_delta(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if old is None or new is None:
+        return new if old is None else old
+    merged = dict(old)
+    for k, v in new.items():
+        merged[k] = merged.get(k, 0) + v
+    return merged
+
+class HubFullError(Exception):
+    """Se alcanzó el máximo de suscriptores."""
+
+class LiveHub:
+    """Fan-out en proceso de actualizaciones por (tema, clave) hacia los suscriptores SSE."""
+
+    def __init__(self, max_subscribers: int = SSE_MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self._subs: Dict[Tuple[str, str], Set[Subscription]] = defaultdict(set)
+        self._count = 0
+        self.published = 0
+
+    @property
+    def full(self) -> bool:
+        return self._count >= self.max_subscribers
+
+    def subscribe(self, topic: str, key: str, baseline: Optional[Dict[str, Any]] = None) -> Subscription:
+        """`baseline`: totales que ya recibió el suscriptor (snapshot inicial), base de los deltas de "kpis"."""
+        if self.full:
+            raise HubFullError()
+        sub = Subscription(self, topic, key, baseline)
+        self._subs[(topic, key)].add(sub)
+        self._count += 1
+        return sub
+
+    def _unsubscribe(self, sub: Subscription):
+        subs = self._subs.get((sub.topic, sub.key))
+        if subs and sub in subs:
+            subs.discard(sub)
+            self._count -= 1
+            if not subs:
+                del self._subs[(sub.topic, sub.key)]
+
+    def has_subscribers(self, topic: str, key: str) -> bool:
+        return (topic, key) in self._subs
+
+    def publish(self, topic: str, key: str, message: Dict[str, Any]):
+        self.published += 1
+        for sub in tuple(self._subs.get((topic, key), ())):
+            sub.offer(message)
+
+    def publish_kpis(self, artist_id: str, totals: Dict[str, Any]):
+        """Publica los totales de un artista; el delta se calcula por suscriptor, respecto a lo último que recibió."""
+        aid = str(artist_id)
+        subs = tuple(self._subs.get(("kpis", aid), ()))
+        if not subs:
+            return
+        self.published += 1
+        totals = _totals(totals)
+        for sub in subs:
+            previous, sub.baseline = sub.baseline, totals
+            delta = None
+            if previous is not None:
+                delta = {k: v - previous.get(k, 0) for k, v in totals.items()
+                         if isinstance(v, (int, float)) and v != previous.get(k, 0)}
+            sub.offer({"artistId": aid, "kpis": totals, "delta": delta})
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "subscribers": self._count,
+            "max_subscribers": self.max_subscribers,
+            "topics": len(self._subs),
+            "published": self.published,
+        }
+
+hub = LiveHub()
@@ -1,49 +1,144 @@
 import structlog
 import logging
+import atexit
+import queue
+import threading
+import time
 import sys
 import os
+from datetime import datetime, timezone
+
+# Cola acotada entre el event loop y el hilo escritor: si se llena se descartan registros
+# (y se cuentan) antes que bloquear una petición.
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+class QueueLogger:
+    """Logger final de structlog: solo encola el event dict; render y escritura van en otro hilo."""
+
+    def __init__(self, writer: "LogWriter"):
+        self._writer = writer
+
+    def msg(self, **event_dict):
+        self._writer.put(event_dict)
+
+    log = debug = info = warn = warning = error = critical = exception = fatal = msg
+
+class LogWriter:
+    """Hilo de fondo que renderiza los registros y los escribe en stdout por lotes."""
+
+    def __init__(self, renderer, stream=None, maxsize: int = LOG_QUEUE_SIZE):
+        self._renderer = renderer
+        self._stream = stream or sys.stdout
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._sentinel = object()
+        self.written = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, event_dict: dict):
+        try:
+            self._queue.put_nowait(event_dict)
+        except queue.Full:
+            self.dropped += 1
+
+    def _render(self, event_dict: dict) -> str:
+        ts = event_dict.pop("_ts", None)
+        if ts is not None:
+            event_dict["timestamp"] = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+        try:
+            return self._renderer(None, None, event_dict)
+        except Exception as e:
+            return f"log_render_failed: {e} {event_dict!r}"
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # agrupa lo que ya esté en cola en una sola escritura
+            while len(batch) < 512:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(i is self._sentinel for i in batch)
+            lines = [self._render(i) for i in batch if i is not self._sentinel]
+            if lines:
+                try:
+                    self._stream.write("\n".join(lines) + "\n")
+                    self._stream.flush()
+                except Exception:
+                    pass
+                self.written += len(lines)
+            if stop:
+                return
+
+    def close(self, timeout: float = 2.0):
+        """Vacía la cola antes de salir."""
+        if self._thread.is_alive():
+            try:
+                self._queue.put(self._sentinel, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+    def info(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+def _add_raw_timestamp(logger, method_name, event_dict):
+    # se guarda el instante; el formateo ISO lo hace el hilo escritor
+    event_dict["_ts"] = time.time()
+    return event_dict
+
+def _to_queue(logger, method_name, event_dict):
+    # último procesador: el dict pasa tal cual a QueueLogger.msg(**event_dict)
+    return event_dict
+
+_writer: LogWriter = None
 
 def setup_logging():
-    """Configura structlog para logging estructurado."""
-    
+    """Configura structlog para logging estructurado con escritura asíncrona."""
+    global _writer
+
     is_dev = os.getenv("ENV", "development") != "production"
     log_level = os.getenv("LOG_LEVEL", "INFO").upper()
-    
-    # Procesadores comunes
+
+    # Procesadores comunes (baratos: se ejecutan en el hilo que loguea)
     shared_processors = [
         structlog.contextvars.merge_contextvars,
         structlog.processors.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.stdlib.ExtraAdder(),
+        _add_raw_timestamp,
+        _to_queue,
     ]
-    
+
     if is_dev:
         # En desarrollo: output legible y colorizado
-        structlog.configure(
-            processors=shared_processors + [
-                structlog.dev.ConsoleRenderer(colors=True)
-            ],
-            wrapper_class=structlog.make_filtering_bound_logger(getattr(logging, log_level)),
-            context_class=dict,
-            logger_factory=structlog.PrintLoggerFactory(),
-            cache_logger_on_first_use=True,
-        )
+        renderer = structlog.dev.ConsoleRenderer(colors=True)
     else:
         # En producción: JSON puro
-        structlog.configure(
-            processors=shared_processors + [
-                structlog.processors.dict_traps,
-                structlog.processors.JSONRenderer()
-            ],
-            wrapper_class=structlog.make_filtering_bound_logger(getattr(logging, log_level)),
-            context_class=dict,
-            logger_factory=structlog.PrintLoggerFactory(),
-            cache_logger_on_first_use=True,
-        )
+        renderer = structlog.processors.JSONRenderer()
+
+    _writer = LogWriter(renderer)
+    atexit.register(_writer.close)
+    structlog.configure(
+        processors=shared_processors,
+        wrapper_class=structlog.make_filtering_bound_logger(getattr(logging, log_level)),
+        context_class=dict,
+        logger_factory=lambda *args: QueueLogger(_writer),
+        cache_logger_on_first_use=True,
+    )
 
 def get_logger(name: str = None):
     """Obtiene un logger con contexto opcional."""
     return structlog.get_logger(name or "stats-service")
 
+def logging_info() -> dict:
+    return _writer.info() if _writer is not None else {}
+
 # Configurar al importar
-setup_logging()
\ No newline at end of file
+setup_logging()
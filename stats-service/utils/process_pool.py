@@ -0,0 +1,277 @@
+import asyncio
+import multiprocessing
+import os
+import pickle
+import signal
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger("process_pool")
+
+# 0 = sin pool: los trabajos se ejecutan en un hilo (como antes)
+PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+# por debajo de este tamaño (elementos) no compensa el viaje entre procesos
+PROCESS_POOL_MIN_ITEMS = int(os.getenv("PROCESS_POOL_MIN_ITEMS", "2000"))
+# buffers out-of-band a partir de este tamaño viajan por memoria compartida en lugar de por el pipe
+PROCESS_POOL_SHM_BYTES = int(os.getenv("PROCESS_POOL_SHM_BYTES", str(1 << 20)))
+# fork con hilos vivos (logger, loop) no es seguro: forkserver en Linux, spawn en el resto
+PROCESS_POOL_START_METHOD = os.getenv("PROCESS_POOL_START_METHOD") or (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_OOB_MIN_BYTES = 64 * 1024
+_UTILIZATION_WINDOW = 60.0
+_WARMUP_TIMEOUT = 30.0
+
+# ------------------------------------------------------------
+# Serialización: pickle 5 con buffers out-of-band
+# ------------------------------------------------------------
+def _mark_buffers(obj: Any, depth: int = 0) -> Any:
+    """Envuelve los bytes grandes en PickleBuffer para que pickle los saque del flujo (out-of-band)."""
+    if isinstance(obj, (bytes, bytearray)) and len(obj) >= _OOB_MIN_BYTES:
+        return pickle.PickleBuffer(obj)
+    if depth >= 3:
+        return obj
+    if isinstance(obj, tuple):
+        return tuple(_mark_buffers(o, depth + 1) for o in obj)
+    if isinstance(obj, list):
+        return [_mark_buffers(o, depth + 1) for o in obj]
+    if isinstance(obj, dict):
+        return {k: _mark_buffers(v, depth + 1) for k, v in obj.items()}
+    return obj
+
+def _pack(obj: Any) -> Tuple:
+    """("inline", datos, buffers) o ("shm", nombre, tamaños) si los buffers out-of-band son grandes."""
+    buffers: List[pickle.PickleBuffer] = []
+    data = pickle.dumps(_mark_buffers(obj), protocol=5, buffer_callback=buffers.append)
+    raws = [b.raw() for b in buffers]
+    oob = sum(r.nbytes for r in raws)
+    if oob < PROCESS_POOL_SHM_BYTES:
+        return ("inline", data, [bytes(r) for r in raws])
+    shm = shared_memory.SharedMemory(create=True, size=oob)
+    offset = 0
+    for r in raws:
+        shm.buf[offset:offset + r.nbytes] = r
+        offset += r.nbytes
+    name = shm.name
+    shm.close()
+    # lo libera quien lo recibe; que el resource tracker de este proceso no lo borre al salir
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return ("shm", data, (name, [r.nbytes for r in raws]))
+
+def _unpack(packed: Tuple) -> Any:
+    kind, data, extra = packed
+    if kind == "inline":
+        return pickle.loads(data, buffers=extra)
+    name, sizes = extra
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        # una sola copia desde la memoria compartida; después se libera el segmento
+        views, offset = [], 0
+        for size in sizes:
+            views.append(bytes(shm.buf[offset:offset + size]))
+            offset += size
+        return pickle.loads(data, buffers=views)
+    finally:
+        shm.close()
+        shm.unlink()
+
+def _discard(packed: Tuple):
+    """Libera la memoria compartida de un paquete que no llegó a leerse."""
+    if packed and packed[0] == "shm":
+        try:
+            shm = shared_memory.SharedMemory(name=packed[2][0])
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+def _packed_size(packed: Tuple) -> int:
+    kind, data, extra = packed
+    return len(data) + (sum(len(b) for b in extra) if kind == "inline" else sum(extra[1]))
+
+# ------------------------------------------------------------
+# Lado del worker
+# ------------------------------------------------------------
+_start_barrier = None
+
+def _worker_init(barrier=None):
+    global _start_barrier
+    # Ctrl+C lo gestiona el proceso principal, que cierra el pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _start_barrier = barrier
+
+def _worker_call(fn: Callable, packed_args: Tuple) -> Tuple[Tuple, float, float]:
+    started_at = time.time()
+    t0 = time.perf_counter()
+    args, kwargs = _unpack(packed_args)
+    result = fn(*args, **kwargs)
+    return _pack(result), started_at, time.perf_counter() - t0
+
+def _warmup() -> int:
+    # con spawn los trabajos no vienen precargados: se importan aquí y no en la primera petición
+    import utils.cpu_jobs  # noqa: F401
+    if _start_barrier is not None:
+        # cada worker retiene su trabajo hasta que están todos: el executor (que crea procesos
+        # bajo demanda) no puede resolver el arranque con uno solo
+        try:
+            _start_barrier.wait(timeout=_WARMUP_TIMEOUT)
+        except threading.BrokenBarrierError:
+            pass
+    return os.getpid()
+
+# ------------------------------------------------------------
+# Lado del servicio
+# ------------------------------------------------------------
+class ProcessPool:
+    """Pool de procesos gestionado para trabajo CPU (CSV, JSON de listas grandes, post-procesado)."""
+
+    def __init__(self, workers: int = PROCESS_POOL_WORKERS, start_method: str = PROCESS_POOL_START_METHOD):
+        self.workers = workers
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._started_at: Optional[float] = None
+        self.inflight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.inline = 0
+        self.shm_transfers = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+        self._recent: deque = deque()
+        self._jobs: Dict[str, Dict[str, float]] = defaultdict(lambda: {"count": 0, "run_s": 0.0, "failed": 0})
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        ctx = multiprocessing.get_context(self.start_method)
+        if self.start_method == "forkserver":
+            # el servidor de fork ya tiene cargados los trabajos: cada worker nuevo arranca al instante
+            ctx.set_forkserver_preload(["utils.cpu_jobs"])
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=_worker_init,
+                                   initargs=(ctx.Barrier(self.workers),))
+
+    async def start(self):
+        if self.workers <= 0 or self._executor is not None:
+            return
+        self._executor = self._new_executor()
+        self._started_at = time.monotonic()
+        # arrancar todos los workers ya (un trabajo de calentamiento por worker, sincronizados con
+        # una barrera): las primeras peticiones concurrentes no pagan el coste de crearlos
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(loop.run_in_executor(self._executor, _warmup) for _ in range(self.workers)))
+        started = sorted(set(pids))
+        if len(started) < self.workers:
+            logger.warning("process_pool_partial_warmup", workers=self.workers, started=len(started))
+        logger.info("process_pool_started", workers=self.workers, start_method=self.start_method, pids=started)
+
+    async def stop(self):
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+            logger.info("process_pool_stopped")
+
+    def _restart(self):
+        old, self._executor = self._executor, None
+        if old is not None:
+            old.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._new_executor()
+        self.restarts += 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Ejecuta `fn(*args, **kwargs)` en un worker. `fn` debe ser una función de módulo (picklable)."""
+        name = getattr(fn, "__name__", "job")
+        if self._executor is None:
+            self.inline += 1
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+        packed = _pack((args, kwargs))
+        self.bytes_in += _packed_size(packed)
+        self.shm_transfers += packed[0] == "shm"
+        self.submitted += 1
+        self.inflight += 1
+        submitted_at = time.time()
+        loop = asyncio.get_running_loop()
+        try:
+            result, started_at, run_s = await loop.run_in_executor(self._executor, _worker_call, fn, packed)
+        except BrokenProcessPool:
+            # un worker murió (OOM, señal): se recrea el pool y este trabajo se hace en un hilo
+            self.failed += 1
+            self._jobs[name]["failed"] += 1
+            _discard(packed)
+            logger.warning("process_pool_broken", job=name)
+            self._restart()
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        except BaseException:
+            self.failed += 1
+            self._jobs[name]["failed"] += 1
+            _discard(packed)
+            raise
+        finally:
+            self.inflight -= 1
+
+        self.completed += 1
+        self.bytes_out += _packed_size(result)
+        self.shm_transfers += result[0] == "shm"
+        self._wait_total += max(0.0, started_at - submitted_at)
+        self._run_total += run_s
+        self._jobs[name]["count"] += 1
+        self._jobs[name]["run_s"] += run_s
+        self._recent.append((time.monotonic(), run_s))
+        return _unpack(result)
+
+    async def offload(self, fn: Callable, *args, size: int = 0, **kwargs) -> Any:
+        """Como `run`, pero los trabajos pequeños (`size` < PROCESS_POOL_MIN_ITEMS) se hacen en el loop."""
+        if size < PROCESS_POOL_MIN_ITEMS:
+            return fn(*args, **kwargs)
+        return await self.run(fn, *args, **kwargs)
+
+    def utilization(self) -> float:
+        """Fracción de tiempo de worker ocupada en la última ventana (0..1)."""
+        if not self.workers or self._started_at is None:
+            return 0.0
+        now = time.monotonic()
+        while self._recent and self._recent[0][0] < now - _UTILIZATION_WINDOW:
+            self._recent.popleft()
+        window = min(_UTILIZATION_WINDOW, max(now - self._started_at, 1e-6))
+        busy = sum(run_s for _, run_s in self._recent)
+        return min(1.0, busy / (window * self.workers))
+
+    def info(self) -> Dict[str, Any]:
+        done = max(self.completed, 1)
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers if self.enabled else 0,
+            "start_method": self.start_method,
+            "inflight": self.inflight,
+            "queued": max(0, self.inflight - self.workers),
+            "utilization_1m": round(self.utilization(), 3),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "restarts": self.restarts,
+            "inline_fallback": self.inline,
+            "avg_wait_ms": round(self._wait_total / done * 1000, 2),
+            "avg_run_ms": round(self._run_total / done * 1000, 2),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "shm_transfers": self.shm_transfers,
+            "jobs": {k: {"count": int(v["count"]), "failed": int(v["failed"]),
+                         "avg_run_ms": round(v["run_s"] / max(v["count"], 1) * 1000, 2)}
+                     for k, v in self._jobs.items()},
+        }
+
+cpu_pool = ProcessPool()
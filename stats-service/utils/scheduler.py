@@ -0,0 +1,94 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+class PeriodicJob:
+    """Tarea periódica con jitter, sin solapamiento entre ejecuciones y con métricas de duración."""
+
+    def __init__(self, name: str, interval: float, fn: Callable[[], Awaitable[Any]], jitter: float = 0.1):
+        self.name = name
+        self.interval = interval
+        self.jitter = jitter
+        self._fn = fn
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_run_at: Optional[str] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_result: Any = None
+        self.last_error: Optional[str] = None
+
+    async def run_once(self):
+        if self.running:
+            self.skipped += 1
+            return
+        self.running = True
+        started = time.perf_counter()
+        try:
+            self.last_result = await self._fn()
+            self.runs += 1
+            self.last_error = None
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+        finally:
+            self.running = False
+            self.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.last_run_at = datetime.now(timezone.utc).isoformat()
+
+    def _next_delay(self) -> float:
+        return max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    async def _loop(self):
+        # arranque desfasado para que varios workers no coincidan
+        await asyncio.sleep(random.uniform(0, self.interval * self.jitter))
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self._next_delay())
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped_overlaps": self.skipped,
+            "last_run_at": self.last_run_at,
+            "last_duration_ms": self.last_duration_ms,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+class Scheduler:
+    def __init__(self):
+        self.jobs: Dict[str, PeriodicJob] = {}
+
+    def add(self, job: PeriodicJob):
+        self.jobs[job.name] = job
+
+    def start(self):
+        for job in self.jobs.values():
+            job.start()
+
+    async def stop(self):
+        await asyncio.gather(*(job.stop() for job in self.jobs.values()))
+
+    def info(self) -> Dict[str, Any]:
+        return {name: job.info() for name, job in self.jobs.items()}
@@ -0,0 +1,138 @@
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR") or Path(__file__).resolve().parents[1] / "snapshots")
+SNAPSHOT_COLLECTIONS = ("events", "artist_kpis")
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", "1000"))
+# margen para no adelantar la marca de agua sobre inserciones en vuelo con _id anterior
+SNAPSHOT_SAFETY_LAG_SECONDS = int(os.getenv("SNAPSHOT_SAFETY_LAG_SECONDS", "60"))
+MANIFEST_FILE = "manifest.json"
+
+# Solo las colecciones de inserción pura admiten exportación incremental por _id;
+# artist_kpis se modifica con $inc, así que cada snapshot la incluye completa.
+APPEND_ONLY = frozenset({"events"})
+
+def load_manifest(snapshot_dir: Path = SNAPSHOT_DIR) -> Dict[str, Any]:
+    path = snapshot_dir / MANIFEST_FILE
+    if not path.exists():
+        return {"snapshots": []}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def _save_manifest(snapshot_dir: Path, manifest: Dict[str, Any]):
+    tmp = snapshot_dir / (MANIFEST_FILE + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, snapshot_dir / MANIFEST_FILE)
+
+def _watermark(manifest: Dict[str, Any], col: str) -> Optional[ObjectId]:
+    for snap in reversed(manifest["snapshots"]):
+        last_id = snap["collections"].get(col, {}).get("lastId")
+        if last_id:
+            return ObjectId(last_id)
+    return None
+
+def _write_lines(fh, lines: List[str]):
+    fh.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+async def _export_collection(db, col: str, query: Dict[str, Any], path: Path, batch_size: int) -> Tuple[int, Optional[ObjectId]]:
+    """Vuelca la consulta (orden _id) a NDJSON gzip; solo se publica el fichero si termina completo."""
+    part = path.with_name(path.name + ".part")
+    count = 0
+    last_id = None
+    lines: List[str] = []
+    fh = gzip.open(part, "wb", compresslevel=6)
+    try:
+        cursor = db[col].find(query, allow_disk_use=True).sort("_id", 1).batch_size(batch_size)
+        async for doc in cursor:
+            lines.append(json_util.dumps(doc, json_options=json_util.RELAXED_JSON_OPTIONS))
+            last_id = doc["_id"]
+            count += 1
+            if len(lines) >= batch_size:
+                await asyncio.to_thread(_write_lines, fh, lines)
+                lines = []
+        if lines:
+            await asyncio.to_thread(_write_lines, fh, lines)
+        await asyncio.to_thread(fh.close)
+        os.replace(part, path)
+    except BaseException:
+        fh.close()
+        part.unlink(missing_ok=True)
+        raise
+    return count, last_id
+
+def _new_snapshot_dir(snapshot_dir: Path, now: datetime) -> str:
+    """Crea el directorio del snapshot y devuelve su id (UTC con milisegundos; sufijo -N si ya existe)."""
+    base = now.strftime("%Y%m%dT%H%M%S") + f"{now.microsecond // 1000:03d}Z"
+    snap_id, attempt = base, 0
+    while True:
+        try:
+            # sin exist_ok: si otro proceso creó el mismo id, se prueba el siguiente sufijo
+            (snapshot_dir / snap_id).mkdir()
+            return snap_id
+        except FileExistsError:
+            attempt += 1
+            snap_id = f"{base}-{attempt}"
+
+async def create_snapshot(db, full: bool = False, collections=SNAPSHOT_COLLECTIONS,
+                          snapshot_dir: Path = SNAPSHOT_DIR, batch_size: int = SNAPSHOT_BATCH_SIZE) -> Dict[str, Any]:
+    """Crea un snapshot en `<snapshot_dir>/<id>/` y lo registra en el manifiesto al terminar."""
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(snapshot_dir)
+    now = datetime.now(timezone.utc)
+    snap_id = _new_snapshot_dir(snapshot_dir, now)
+    upper = ObjectId.from_datetime(now - timedelta(seconds=SNAPSHOT_SAFETY_LAG_SECONDS))
+
+    async def _one(col: str) -> Tuple[str, Dict[str, Any]]:
+        after = None if full or col not in APPEND_ONLY else _watermark(manifest, col)
+        if col in APPEND_ONLY:
+            query: Dict[str, Any] = {"_id": {"$lt": upper}}
+            if after is not None:
+                query["_id"]["$gt"] = after
+        else:
+            query = {}
+        file = f"{snap_id}/{col}.ndjson.gz"
+        count, last_id = await _export_collection(db, col, query, snapshot_dir / file, batch_size)
+        watermark = last_id or after
+        return col, {
+            "file": file,
+            "mode": "incremental" if after is not None else "full",
+            "count": count,
+            "afterId": str(after) if after is not None else None,
+            "lastId": str(watermark) if watermark is not None and col in APPEND_ONLY else None,
+        }
+
+    results = await asyncio.gather(*(_one(c) for c in collections))
+    entry = {"id": snap_id, "createdAt": now.isoformat(), "collections": dict(results)}
+    # el manifiesto es el punto de confirmación: un snapshot a medias nunca entra en la cadena.
+    # Se relee por si otro snapshot se confirmó mientras este exportaba
+    manifest = load_manifest(snapshot_dir)
+    manifest["snapshots"].append(entry)
+    _save_manifest(snapshot_dir, manifest)
+    return entry
+
+def restore_sources(manifest: Dict[str, Any], snapshot_dir: Path = SNAPSHOT_DIR,
+                    until: Optional[str] = None) -> Dict[str, List[Path]]:
+    """Cadena de ficheros por colección: el último snapshot completo y los incrementales posteriores."""
+    sources: Dict[str, List[Path]] = {}
+    for snap in manifest["snapshots"]:
+        for col, info in snap["collections"].items():
+            path = snapshot_dir / info["file"]
+            if info["mode"] == "full":
+                sources[col] = [path]
+            else:
+                sources.setdefault(col, []).append(path)
+        if until is not None and snap["id"] == until:
+            break
+    else:
+        if until is not None:
+            raise ValueError(f"Snapshot {until} not found in manifest")
+    missing = [str(p) for paths in sources.values() for p in paths if not p.exists()]
+    if missing:
+        raise FileNotFoundError(f"Snapshot files missing: {', '.join(missing)}")
+    return sources
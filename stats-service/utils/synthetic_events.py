@@ -0,0 +1,419 @@
+import bisect
+import gzip
+import hashlib
+import json
+import math
+import random
+import struct
+from collections import Counter, defaultdict
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+
+from utils.dump_importer import iter_documents
+
+GENRES = ("rock", "pop", "electronic", "hip-hop", "jazz", "indie", "metal", "folk", "classical", "reggaeton")
+# más escucha en fin de semana (lunes..domingo); el volcado es demasiado pequeño para aprenderlo
+WEEKDAY_WEIGHTS = (1.0, 1.0, 1.0, 1.05, 1.15, 1.25, 1.2)
+USER_ZIPF = 0.9
+# curva horaria típica de escucha (UTC); las horas del volcado se mezclan con ella según su tamaño
+DIURNAL_PRIOR = (3, 2, 1.5, 1, 1, 1, 1.5, 2.5, 3.5, 4, 4.5, 5, 5.5, 5.5, 5.5, 5.5, 6, 6.5, 7, 7.5, 8, 7.5, 6, 4.5)
+# eventos del volcado con los que su curva horaria pesa lo mismo que la prior
+HOUR_PRIOR_STRENGTH = 1000
+# artistas / álbumes observados a partir de los cuales se usan sus medias en lugar de los valores por defecto
+MIN_CATALOG_EVIDENCE = 10
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def zipf_rank(u: float, n: int, s: float) -> int:
+    """Rango 0..n-1 de una ley de potencias acotada por CDF inversa (aproximación continua, O(1))."""
+    if n <= 1:
+        return 0
+    if abs(s - 1.0) < 1e-9:
+        x = n ** u
+    else:
+        x = ((n ** (1 - s) - 1) * u + 1) ** (1 / (1 - s))
+    return min(int(x) - 1 if x >= 1 else 0, n - 1)
+
+def _fit_zipf(counts: Iterable[int]) -> Optional[float]:
+    """Exponente por mínimos cuadrados sobre log(rango) / log(frecuencia)."""
+    freqs = sorted((c for c in counts if c > 0), reverse=True)
+    if len(freqs) < 3:
+        return None
+    xs = [math.log(i + 1) for i in range(len(freqs))]
+    ys = [math.log(c) for c in freqs]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mx) ** 2 for x in xs)
+    if var == 0:
+        return None
+    slope = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var
+    return -slope
+
+def _as_utc(ts) -> Optional[datetime]:
+    if not isinstance(ts, datetime):
+        return None
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+class DumpProfile:
+    """Distribuciones aprendidas del volcado: mezcla de tipos, forma de `metadata`, horario y catálogo."""
+
+    def __init__(self):
+        self.event_weights: Dict[str, float] = {}
+        # por tipo de evento: [(peso, entityType, claves de metadata o None)]
+        self.shapes: Dict[str, List[Tuple[float, Optional[str], Optional[Tuple[str, ...]]]]] = {}
+        self.hour_weights: List[float] = [1.0] * 24
+        self.user_mix: Dict[str, float] = {"user": 1.0}
+        self.anonymous_rate = 0.0
+        self.prices: List[float] = [4.99]
+        self.currencies: List[str] = ["EUR"]
+        self.items_counts: List[int] = [1]
+        self.zipf_s = 1.0
+        self.albums_per_artist = 3
+        self.tracks_per_album = 10
+        self.end: Optional[datetime] = None
+        self.observed = 0
+
+    @classmethod
+    def from_events(cls, events: Iterable[dict]) -> "DumpProfile":
+        p = cls()
+        types: Counter = Counter()
+        shapes: Dict[str, Counter] = defaultdict(Counter)
+        hours: Counter = Counter()
+        users: Counter = Counter()
+        plays: Counter = Counter()
+        albums_by_artist: Dict[str, set] = defaultdict(set)
+        tracks_by_album: Dict[str, set] = defaultdict(set)
+        prices, currencies, items = [], Counter(), []
+        anonymous = 0
+        for e in events:
+            et = e.get("eventType")
+            if not et:
+                continue
+            p.observed += 1
+            types[et] += 1
+            meta = e.get("metadata")
+            keys = tuple(sorted(meta)) if isinstance(meta, dict) else None
+            shapes[et][(e.get("entityType"), keys)] += 1
+            ts = _as_utc(e.get("timestamp"))
+            if ts is not None:
+                hours[ts.hour] += 1
+                p.end = ts if p.end is None or ts > p.end else p.end
+            uid = e.get("userId")
+            users["empty" if not uid else "anonymous" if uid == "anonymous" else "user"] += 1
+            anonymous += 1 if e.get("anonymous") else 0
+            meta = meta if isinstance(meta, dict) else {}
+            if et == "track.played" and e.get("entityId"):
+                plays[str(e["entityId"])] += 1
+            artist = meta.get("artistId") or meta.get("artist")
+            if artist and meta.get("albumId"):
+                albums_by_artist[str(artist)].add(str(meta["albumId"]))
+            if meta.get("albumId") and e.get("entityType") == "track" and e.get("entityId"):
+                tracks_by_album[str(meta["albumId"])].add(str(e["entityId"]))
+            if isinstance(meta.get("price"), (int, float)) and meta["price"] > 0:
+                prices.append(float(meta["price"]))
+            if meta.get("currency"):
+                currencies[meta["currency"]] += 1
+            if isinstance(meta.get("itemsCount"), int) and meta["itemsCount"] > 0:
+                items.append(meta["itemsCount"])
+
+        total = sum(types.values())
+        if total:
+            p.event_weights = {et: c / total for et, c in types.items()}
+            p.shapes = {et: [(c, ent, keys) for (ent, keys), c in cnt.most_common()] for et, cnt in shapes.items()}
+            # un volcado pequeño apenas mueve la prior; uno grande la sustituye
+            observed_hours = sum(hours.values())
+            alpha = observed_hours / (observed_hours + HOUR_PRIOR_STRENGTH)
+            prior_sum = sum(DIURNAL_PRIOR)
+            p.hour_weights = [
+                round(alpha * hours[h] / max(observed_hours, 1) + (1 - alpha) * DIURNAL_PRIOR[h] / prior_sum, 6)
+                for h in range(24)
+            ]
+            p.user_mix = {k: v / total for k, v in users.items()}
+            p.anonymous_rate = anonymous / total
+        p.prices = prices or p.prices
+        p.currencies = [c for c, _ in currencies.most_common()] or p.currencies
+        p.items_counts = items or p.items_counts
+        fitted = _fit_zipf(plays.values())
+        if fitted is not None:
+            p.zipf_s = min(max(fitted, 0.6), 2.0)
+        if len(albums_by_artist) >= MIN_CATALOG_EVIDENCE:
+            p.albums_per_artist = max(1, min(20, round(sum(map(len, albums_by_artist.values())) / len(albums_by_artist))))
+        if len(tracks_by_album) >= MIN_CATALOG_EVIDENCE:
+            p.tracks_per_album = max(1, min(30, round(sum(map(len, tracks_by_album.values())) / len(tracks_by_album))))
+        return p
+
+    @classmethod
+    def from_dump(cls, path: Path) -> "DumpProfile":
+        return cls.from_events(iter_documents(path, {"bytes_read": 0}))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "observed_events": self.observed,
+            "event_weights": {k: round(v, 4) for k, v in self.event_weights.items()},
+            "shapes": {et: [{"weight": w, "entityType": ent, "metadata": list(keys) if keys is not None else None}
+                            for w, ent, keys in shapes] for et, shapes in self.shapes.items()},
+            "hour_weights": self.hour_weights,
+            "user_mix": {k: round(v, 4) for k, v in self.user_mix.items()},
+            "anonymous_rate": round(self.anonymous_rate, 4),
+            "price_range": [min(self.prices), max(self.prices)],
+            "currencies": self.currencies,
+            "zipf_s": round(self.zipf_s, 3),
+            "albums_per_artist": self.albums_per_artist,
+            "tracks_per_album": self.tracks_per_album,
+            "end": self.end.isoformat() if self.end else None,
+        }
+
+@lru_cache(maxsize=1 << 16)
+def _hex_id(seed: int, kind: str, index: int) -> str:
+    # con popularidad Zipf unos pocos ids se repiten muchísimo: se cachean
+    return hashlib.blake2b(f"{seed}:{kind}:{index}".encode(), digest_size=12).hexdigest()
+
+class Catalog:
+    """Catálogo sintético sin tablas: cada id se deriva de (semilla, tipo, índice).
+
+    Los índices bajos son los más populares; como los tracks se numeran por álbum y los álbumes por
+    artista, los artistas populares concentran los tracks populares.
+    """
+
+    def __init__(self, seed: int, artists: int, albums_per_artist: int, tracks_per_album: int, users: int):
+        self.seed = seed
+        self.artists = artists
+        self.albums_per_artist = albums_per_artist
+        self.tracks_per_album = tracks_per_album
+        self.albums = artists * albums_per_artist
+        self.tracks = self.albums * tracks_per_album
+        self.users = users
+
+    def artist_id(self, i: int) -> str:
+        return _hex_id(self.seed, "artist", i)
+
+    def album_id(self, i: int) -> str:
+        return _hex_id(self.seed, "album", i)
+
+    def track_id(self, i: int) -> str:
+        return _hex_id(self.seed, "track", i)
+
+    def user_id(self, i: int) -> str:
+        return _hex_id(self.seed, "user", i)
+
+    def artist_name(self, i: int) -> str:
+        return f"Artista {i + 1}"
+
+    def genre(self, artist: int) -> str:
+        return GENRES[int(self.artist_id(artist)[:4], 16) % len(GENRES)]
+
+    def album_of(self, track: int) -> int:
+        return track // self.tracks_per_album
+
+    def artist_of(self, album: int) -> int:
+        return album // self.albums_per_artist
+
+def _derive_seed(*parts) -> int:
+    return int.from_bytes(hashlib.blake2b(":".join(map(str, parts)).encode(), digest_size=8).digest(), "big")
+
+def _spread(total: int, weights: List[float]) -> List[int]:
+    """Reparte `total` según `weights` con enteros que suman exactamente `total`."""
+    acc, out, prev = 0.0, [], 0
+    wsum = sum(weights)
+    for w in weights:
+        acc += total * w / wsum
+        cur = round(acc)
+        out.append(cur - prev)
+        prev = cur
+    return out
+
+class EventGenerator:
+    """Genera eventos en orden temporal; cada (día, hora) tiene su propio RNG derivado de la semilla,
+    así cualquier rango de días (un shard) se puede regenerar por separado con el mismo resultado."""
+
+    def __init__(self, profile: DumpProfile, total: int, days: int, end: datetime, seed: int,
+                 artists: int, users: int, zipf_s: Optional[float] = None, growth: float = 0.0):
+        self.profile = profile
+        self.total = total
+        self.days = days
+        self.end = end.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        self.start = self.end - timedelta(days=days)
+        self.seed = seed
+        self.zipf_s = zipf_s if zipf_s is not None else profile.zipf_s
+        self.catalog = Catalog(seed, artists, profile.albums_per_artist, profile.tracks_per_album, users)
+        self._types = list(profile.event_weights) or ["track.played"]
+        self._type_cum = self._cumulative([profile.event_weights.get(t, 1.0) for t in self._types])
+        self._shape_cum = {et: (shapes, self._cumulative([w for w, _, _ in shapes])) for et, shapes in profile.shapes.items()}
+        self._users = list(profile.user_mix)
+        self._user_cum = self._cumulative([profile.user_mix[u] for u in self._users])
+        self._growth = growth
+
+    @staticmethod
+    def _cumulative(weights: List[float]) -> List[float]:
+        out, acc = [], 0.0
+        for w in weights:
+            acc += w
+            out.append(acc)
+        return out
+
+    def day_counts(self) -> List[int]:
+        weights = []
+        for d in range(self.days):
+            day = self.start + timedelta(days=d)
+            trend = (1 + self._growth) ** (d / max(self.days - 1, 1))
+            weights.append(WEEKDAY_WEIGHTS[day.weekday()] * trend)
+        return _spread(self.total, weights)
+
+    def shard_days(self, shard: int, shards: int) -> range:
+        return range(shard * self.days // shards, (shard + 1) * self.days // shards)
+
+    def count_for(self, days: range) -> int:
+        counts = self.day_counts()
+        return sum(counts[d] for d in days)
+
+    def iter_events(self, days: Optional[range] = None) -> Iterator[dict]:
+        counts = self.day_counts()
+        for d in days if days is not None else range(self.days):
+            day_start = self.start + timedelta(days=d)
+            hours = _spread(counts[d], self.profile.hour_weights)
+            for h, n in enumerate(hours):
+                if n:
+                    yield from self._hour(day_start + timedelta(hours=h), n, random.Random(_derive_seed(self.seed, d, h)))
+
+    def _hour(self, hour_start: datetime, n: int, rng: random.Random) -> Iterator[dict]:
+        # milisegundos enteros: es la precisión con la que Mongo guarda las fechas
+        offsets = sorted(rng.randrange(3_600_000) for _ in range(n))
+        base_ms = int(hour_start.timestamp()) * 1000
+        for off in offsets:
+            yield self._event(rng, base_ms + off)
+
+    def _pick(self, rng: random.Random, items: list, cum: List[float]):
+        return items[min(bisect.bisect(cum, rng.random() * cum[-1]), len(items) - 1)]
+
+    def _event(self, rng: random.Random, ts_ms: int) -> dict:
+        cat = self.catalog
+        et = self._pick(rng, self._types, self._type_cum)
+        shapes, cum = self._shape_cum.get(et, ([(1, None, None)], [1.0]))
+        _, entity_type, keys = self._pick(rng, shapes, cum)
+
+        if et == "artist.followed":
+            artist = zipf_rank(rng.random(), cat.artists, self.zipf_s)
+            album = artist * cat.albums_per_artist
+            track = album * cat.tracks_per_album
+        elif et == "order.paid":
+            album = zipf_rank(rng.random(), cat.albums, self.zipf_s)
+            artist = cat.artist_of(album)
+            track = album * cat.tracks_per_album
+        else:
+            track = zipf_rank(rng.random(), cat.tracks, self.zipf_s)
+            album = cat.album_of(track)
+            artist = cat.artist_of(album)
+
+        if entity_type == "order":
+            entity_id = str(ts_ms)
+        elif entity_type == "artist" or (entity_type is None and et == "artist.followed"):
+            entity_id = cat.artist_id(artist)
+        elif entity_type == "album" or (entity_type is None and et == "order.paid"):
+            entity_id = cat.album_id(album)
+        else:
+            entity_id = cat.track_id(track)
+
+        metadata = None
+        if keys is not None:
+            metadata = {k: self._meta_value(rng, k, artist, album, track) for k in keys}
+
+        kind = self._pick(rng, self._users, self._user_cum)
+        if kind == "user":
+            user_id = cat.user_id(zipf_rank(rng.random(), cat.users, USER_ZIPF))
+        else:
+            user_id = "" if kind == "empty" else "anonymous"
+
+        when = _EPOCH + timedelta(milliseconds=ts_ms)
+        return {
+            "_id": ObjectId(struct.pack(">I", ts_ms // 1000) + rng.randbytes(8)),
+            "eventType": et,
+            "timestamp": when,
+            "userId": user_id,
+            "anonymous": rng.random() < self.profile.anonymous_rate,
+            "entityType": entity_type,
+            "entityId": entity_id,
+            "metadata": metadata,
+        }
+
+    def _meta_value(self, rng: random.Random, key: str, artist: int, album: int, track: int):
+        cat = self.catalog
+        p = self.profile
+        if key == "albumId":
+            return cat.album_id(album)
+        if key == "artistId":
+            return cat.artist_id(artist)
+        if key in ("artist", "artistName"):
+            return cat.artist_name(artist)
+        if key == "trackId":
+            return cat.track_id(track)
+        if key == "title":
+            return f"Canción {track + 1}"
+        if key == "genre":
+            return cat.genre(artist)
+        if key == "price":
+            return round(rng.choice(p.prices) * rng.uniform(0.8, 1.25), 2)
+        if key == "currency":
+            return p.currencies[0]
+        if key == "itemsCount":
+            return rng.choice(p.items_counts)
+        return None
+
+def artist_increments(event: dict) -> Tuple[Optional[str], Dict[str, Any]]:
+    """Mismas reglas que la ingesta (EventController) para `artist_kpis`."""
+    meta = event.get("metadata") or {}
+    artist_id = event.get("entityId") or meta.get("artistId") or meta.get("artist")
+    et = event.get("eventType")
+    if et == "track.played":
+        inc = {"plays": 1}
+    elif et == "track.liked":
+        inc = {"likes": 1}
+    elif et == "artist.followed":
+        inc = {"follows": 1}
+    elif et == "order.paid":
+        inc = {"purchases": 1, "revenue": float(meta.get("price", 0) or 0)}
+    else:
+        inc = {}
+    return (str(artist_id) if artist_id else None), inc
+
+def to_ejson_line(doc: dict) -> str:
+    """Extended JSON relajado de un evento generado (mismo formato que json_util, varias veces más rápido)."""
+    out = dict(doc)
+    out["_id"] = {"$oid": str(doc["_id"])}
+    out["timestamp"] = {"$date": doc["timestamp"].isoformat(timespec="milliseconds").replace("+00:00", "Z")}
+    return json.dumps(out, ensure_ascii=False, separators=(",", ":"))
+
+class NDJSONWriter:
+    """Escribe `events-<shard>-<parte>.ndjson.gz` (formato de los snapshots), rotando cada `file_events`."""
+
+    def __init__(self, out_dir: Path, shard: int, file_events: int):
+        self.out_dir = out_dir
+        self.shard = shard
+        self.file_events = file_events
+        self.part = 0
+        self.in_file = 0
+        self.files: List[Path] = []
+        self._fh = None
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    def _open(self):
+        path = self.out_dir / f"events-{self.shard:03d}-{self.part:05d}.ndjson.gz"
+        self.files.append(path)
+        self._fh = gzip.open(path, "wb", compresslevel=3)
+        self.part += 1
+        self.in_file = 0
+
+    def write(self, docs: List[dict]):
+        for doc in docs:
+            if self._fh is None or self.in_file >= self.file_events:
+                self.close()
+                self._open()
+            self._fh.write((to_ejson_line(doc) + "\n").encode("utf-8"))
+            self.in_file += 1
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+# Resoluciones de los buckets pre-agregados, de más gruesa a más fina.
+# retention: None = sin caducidad
+RESOLUTIONS: Dict[str, Dict[str, Optional[timedelta]]] = {
+    "day": {"step": timedelta(days=1), "retention": None},
+    "hour": {"step": timedelta(hours=1), "retention": timedelta(days=90)},
+    "minute": {"step": timedelta(minutes=1), "retention": timedelta(days=2)},
+}
+
+def to_utc_naive(dt: datetime) -> datetime:
+    """Mongo devuelve fechas UTC sin tzinfo; se normaliza todo a ese formato."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    ts = to_utc_naive(ts)
+    if resolution == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(second=0, microsecond=0)
+
+def pick_resolution(start: datetime, end: datetime, points: int, now: Optional[datetime] = None) -> str:
+    """La resolución más gruesa que todavía da al menos `points` buckets en el rango."""
+    now = to_utc_naive(now or datetime.now(timezone.utc))
+    start = to_utc_naive(start)
+    span = to_utc_naive(end) - start
+    available = [
+        name for name, cfg in RESOLUTIONS.items()
+        if cfg["retention"] is None or start >= now - cfg["retention"]
+    ]
+    for name in available:
+        if span / RESOLUTIONS[name]["step"] >= points:
+            return name
+    return available[-1]
+
+def bucket_count(start: datetime, end: datetime, resolution: str) -> int:
+    """Buckets que `fill_gaps` generaría para el rango."""
+    first = bucket_start(start, resolution)
+    end = to_utc_naive(end)
+    if end < first:
+        return 0
+    return (end - first) // RESOLUTIONS[resolution]["step"] + 1
+
+def fill_gaps(rows: Dict[datetime, float], start: datetime, end: datetime, resolution: str,
+              max_buckets: Optional[int] = None) -> List[Tuple[datetime, float]]:
+    """Serie continua con 0 en los buckets sin datos; ValueError si superaría `max_buckets`."""
+    if max_buckets is not None and bucket_count(start, end, resolution) > max_buckets:
+        raise ValueError(f"range spans more than {max_buckets} {resolution} buckets")
+    step = RESOLUTIONS[resolution]["step"]
+    current = bucket_start(start, resolution)
+    end = to_utc_naive(end)
+    series = []
+    while current <= end:
+        series.append((current, rows.get(current, 0)))
+        current += step
+    return series
+
+def lttb(series: List[Tuple[datetime, float]], threshold: int) -> List[Tuple[datetime, float]]:
+    """Largest-Triangle-Three-Buckets: reduce la serie a `threshold` puntos conservando su forma."""
+    n = len(series)
+    if threshold >= n or threshold < 3:
+        return list(series)
+
+    origin = series[0][0]
+    xs = [(p[0] - origin).total_seconds() for p in series]
+    ys = [float(p[1]) for p in series]
+    sampled = [series[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # media del siguiente bucket (punto C del triángulo)
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        # el punto del bucket actual que forma el triángulo de mayor área
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        max_area, chosen = -1.0, start
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > max_area:
+                max_area, chosen = area, j
+        sampled.append(series[chosen])
+        a = chosen
+
+    sampled.append(series[-1])
+    return sampled